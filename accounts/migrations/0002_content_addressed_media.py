@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:19
+
+import courses.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=courses.storage.media_storage, upload_to='profile_pics/'),
+        ),
+    ]
@@ -1,6 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
+from core import object_cache
+from courses.storage import media_storage, stored_media, update_media_references
+from courses.thumbnails import get_manifest, schedule_thumbnails
 
 class User(AbstractUser):
     USER_TYPE_CHOICES = [
@@ -18,6 +23,7 @@ class User(AbstractUser):
     bio = models.TextField(blank=True, null=True)
     profile_picture = models.ImageField(
         upload_to='profile_pics/',
+        storage=media_storage,
         blank=True,
         null=True
     )
@@ -28,6 +34,12 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.get_user_type_display()})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_media = stored_media(instance, 'profile_picture')
+        return instance
+    
     @property
     def is_student(self):
         return self.user_type == 'student'
@@ -58,3 +70,23 @@ class TeacherProfile(models.Model):
     
     def __str__(self):
         return f"Teacher: {self.user.username}"
+
+# Instructors shown on course pages come from the object cache; the password hash stays out of it
+object_cache.register(User, exclude=('password',))
+
+@receiver(post_save, sender=User)
+def build_profile_picture_thumbnails(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'profile_picture' not in update_fields:
+        return
+    if instance.profile_picture and not get_manifest(instance.profile_picture.name):
+        schedule_thumbnails(instance.profile_picture.name)
+
+@receiver(post_save, sender=User)
+def update_media_references_on_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'profile_picture' not in update_fields:
+        return
+    update_media_references(instance, created=created)
+
+@receiver(post_delete, sender=User)
+def update_media_references_on_delete(sender, instance, **kwargs):
+    update_media_references(instance, deleted=True)
@@ -4,6 +4,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import CreateView, TemplateView, UpdateView
 from django.contrib import messages
 from django.urls import reverse_lazy
+from django.db.models import Sum
 from .models import User, StudentProfile, TeacherProfile
 from .forms import CustomUserCreationForm, ProfileEditForm
 
@@ -41,8 +42,10 @@ class ProfileView(LoginRequiredMixin, TemplateView):
             context['enrollments'] = user.enrollments.all()
             context['enrollment_requests'] = user.enrollment_requests.all()
         elif user.is_teacher:
-            context['courses'] = user.courses_taught.all()
-            context['total_students'] = sum(course.total_students for course in user.courses_taught.all())
+            context['courses'] = user.courses_taught.select_related('stats')
+            context['total_students'] = user.courses_taught.aggregate(
+                total=Sum('stats__enrollment_count')
+            )['total'] or 0
         
         return context
 
@@ -0,0 +1,23 @@
+from django.contrib import admin
+from .models import CourseDailyActivity, LearningEvent
+
+@admin.register(LearningEvent)
+class LearningEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event_type', 'course_id', 'user_id', 'video_id', 'created_at']
+    list_filter = ['event_type', 'created_at']
+    # Append-only log
+    readonly_fields = ['event_type', 'course_id', 'user_id', 'video_id', 'created_at']
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(CourseDailyActivity)
+class CourseDailyActivityAdmin(admin.ModelAdmin):
+    list_display = ['course', 'date', 'views', 'video_starts', 'video_completions', 'ratings', 'enrollment_requests', 'active_learners']
+    list_filter = ['date']
+    search_fields = ['course__title']
+    date_hierarchy = 'date'
@@ -0,0 +1,103 @@
+"""
+Buffered writes of learning events.
+
+Views call record_event(); it only appends a tuple to an in-process buffer.
+A daemon thread bulk-inserts the buffer every ANALYTICS_FLUSH_INTERVAL
+seconds, or as soon as it holds ANALYTICS_BATCH_SIZE events. A page view
+therefore costs no query, and the log grows by one multi-row INSERT per
+batch. Events still buffered when the process exits are flushed by an
+atexit hook. A crash can lose at most one interval of events, which is
+acceptable for analytics.
+
+The raw log is only read by analytics/rollup.py.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def flush_interval():
+    return getattr(settings, 'ANALYTICS_FLUSH_INTERVAL', 10)
+
+
+def batch_size():
+    return getattr(settings, 'ANALYTICS_BATCH_SIZE', 1000)
+
+
+class EventBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def append(self, event):
+        with self.lock:
+            self.events.append(event)
+            full = len(self.events) >= batch_size()
+        self._ensure_flusher()
+        if full:
+            self.wakeup.set()
+
+    def drain(self):
+        with self.lock:
+            events, self.events = self.events, []
+        return events
+
+    def size(self):
+        return len(self.events)
+
+    def _ensure_flusher(self):
+        if self.thread is not None or not getattr(settings, 'ANALYTICS_AUTOFLUSH', True):
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='analytics-flusher', daemon=True)
+                self.thread.start()
+                atexit.register(flush_events)
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(flush_interval())
+            self.wakeup.clear()
+            try:
+                close_old_connections()
+                flush_events()
+            except Exception:
+                logger.exception('Analytics flush failed')
+            finally:
+                close_old_connections()
+
+
+_buffer = EventBuffer()
+
+
+def record_event(event_type, course_id, user_id=None, video_id=None):
+    """Queue one LearningEvent (``user_id`` is None for anonymous visitors)"""
+    _buffer.append((event_type, course_id, user_id, video_id, timezone.now()))
+
+
+def flush_events():
+    """Bulk-insert the buffered events; returns how many were written"""
+    from .models import LearningEvent
+
+    events = _buffer.drain()
+    if not events:
+        return 0
+    try:
+        LearningEvent.objects.bulk_create([
+            LearningEvent(event_type=event_type, course_id=course_id, user_id=user_id, video_id=video_id, created_at=at)
+            for event_type, course_id, user_id, video_id, at in events
+        ], batch_size=batch_size())
+    except Exception:
+        # Put them back so the next flush retries
+        with _buffer.lock:
+            _buffer.events[:0] = events
+        raise
+    return len(events)
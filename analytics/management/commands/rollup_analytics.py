@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from analytics.events import flush_events
+from analytics.rollup import prune_events, rollup_day
+
+class Command(BaseCommand):
+    help = 'Compact the learning event log into per-course daily activity rows'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Days to re-roll, counting back from today (default 2)')
+        parser.add_argument('--date', type=date.fromisoformat, help='Re-roll only this day (YYYY-MM-DD)')
+        parser.add_argument('--prune', action='store_true', help='Then delete raw events past ANALYTICS_RETENTION_DAYS')
+    
+    def handle(self, *args, **options):
+        flush_events()
+        if options['date']:
+            days = [options['date']]
+        else:
+            today = timezone.localdate()
+            days = [today - timedelta(days=offset) for offset in range(options['days'])]
+        rows = sum(rollup_day(day) for day in days)
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {len(days)} day(s) into {rows} course activity rows'))
+        if options['prune']:
+            self.stdout.write(f'Deleted {prune_events()} raw event(s)')
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('courses', '0008_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearningEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_type', models.PositiveSmallIntegerField(choices=[(1, 'Course view'), (2, 'Video start'), (3, 'Video completion'), (4, 'Rating'), (5, 'Enrollment request')])),
+                ('course_id', models.PositiveIntegerField()),
+                ('user_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('video_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CourseDailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('video_starts', models.PositiveIntegerField(default=0)),
+                ('video_completions', models.PositiveIntegerField(default=0)),
+                ('ratings', models.PositiveIntegerField(default=0)),
+                ('enrollment_requests', models.PositiveIntegerField(default=0)),
+                ('active_learners', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to='courses.course')),
+            ],
+            options={
+                'verbose_name_plural': 'Course daily activity',
+                'ordering': ['-date'],
+                'unique_together': {('course', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+from django.db import models
+from courses.models import Course
+
+class LearningEvent(models.Model):
+    """
+    One learner action, appended through the buffer in analytics/events.py.
+    Ids are plain integers rather than foreign keys: rows are never joined
+    or updated, and stay valid history when the course or user is deleted.
+    """
+    COURSE_VIEW = 1
+    VIDEO_START = 2
+    VIDEO_COMPLETE = 3
+    RATING = 4
+    ENROLLMENT_REQUEST = 5
+    
+    EVENT_CHOICES = [
+        (COURSE_VIEW, 'Course view'),
+        (VIDEO_START, 'Video start'),
+        (VIDEO_COMPLETE, 'Video completion'),
+        (RATING, 'Rating'),
+        (ENROLLMENT_REQUEST, 'Enrollment request'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    event_type = models.PositiveSmallIntegerField(choices=EVENT_CHOICES)
+    course_id = models.PositiveIntegerField()
+    user_id = models.PositiveIntegerField(null=True, blank=True)
+    video_id = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"{self.get_event_type_display()} of course {self.course_id} at {self.created_at:%Y-%m-%d %H:%M}"
+
+class CourseDailyActivity(models.Model):
+    """Per-course, per-day totals compacted from LearningEvent by analytics/rollup.py"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='daily_activity')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    video_starts = models.PositiveIntegerField(default=0)
+    video_completions = models.PositiveIntegerField(default=0)
+    ratings = models.PositiveIntegerField(default=0)
+    enrollment_requests = models.PositiveIntegerField(default=0)
+    # Distinct signed-in users with any event that day
+    active_learners = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['course', 'date']
+        ordering = ['-date']
+        verbose_name_plural = "Course daily activity"
+    
+    def __str__(self):
+        return f"{self.course_id} on {self.date}"
@@ -0,0 +1,91 @@
+"""
+Compaction of the LearningEvent log into CourseDailyActivity.
+
+rollup_day() recomputes one day from the raw events with a single grouped
+query and upserts one row per course. Recomputing a whole day is idempotent,
+so the periodic job simply re-rolls today and yesterday; that also covers
+events flushed after midnight. Raw events older than
+ANALYTICS_RETENTION_DAYS are deleted once rolled up. Dashboards read
+CourseDailyActivity only.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import CourseDailyActivity, LearningEvent
+
+COUNTERS = {
+    'views': LearningEvent.COURSE_VIEW,
+    'video_starts': LearningEvent.VIDEO_START,
+    'video_completions': LearningEvent.VIDEO_COMPLETE,
+    'ratings': LearningEvent.RATING,
+    'enrollment_requests': LearningEvent.ENROLLMENT_REQUEST,
+}
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def rollup_day(day):
+    """Rebuild the CourseDailyActivity rows of ``day``; returns how many courses had events"""
+    from courses.models import Course
+
+    start, end = _day_bounds(day)
+    rows = (
+        LearningEvent.objects.filter(created_at__gte=start, created_at__lt=end)
+        .order_by().values('course_id')
+        .annotate(
+            active_learners=Count('user_id', distinct=True),
+            **{field: Count('pk', filter=Q(event_type=code)) for field, code in COUNTERS.items()},
+        )
+    )
+    rows = list(rows)
+    # Events of deleted courses stay in the log but get no rollup row
+    live = set(Course.objects.filter(pk__in=[row['course_id'] for row in rows]).values_list('pk', flat=True))
+    activity = [
+        CourseDailyActivity(date=day, **row)
+        for row in rows if row['course_id'] in live
+    ]
+    with transaction.atomic():
+        CourseDailyActivity.objects.filter(date=day).exclude(course_id__in=live).delete()
+        CourseDailyActivity.objects.bulk_create(
+            activity,
+            update_conflicts=True,
+            unique_fields=['course', 'date'],
+            update_fields=['active_learners', *COUNTERS],
+            batch_size=500,
+        )
+    return len(activity)
+
+
+def rollup_recent(days=2, today=None):
+    """Re-roll the last ``days`` days (today included); returns the rows written"""
+    today = today or timezone.localdate()
+    return sum(rollup_day(today - timedelta(days=offset)) for offset in range(days))
+
+
+def prune_events(days=None):
+    """Delete raw events older than ANALYTICS_RETENTION_DAYS; returns how many"""
+    days = days if days is not None else getattr(settings, 'ANALYTICS_RETENTION_DAYS', 90)
+    cutoff, _ = _day_bounds(timezone.localdate() - timedelta(days=days))
+    deleted, _ = LearningEvent.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def course_activity(course_ids, days=30, today=None):
+    """
+    ``{course_id: {counter: total, 'active_learner_days': n}}`` over the last
+    ``days`` days, from the rollups in one grouped query.
+    """
+    today = today or timezone.localdate()
+    totals = (
+        CourseDailyActivity.objects.filter(course_id__in=course_ids, date__gt=today - timedelta(days=days))
+        .order_by().values('course_id')
+        .annotate(active_learner_days=Sum('active_learners'), **{field: Sum(field) for field in COUNTERS})
+    )
+    return {row.pop('course_id'): row for row in totals}
@@ -0,0 +1,11 @@
+from jobs.registry import task
+from .rollup import prune_events, rollup_recent
+
+@task('analytics.rollup')
+def rollup_analytics():
+    """Re-roll today and yesterday into CourseDailyActivity"""
+    rollup_recent(days=2)
+
+@task('analytics.prune', priority=-10)
+def prune_analytics():
+    prune_events()
@@ -0,0 +1,80 @@
+from datetime import date, datetime, time, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from courses.models import Category, Course
+from .models import CourseDailyActivity, LearningEvent
+from .rollup import course_activity, rollup_day
+
+DAY = date(2026, 3, 10)
+
+
+def event(event_type, course_id, user_id=None, day=DAY, hour=12):
+    return LearningEvent(
+        event_type=event_type, course_id=course_id, user_id=user_id,
+        created_at=timezone.make_aware(datetime.combine(day, time(hour))),
+    )
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        teacher = User.objects.create(username='teacher', user_type='teacher')
+        category = Category.objects.create(name='Category')
+        self.course = Course.objects.create(title='Course', description='Description', instructor=teacher, category=category)
+        self.other = Course.objects.create(title='Other', description='Description', instructor=teacher, category=category)
+        LearningEvent.objects.bulk_create([
+            event(LearningEvent.COURSE_VIEW, self.course.pk, 1),
+            event(LearningEvent.COURSE_VIEW, self.course.pk, 1),
+            event(LearningEvent.COURSE_VIEW, self.course.pk),
+            event(LearningEvent.VIDEO_START, self.course.pk, 2),
+            event(LearningEvent.VIDEO_COMPLETE, self.course.pk, 2),
+            event(LearningEvent.RATING, self.other.pk, 3),
+            # Outside the day
+            event(LearningEvent.COURSE_VIEW, self.course.pk, 4, day=DAY - timedelta(days=1), hour=23),
+            event(LearningEvent.COURSE_VIEW, self.course.pk, 4, day=DAY + timedelta(days=1), hour=0),
+        ])
+
+    def activity(self, course):
+        return CourseDailyActivity.objects.get(course=course, date=DAY)
+
+    def test_counts_one_day_per_course(self):
+        self.assertEqual(rollup_day(DAY), 2)
+        row = self.activity(self.course)
+        self.assertEqual(
+            (row.views, row.video_starts, row.video_completions, row.ratings, row.active_learners),
+            (3, 1, 1, 0, 2),
+        )
+        self.assertEqual((self.activity(self.other).ratings, self.activity(self.other).active_learners), (1, 1))
+
+    def test_rerolling_updates_rows_in_place(self):
+        rollup_day(DAY)
+        LearningEvent.objects.bulk_create([event(LearningEvent.COURSE_VIEW, self.course.pk, 5)])
+        rollup_day(DAY)
+        self.assertEqual(CourseDailyActivity.objects.filter(date=DAY).count(), 2)
+        row = self.activity(self.course)
+        self.assertEqual((row.views, row.active_learners), (4, 3))
+
+    def test_events_of_deleted_courses_get_no_row(self):
+        LearningEvent.objects.bulk_create([event(LearningEvent.COURSE_VIEW, self.other.pk + 1000, 1)])
+        rollup_day(DAY)
+        deleted_id = self.other.pk
+        self.other.delete()
+        self.assertEqual(rollup_day(DAY), 1)
+        self.assertEqual(list(CourseDailyActivity.objects.values_list('course_id', flat=True)), [self.course.pk])
+        # The raw log keeps the history
+        self.assertTrue(LearningEvent.objects.filter(course_id=deleted_id).exists())
+
+    def test_rows_without_events_are_dropped_on_reroll(self):
+        rollup_day(DAY)
+        LearningEvent.objects.filter(course_id=self.other.pk).delete()
+        rollup_day(DAY)
+        self.assertFalse(CourseDailyActivity.objects.filter(course=self.other).exists())
+
+    def test_course_activity_sums_the_window(self):
+        for offset in range(3):
+            rollup_day(DAY - timedelta(days=offset))
+        totals = course_activity([self.course.pk], days=2, today=DAY)
+        self.assertEqual(totals[self.course.pk]['views'], 4)
+        self.assertEqual(totals[self.course.pk]['active_learner_days'], 3)
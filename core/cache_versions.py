@@ -0,0 +1,43 @@
+"""
+Version counters for cache keys.
+
+Cached values are stored under keys that embed a version number; bumping the
+version makes every older entry unreachable at once, with no need to know or
+delete the individual keys. A reader that built a value from old data stores
+it under the old version, so it can never be served after the bump.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _new_version():
+    # Time-based, so a counter lost to eviction never restarts at a stale key
+    return time.time_ns() // 1000
+
+
+def get_version(name):
+    key = f'version:{name}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def versioned_key(name, *parts):
+    return ':'.join([name, str(get_version(name)), *map(str, parts)])
+
+
+def bump_version(name):
+    key = f'version:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _new_version(), timeout=None)
+
+
+def bump_version_on_commit(name):
+    """Bump once the current transaction commits, so rebuilds see the new rows"""
+    transaction.on_commit(lambda: bump_version(name))
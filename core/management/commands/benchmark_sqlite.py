@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from core.sqlite import DEFAULT_PROFILE, benchmark, tuned_profile
+
+class Command(BaseCommand):
+    help = 'Compare the read/write load SQLite sustains with its defaults and with the tuned profile in settings'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent connections')
+        parser.add_argument('--seconds', type=float, default=5, help='Duration of each run')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of operations that write')
+    
+    def handle(self, *args, **options):
+        for label, profile in (('default', DEFAULT_PROFILE), ('tuned', tuned_profile())):
+            result = benchmark(
+                profile, threads=options['threads'], seconds=options['seconds'], write_ratio=options['write_ratio'],
+            )
+            self.stdout.write(
+                f"{label:8} reads/s {result['reads_per_second']:9.1f}  writes/s {result['writes_per_second']:8.1f}  "
+                f"lock errors {result['lock_errors']:5}  read p95 {result['read_p95_ms']:7.1f} ms  "
+                f"write p95 {result['write_p95_ms']:7.1f} ms"
+            )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core.sqlite import maintain
+
+class Command(BaseCommand):
+    help = 'Checkpoint the SQLite write-ahead log into the database and refresh the query planner statistics'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias (default: default)')
+        parser.add_argument('--mode', choices=['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'], default='TRUNCATE',
+                            help='Checkpoint mode; TRUNCATE also shrinks the -wal file')
+    
+    def handle(self, *args, **options):
+        result = maintain(options['database'], options['mode'])
+        if result is None:
+            self.stdout.write(self.style.WARNING(f"{options['database']} is not an SQLite database"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Checkpointed {result['checkpointed_frames']} of {result['log_frames']} WAL frame(s)"
+            + (' (busy: readers held the rest back)' if result['busy'] else '')
+        ))
@@ -0,0 +1,161 @@
+"""
+Two-tier read-through cache of model instances by id or slug.
+
+get_cached(Course, slug=...) looks in three places before the database:
+
+1. the request's identity map, so one request fetches an object once
+   however many methods ask for it (IdentityMapMiddleware);
+2. a per-process LRU of OBJECT_CACHE_LOCAL_SIZE entries, each kept for
+   at most OBJECT_CACHE_LOCAL_TIMEOUT seconds;
+3. the shared Django cache, for OBJECT_CACHE_TIMEOUT seconds.
+
+Both tiers store the row as a tuple of column values and rebuild a fresh
+instance from it with Model.from_db(). Callers therefore never share a
+mutable object across requests. Keys embed a per-model version (see
+core/cache_versions.py). register() bumps that version when an instance is
+saved or deleted. Code that writes rows with QuerySet.update() or
+bulk_update() calls invalidate() itself.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.http import Http404
+
+from .cache_versions import bump_version_on_commit, versioned_key
+from .replicas import primary_reads
+
+_registry = {}  # model -> (lookups, attnames)
+_identity_map = ContextVar('object_identity_map', default=None)
+_MISSING = object()
+
+
+class LocalCache:
+    """Thread-safe LRU whose entries also expire after ``timeout`` seconds"""
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_local = LocalCache(
+    getattr(settings, 'OBJECT_CACHE_LOCAL_SIZE', 1000),
+    getattr(settings, 'OBJECT_CACHE_LOCAL_TIMEOUT', 30),
+)
+
+
+def _version_name(model):
+    return f'objects:{model._meta.label_lower}'
+
+
+def register(model, lookups=('pk',), exclude=()):
+    """
+    Make ``model`` cacheable by the fields in ``lookups``, which must be
+    unique. Fields in ``exclude``, such as password hashes, are left out of
+    the cache and load lazily if accessed.
+    """
+    attnames = [field.attname for field in model._meta.concrete_fields if field.name not in exclude]
+    _registry[model] = (set(lookups), attnames)
+    uid = f'object_cache:{model._meta.label_lower}'
+    post_save.connect(_invalidate_on_change, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(_invalidate_on_change, sender=model, weak=False, dispatch_uid=uid)
+
+
+def _invalidate_on_change(sender, **kwargs):
+    invalidate(sender)
+
+
+def invalidate(model):
+    """Drop every cached ``model`` instance once the current transaction commits"""
+    bump_version_on_commit(_version_name(model))
+
+
+def get_cached(model, **lookup):
+    """
+    The ``model`` instance matching the single ``field=value`` lookup (``pk``,
+    ``id`` or a registered unique field); raises model.DoesNotExist.
+    """
+    (field, value), = lookup.items()
+    field = 'pk' if field in ('id', model._meta.pk.attname) else field
+    lookups, attnames = _registry[model]
+    if field not in lookups:
+        raise ValueError(f'{model.__name__} is not cached by {field!r}')
+
+    identity_key = (model, field, str(value))
+    identity = _identity_map.get()
+    instance = identity.get(identity_key) if identity is not None else None
+    if instance is _MISSING:
+        raise model.DoesNotExist(f'No {model.__name__} with {field}={value!r}')
+    if instance is not None:
+        return instance
+
+    key = versioned_key(_version_name(model), field, value)
+    row = _local.get(key)
+    if row is None:
+        row = cache.get(key)
+        if row is None:
+            # Never cache what a lagging replica returned
+            with primary_reads():
+                rows = model._default_manager.filter(**{field: value}).order_by().values_list(*attnames)[:1]
+                row = rows[0] if rows else None
+            if row is None:
+                if identity is not None:
+                    identity[identity_key] = _MISSING
+                raise model.DoesNotExist(f'No {model.__name__} with {field}={value!r}')
+            cache.set(key, row, timeout=getattr(settings, 'OBJECT_CACHE_TIMEOUT', 60 * 60))
+        _local.set(key, row)
+
+    instance = model.from_db(DEFAULT_DB_ALIAS, attnames, row)
+    if identity is not None:
+        identity[identity_key] = instance
+        identity[(model, 'pk', str(instance.pk))] = instance
+    return instance
+
+
+def get_cached_or_404(model, **lookup):
+    try:
+        return get_cached(model, **lookup)
+    except model.DoesNotExist:
+        raise Http404(f'No {model._meta.object_name} matches the given query.')
+
+
+class IdentityMapMiddleware:
+    """Give each request its own identity map for get_cached()"""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _identity_map.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _identity_map.reset(token)
@@ -0,0 +1,100 @@
+"""
+Per-request query accounting.
+
+count_queries() hooks every database connection with an execute wrapper
+and tallies each statement the block runs. It records the total count, the
+time spent in the database, and the repeats. A repeat is a statement run
+again with the same parameters (``duplicates``), or a statement run many
+times with different parameters (``repeated``), which is the signature of
+an N+1 loop.
+
+QueryBudgetMiddleware wraps every request in count_queries(). It logs the
+views over QUERY_BUDGET_WARN_QUERIES queries or QUERY_BUDGET_WARN_DUPLICATES
+duplicates, and with QUERY_BUDGET_HEADERS (on under DEBUG) reports the
+counts in X-Query-* response headers. core/testing.py enforces a budget per
+URL name in the test suite.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()  # sql -> runs
+        self.calls = Counter()  # (sql, params) -> runs
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+            if not many:
+                self.calls[sql, repr(params)] += 1
+
+    @property
+    def duplicates(self):
+        """Statements run again with the same parameters"""
+        return sum(runs - 1 for runs in self.calls.values())
+
+    @property
+    def repeated(self):
+        """Extra runs of the most repeated statement"""
+        return max(self.statements.values(), default=1) - 1
+
+    @property
+    def milliseconds(self):
+        return self.seconds * 1000
+
+    def most_repeated(self):
+        return self.statements.most_common(1)[0] if self.statements else ('', 0)
+
+    def __str__(self):
+        return f'{self.count} queries ({self.duplicates} duplicates, {self.milliseconds:.1f} ms)'
+
+
+@contextmanager
+def count_queries():
+    """Tally the queries run in the block, on every database alias"""
+    stats = QueryStats()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        yield stats
+
+
+class QueryBudgetMiddleware:
+    """Log views that run too many or duplicate queries; optionally report the counts in headers"""
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.max_queries = getattr(settings, 'QUERY_BUDGET_WARN_QUERIES', 30)
+        self.max_duplicates = getattr(settings, 'QUERY_BUDGET_WARN_DUPLICATES', 5)
+        self.headers = getattr(settings, 'QUERY_BUDGET_HEADERS', settings.DEBUG)
+
+    def __call__(self, request):
+        with count_queries() as stats:
+            response = self.get_response(request)
+
+        if stats.count > self.max_queries or stats.duplicates > self.max_duplicates:
+            match = request.resolver_match
+            sql, runs = stats.most_repeated()
+            logger.warning(
+                '%s %s ran %s; most repeated (%d times): %s',
+                request.method, match.view_name if match else request.path, stats, runs, sql[:300],
+            )
+        if self.headers:
+            response['X-Query-Count'] = str(stats.count)
+            response['X-Query-Duplicates'] = str(stats.duplicates)
+            response['X-Query-Time-Ms'] = f'{stats.milliseconds:.1f}'
+        return response
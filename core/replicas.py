@@ -0,0 +1,142 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Writes always go to ``default``. So do reads, except inside replica_reads(),
+which the catalog and listing views enter through ReplicaReadMixin. There
+the reads go to a random alias of DATABASE_REPLICAS. Replicas lag behind the
+primary, so a few things keep the primary in charge:
+
+* a client that wrote is pinned to the primary for REPLICA_PIN_SECONDS.
+  ReplicaPinMiddleware sets a cookie for that;
+* a user whose data changed through someone else's write, such as an
+  approved enrollment, is pinned by pin_users();
+* once a request writes, its remaining reads stay on the primary;
+* cache rebuilds run inside primary_reads(). Otherwise a lagging replica
+  could be cached under a freshly bumped version.
+
+With no replicas configured every query goes to ``default``, as before.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'db_pin'
+
+# 'replica' inside replica_reads(), 'primary' inside primary_reads()
+_reads = ContextVar('replica_reads', default=None)
+# Set by the router when the current request writes
+_wrote = ContextVar('replica_wrote', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 15)
+
+
+def _pin_key(user_id):
+    return f'db:pin:{user_id}'
+
+
+def pin_users(user_ids):
+    """Send the reads of ``user_ids`` to the primary for the next REPLICA_PIN_SECONDS"""
+    if replica_aliases():
+        cache.set_many({_pin_key(user_id): True for user_id in set(user_ids)}, timeout=pin_seconds())
+
+
+def is_pinned(request):
+    """Whether the request must read from the primary to see its own recent writes"""
+    try:
+        if float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and cache.get(_pin_key(user.pk)))
+
+
+@contextmanager
+def replica_reads(pinned=False):
+    """Route the reads in the block to a replica, unless ``pinned`` or already on the primary"""
+    token = _reads.set('primary' if pinned or _reads.get() == 'primary' else 'replica')
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Route the reads in the block to the primary"""
+    token = _reads.set('primary')
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if replicas and _reads.get() == 'replica' and not _wrote.get():
+            return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        wrote = _wrote.get()
+        if wrote is not None:
+            wrote.append(model)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema by replication
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """Pin a client that wrote to the primary for REPLICA_PIN_SECONDS"""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _wrote.set([])
+        try:
+            response = self.get_response(request)
+            wrote = bool(_wrote.get())
+        finally:
+            _wrote.reset(token)
+        if wrote and replica_aliases():
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time() + pin_seconds())),
+                max_age=pin_seconds(), httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    Serve a read-only view from a replica. The response is rendered inside
+    the block, so the querysets the template evaluates are routed too.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        pinned = bool(replica_aliases()) and is_pinned(request)
+        with replica_reads(pinned=pinned):
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        return response
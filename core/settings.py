@@ -41,14 +41,21 @@ INSTALLED_APPS = [
     'courses',
     'enrollments',
     'ratings',
+    'notifications',
+    'jobs',
+    'analytics',
+    'core',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.query_budget.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.replicas.ReplicaPinMiddleware',
+    'core.object_cache.IdentityMapMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -77,13 +84,44 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Run on every new SQLite connection (see core/sqlite.py). WAL lets readers
+# carry on while a write commits; synchronous=NORMAL is durable in WAL mode
+# except for the last transactions before a power loss.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms to wait for a lock before "database is locked"
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,  # KiB of page cache per connection
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            # Take the write lock when a transaction starts, so two transactions
+            # that read and then write wait their turn instead of deadlocking.
+            # Every atomic() block here writes; see core/sqlite.py for why and
+            # for the benchmark behind it
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Catalog and listing pages may read from these aliases (see core/replicas.py).
+# A replica is declared in DATABASES and mirrors the primary in tests, e.g.
+#   'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'replica.sqlite3',
+#               'TEST': {'MIRROR': 'default'}},
+# The alias below is the primary itself and is only read from once listed in
+# DATABASE_REPLICAS; core/tests.py routes through it.
+DATABASES['replica'] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+REPLICA_PIN_SECONDS = 15  # reads stay on the primary this long after a write
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -127,6 +165,107 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lms-default',
+    }
+}
+
+# Home page snapshot lifetime in seconds; it is also invalidated on changes
+HOME_SNAPSHOT_TIMEOUT = 60 * 60
+
+# Cached curriculum index lifetime in seconds; it is also invalidated on changes
+CURRICULUM_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Course video streaming: 'django' (FileResponse / sendfile), 'x-accel-redirect' (nginx)
+# or 'x-sendfile' (Apache/lighttpd). With x-accel-redirect, VIDEO_STREAM_ACCEL_PREFIX is
+# the internal nginx location that maps to MEDIA_ROOT; keep course_videos/ out of public MEDIA_URL.
+VIDEO_STREAM_MODE = 'django'
+VIDEO_STREAM_ACCEL_PREFIX = '/protected-media/'
+VIDEO_STREAM_CHUNK_SIZE = 512 * 1024
+
+# Resumable lecture video uploads (courses/uploads.py)
+VIDEO_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+VIDEO_UPLOAD_MAX_SIZE = 10 * 1024 * 1024 * 1024
+# Unattached upload sessions older than this are removed by clean_video_uploads
+VIDEO_UPLOAD_EXPIRY_HOURS = 48
+
+# Responsive image derivatives (courses/thumbnails.py)
+THUMBNAIL_WIDTHS = (160, 320, 480, 640, 960, 1280)
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_USE_JOBS = False  # True: built by `runworker` instead of an in-process thread pool
+
+# Video watch-progress heartbeats (enrollments/heartbeats.py)
+HEARTBEAT_BUFFER = 'local'  # 'cache' to share the buffer between processes
+HEARTBEAT_FLUSH_INTERVAL = 5  # seconds
+HEARTBEAT_BATCH_SIZE = 500
+HEARTBEAT_COMPLETION_THRESHOLD = 0.9  # fraction of the video watched
+HEARTBEAT_GAP_GRACE = 60  # seconds a drain waits for an event whose append has not landed
+
+# Cached {course_id: enrollment_id} per user for access checks (enrollments/entitlements.py)
+ENTITLEMENT_CACHE_TIMEOUT = 24 * 60 * 60  # seconds; invalidated on change
+
+# Notification outbox (notifications/outbox.py), drained by `dispatch_outbox`.
+# Any Django email backend works: use smtp in production; console or
+# filebased (writes to EMAIL_FILE_PATH) for local testing.
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+DEFAULT_FROM_EMAIL = 'LMS <no-reply@localhost>'
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_DELAY = 30  # seconds after the first failure, doubling each time
+OUTBOX_LEASE_SECONDS = 300
+
+# Background job queue (jobs/queue.py), run by `runworker`
+JOB_WORKER_CONCURRENCY = 4
+JOB_POLL_INTERVAL = 1  # seconds between polls when idle
+JOB_LEASE_SECONDS = 120  # extended while a job runs; expired leases are retried
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 10  # seconds after the first failure, doubling each time
+JOB_RETENTION_DAYS = 7
+JOB_PERIODIC = {
+    'dispatch-outbox': {'task': 'notifications.dispatch_outbox', 'every': 60},
+    'purge-jobs': {'task': 'jobs.purge', 'every': 24 * 60 * 60},
+    'rollup-analytics': {'task': 'analytics.rollup', 'every': 10 * 60},
+    'prune-analytics': {'task': 'analytics.prune', 'every': 24 * 60 * 60},
+    'update-rankings': {'task': 'courses.update_rankings', 'every': 60 * 60},
+    'build-similarities': {'task': 'courses.build_similarities', 'every': 60 * 60},
+    'sqlite-maintenance': {'task': 'core.sqlite_maintenance', 'every': 60 * 60},
+}
+
+# Course ranking score (courses/ranking.py), recomputed by the jobs above
+RANKING_WEIGHTS = {'rating': 0.7, 'velocity': 0.2, 'recency': 0.1}
+RANKING_PRIOR_WEIGHT = 10  # virtual ratings at the site-wide mean
+RANKING_VELOCITY_DAYS = 30
+RANKING_RECENCY_HALF_LIFE_DAYS = 180
+
+# "Students who took this also took" (courses/recommendations.py); NumPy/SciPy are used when installed
+RECOMMENDATION_TOP_K = 10  # neighbours stored per course
+RECOMMENDATION_SHRINKAGE = 5  # shared students at which a similarity counts half
+
+# Learning event log (analytics/events.py) and its daily rollups
+ANALYTICS_FLUSH_INTERVAL = 10  # seconds
+ANALYTICS_BATCH_SIZE = 1000
+ANALYTICS_RETENTION_DAYS = 90  # raw events; the daily rollups are kept
+
+# Course, Category and User lookups by id or slug (core/object_cache.py)
+OBJECT_CACHE_TIMEOUT = 60 * 60  # shared cache
+OBJECT_CACHE_LOCAL_SIZE = 1000  # entries in each process's LRU
+OBJECT_CACHE_LOCAL_TIMEOUT = 30  # seconds before an LRU entry expires
+
+# Query accounting (core/query_budget.py): views over these limits are logged
+QUERY_BUDGET_WARN_QUERIES = 30
+QUERY_BUDGET_WARN_DUPLICATES = 5
+QUERY_BUDGET_HEADERS = DEBUG  # X-Query-Count, X-Query-Duplicates, X-Query-Time-Ms
+
+# Course catalog search backend (falls back to LIKE when FTS5 is unavailable)
+COURSE_SEARCH_BACKEND = 'courses.search.SQLiteFTS5Backend'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
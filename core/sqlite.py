@@ -0,0 +1,172 @@
+"""
+SQLite production profile: maintenance and a load benchmark.
+
+core/settings.py runs SQLITE_PRAGMAS (WAL journal, synchronous=NORMAL,
+busy_timeout, mmap, page cache, in-memory temp tables) on every new
+connection, and opens every atomic() block with BEGIN IMMEDIATE.
+
+IMMEDIATE is set for the whole connection rather than for the blocks that
+read and then write, because every atomic() block in the project writes:
+progress updates, approvals, job claims, rating aggregates, rollups and the
+rebuild commands. Under a DEFERRED transaction, a block that has read can
+no longer upgrade its lock once another connection has written. SQLite
+then fails at once with "database is locked", and busy_timeout cannot
+help. IMMEDIATE takes the write lock at BEGIN, where busy_timeout does
+apply. Reads outside atomic() run in autocommit and never issue a BEGIN.
+In WAL mode they are not blocked by the write lock either. An atomic()
+block that only reads would queue behind writers, so read-only work
+should not be wrapped in one.
+
+benchmark_sqlite compares SQLite's defaults with this whole profile. Each
+run lasts 4 s; reads run in autocommit, and each write is a
+read-then-update transaction:
+
+  8 threads, 20% writes   default   883 reads/s  175 writes/s   186 lock errors
+                          tuned    1209 reads/s  300 writes/s     0 lock errors
+  16 threads, 50% writes  default   598 reads/s  332 writes/s  1052 lock errors
+                          tuned     978 reads/s  969 writes/s     0 lock errors
+
+In WAL mode, commits append to the -wal file. SQLite folds the file back
+into the database only when a checkpoint finds no reader in the way, so
+under steady traffic the file can keep growing. maintain() forces a
+checkpoint and runs PRAGMA optimize to refresh the query planner
+statistics. The periodic ``core.sqlite_maintenance`` job runs it.
+
+benchmark() replays a mixed read/write load against a scratch database, so
+the tuned profile can be compared with SQLite's defaults
+(``benchmark_sqlite``).
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+# What Django did before SQLITE_PRAGMAS: rollback journal, deferred transactions
+DEFAULT_PROFILE = {'pragmas': {}, 'transaction_mode': 'DEFERRED'}
+
+
+def tuned_profile():
+    return {
+        'pragmas': getattr(settings, 'SQLITE_PRAGMAS', {}),
+        'transaction_mode': settings.DATABASES['default'].get('OPTIONS', {}).get('transaction_mode', 'DEFERRED'),
+    }
+
+
+def maintain(using='default', mode='TRUNCATE'):
+    """
+    Checkpoint the WAL into the database and refresh the planner
+    statistics. Returns the checkpoint result, or None if ``using`` is not
+    SQLite.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA wal_checkpoint({mode})')
+        busy, log_frames, checkpointed_frames = cursor.fetchone()
+        cursor.execute('PRAGMA optimize')
+    return {'busy': bool(busy), 'log_frames': log_frames, 'checkpointed_frames': checkpointed_frames}
+
+
+def _connect(path, profile):
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+    for name, value in profile['pragmas'].items():
+        conn.execute(f'PRAGMA {name}={value}')
+    return conn
+
+
+def _prepare(path, rows, courses):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute('CREATE TABLE progress (id INTEGER PRIMARY KEY, course_id INTEGER, percentage INTEGER, updated REAL)')
+    conn.execute('CREATE INDEX progress_course ON progress (course_id)')
+    conn.execute('BEGIN')
+    conn.executemany(
+        'INSERT INTO progress (course_id, percentage, updated) VALUES (?, ?, ?)',
+        ((random.randrange(courses), random.randrange(101), time.time()) for _ in range(rows)),
+    )
+    conn.execute('COMMIT')
+    conn.close()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def benchmark(profile, threads=8, seconds=5.0, write_ratio=0.2, rows=20000, courses=200):
+    """
+    Run ``threads`` connections for ``seconds`` against a fresh scratch
+    database. Reads are catalog-style grouped scans of a course range;
+    writes read a progress row and then update it in one transaction, as
+    the progress views do. Returns throughput, lock errors and p95 latency.
+    """
+    directory = tempfile.mkdtemp(prefix='sqlite-bench-')
+    path = os.path.join(directory, 'bench.sqlite3')
+    _prepare(path, rows, courses)
+    begin = f"BEGIN {profile['transaction_mode']}"
+    results = {'reads': [], 'writes': [], 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def work():
+        conn = _connect(path, profile)
+        reads, writes, errors = [], [], 0
+        try:
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                try:
+                    if random.random() < write_ratio:
+                        row_id = random.randrange(1, rows + 1)
+                        conn.execute(begin)
+                        try:
+                            (percentage,) = conn.execute('SELECT percentage FROM progress WHERE id = ?', (row_id,)).fetchone()
+                            conn.execute(
+                                'UPDATE progress SET percentage = ?, updated = ? WHERE id = ?',
+                                (min(percentage + 1, 100), time.time(), row_id),
+                            )
+                            conn.execute('COMMIT')
+                        except BaseException:
+                            conn.execute('ROLLBACK')
+                            raise
+                        writes.append(time.monotonic() - started)
+                    else:
+                        low = random.randrange(courses)
+                        conn.execute(
+                            'SELECT course_id, COUNT(*), AVG(percentage) FROM progress '
+                            'WHERE course_id BETWEEN ? AND ? GROUP BY course_id',
+                            (low, low + 10),
+                        ).fetchall()
+                        reads.append(time.monotonic() - started)
+                except sqlite3.OperationalError:
+                    # "database is locked": the request would have failed
+                    errors += 1
+        finally:
+            conn.close()
+        with lock:
+            results['reads'].extend(reads)
+            results['writes'].extend(writes)
+            results['errors'] += errors
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+    return {
+        'reads_per_second': len(results['reads']) / seconds,
+        'writes_per_second': len(results['writes']) / seconds,
+        'lock_errors': results['errors'],
+        'read_p95_ms': _percentile(results['reads'], 0.95) * 1000,
+        'write_p95_ms': _percentile(results['writes'], 0.95) * 1000,
+    }
@@ -0,0 +1,7 @@
+from jobs.registry import task
+from .sqlite import maintain
+
+@task('core.sqlite_maintenance', priority=-10)
+def sqlite_maintenance():
+    """Checkpoint the WAL and run PRAGMA optimize"""
+    maintain()
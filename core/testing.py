@@ -0,0 +1,212 @@
+"""
+Query budgets for the test suite.
+
+QueryBudgetMixin requests every URL name of an app against a synthetic
+dataset large enough that an N+1 loop shows up as dozens of extra queries.
+It fails when a request runs more queries, or more duplicate queries, than
+the URL's Budget allows. It also fails when a URL name has neither a budget
+nor an exemption, so a new view cannot ship unmeasured.
+
+    class CourseQueryBudgetTests(QueryBudgetMixin, TestCase):
+        urls_module = 'courses.urls'
+        budgets = {
+            'course_list': Budget(6),
+            'course_detail': Budget(12, user='student', kwargs=lambda data: {'slug': data.course.slug}),
+        }
+
+Each request starts with an empty cache, so the budget is the cold-cache
+cost of the page.
+"""
+import hashlib
+import random
+import shutil
+import tempfile
+from importlib import import_module
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .query_budget import count_queries
+
+
+class Budget:
+    """At most ``queries`` queries (``duplicates`` of them repeats) for one request"""
+    def __init__(self, queries, user=None, kwargs=None, method='get', data=None, status=200, duplicates=0,
+                 content_type=None, headers=None):
+        self.queries = queries
+        self.user = user
+        self.kwargs = kwargs
+        self.method = method
+        self.data = data
+        self.status = status
+        self.duplicates = duplicates
+        self.content_type = content_type
+        self.headers = headers
+
+
+class SyntheticData:
+    """
+    A catalog of ``teachers * courses_per_teacher`` courses with modules,
+    videos, posts, enrollments, progress and ratings. The named objects are
+    the ones the budgets request: ``course`` (taught by ``teacher``, with
+    every student enrolled), its ``module``, ``video`` and ``post``,
+    ``student`` (enrolled, with progress, has not rated ``course``),
+    ``newcomer`` (enrolled nowhere) and ``staff``.
+    """
+    def __init__(self, categories=8, teachers=5, courses_per_teacher=10, modules=5, videos=6, posts=8,
+                 students=100, enrollments_per_student=12, seed=1):
+        from accounts.models import User
+        from courses.models import Category, Course, CourseStats, Module, Post, Video
+        from courses.uploads import start_upload
+        from enrollments.models import Enrollment, EnrollmentRequest, VideoProgress
+        from ratings.aggregates import rebuild_rating_aggregates
+        from ratings.models import Rating
+
+        rng = random.Random(seed)
+        now = timezone.now()
+
+        self.categories = Category.objects.bulk_create([Category(name=f'Category {i}') for i in range(categories)])
+        teachers = User.objects.bulk_create([
+            User(username=f'teacher{i}', first_name='Teacher', last_name=str(i), user_type='teacher')
+            for i in range(teachers)
+        ])
+        students = User.objects.bulk_create([
+            User(username=f'student{i}', first_name='Student', last_name=str(i), email=f'student{i}@example.com')
+            for i in range(students + 1)
+        ])
+        self.staff = User.objects.create(username='staff', user_type='admin', is_staff=True)
+        self.teacher, self.student, self.newcomer = teachers[0], students[0], students.pop()
+
+        courses = [
+            Course.objects.create(
+                title=f'Course {teacher.pk}-{i}', description='Description', short_description='Short',
+                instructor=teacher, category=rng.choice(self.categories), is_published=True,
+            )
+            for teacher in teachers for i in range(courses_per_teacher)
+        ]
+        self.course = courses[0]
+        module_rows = Module.objects.bulk_create([
+            Module(course=course, title=f'Module {i}', order=i) for course in courses for i in range(modules)
+        ])
+        videos_by_course = {}
+        video_rows = Video.objects.bulk_create([
+            Video(module=module, title=f'Video {i}', video_file=f'course_videos/{module.pk}-{i}.mp4',
+                  duration_minutes=10, order=i, is_free=i == 0)
+            for module in module_rows for i in range(videos)
+        ])
+        for video in video_rows:
+            videos_by_course.setdefault(video.module.course_id, []).append(video)
+        self.module = module_rows[0]
+        self.video = videos_by_course[self.course.pk][1]
+        self.video.video_file.save('clip.mp4', ContentFile(b'0' * 1024))
+        Post.objects.bulk_create([
+            Post(course=course, author=course.instructor, title=f'Post {i}', content='Content', is_pinned=i == 0)
+            for course in courses for i in range(posts)
+        ])
+        self.post = self.course.posts.first()
+
+        pairs = [
+            (student, course)
+            for student in students
+            for course in [self.course] + rng.sample(courses[1:], enrollments_per_student - 1)
+        ]
+        requests = EnrollmentRequest.objects.bulk_create([
+            EnrollmentRequest(student=student, course=course, status='approved', phone_number='0100',
+                              email=student.email, reviewed_at=now)
+            for student, course in pairs
+        ])
+        enrollments = Enrollment.objects.bulk_create([
+            Enrollment(student=request.student, course=request.course, enrollment_request=request,
+                       progress_percentage=rng.randrange(101))
+            for request in requests
+        ])
+        VideoProgress.objects.bulk_create([
+            VideoProgress(enrollment=enrollment, video=video, watched_duration=60, is_completed=rng.random() < 0.5)
+            for enrollment in enrollments if enrollment.course_id == self.course.pk
+            for video in videos_by_course[self.course.pk]
+        ])
+        Rating.objects.bulk_create([
+            Rating(student=enrollment.student, course=enrollment.course, score=rng.randint(1, 5), review='Review')
+            for enrollment in enrollments
+            if rng.random() < 0.5 and not (enrollment.student == self.student and enrollment.course == self.course)
+        ])
+        CourseStats.objects.rebuild()
+        rebuild_rating_aggregates()
+        self.upload = start_upload(self.module, self.teacher, 'clip.mp4', 10)
+
+
+class QueryBudgetMixin:
+    """Checks ``budgets`` ({url name: Budget}) for the URL names of ``urls_module``; see the module docstring"""
+    urls_module = None
+    budgets = {}
+    exempt = {}  # url name -> why it is not measured
+    dataset_options = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media_root = tempfile.mkdtemp(prefix='query-budget-')
+        cls._settings = override_settings(
+            MEDIA_ROOT=cls._media_root,
+            ANALYTICS_AUTOFLUSH=False,
+            HEARTBEAT_AUTOFLUSH=False,
+        )
+        cls._settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._settings.disable()
+        shutil.rmtree(cls._media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.data = SyntheticData(**cls.dataset_options)
+
+    def url_names(self):
+        return [pattern.name for pattern in import_module(self.urls_module).urlpatterns if pattern.name]
+
+    def test_every_url_has_a_budget(self):
+        missing = set(self.url_names()) - set(self.budgets) - set(self.exempt)
+        self.assertFalse(missing, f'No query budget declared for {sorted(missing)}')
+
+    def request(self, name, budget):
+        namespace = import_module(self.urls_module).app_name
+        kwargs = budget.kwargs(self.data) if callable(budget.kwargs) else budget.kwargs
+        data = budget.data(self.data) if callable(budget.data) else budget.data
+        self.client.logout()
+        if budget.user:
+            self.client.force_login(getattr(self.data, budget.user))
+        cache.clear()
+
+        options = {'headers': budget.headers or {}}
+        if budget.content_type:
+            options['content_type'] = budget.content_type
+        with count_queries() as stats:
+            response = getattr(self.client, budget.method)(reverse(f'{namespace}:{name}', kwargs=kwargs), data, **options)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, stats
+
+    def test_query_budgets(self):
+        for name, budget in self.budgets.items():
+            with self.subTest(url=name):
+                response, stats = self.request(name, budget)
+                self.assertEqual(response.status_code, budget.status)
+                sql, runs = stats.most_repeated()
+                self.assertLessEqual(
+                    stats.count, budget.queries,
+                    f'{name} ran {stats}; most repeated ({runs} times): {sql}',
+                )
+                self.assertLessEqual(
+                    stats.duplicates, budget.duplicates,
+                    f'{name} ran {stats}; most repeated ({runs} times): {sql}',
+                )
+
+
+def chunk_headers(content):
+    return {'X-Chunk-SHA256': hashlib.sha256(content).hexdigest()}
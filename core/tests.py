@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from courses.models import Category, Course
+from .replicas import PIN_COOKIE, pin_users, replica_reads
+
+
+# The 'replica' alias mirrors the test database. A TestCase would hold the
+# rows it creates in an open transaction the replica connection cannot see.
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create(username='teacher', user_type='teacher')
+        self.course = Course.objects.create(
+            title='Course', description='Description', instructor=teacher, is_published=True,
+            category=Category.objects.create(name='Category'),
+        )
+        self.student = User.objects.create(username='student')
+        self.client.force_login(self.student)
+
+    def queries(self, method, url, data=None):
+        with CaptureQueriesContext(connections['replica']) as replica, \
+                CaptureQueriesContext(connections['default']) as primary:
+            response = getattr(self.client, method)(url, data)
+        return response, len(replica), len(primary)
+
+    def test_catalog_pages_read_from_the_replica(self):
+        response, replica, primary = self.queries('get', reverse('courses:course_list'))
+        self.assertEqual(list(response.context['courses']), [self.course])
+        self.assertGreater(replica, 0)
+
+        response, replica, primary = self.queries('get', self.course.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(replica, 0)
+
+    def test_other_pages_read_from_the_primary(self):
+        response, replica, primary = self.queries('get', reverse('enrollments:my_courses'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, 0)
+
+    def test_writes_and_locking_reads_stay_on_the_primary(self):
+        with replica_reads():
+            with CaptureQueriesContext(connections['replica']) as replica:
+                Category.objects.create(name='Other')
+                with transaction.atomic():
+                    locked = list(Course.objects.select_for_update().filter(pk=self.course.pk))
+        self.assertEqual(locked, [self.course])
+        self.assertEqual(len(replica), 0)
+
+    def test_client_that_wrote_is_pinned_to_the_primary(self):
+        response, replica, primary = self.queries(
+            'post', reverse('enrollments:request_enrollment', args=[self.course.slug]),
+            {'phone_number': '0100', 'email': 'student@example.com', 'message': ''},
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response, replica, primary = self.queries('get', self.course.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, 0)
+
+    def test_pinned_user_reads_from_the_primary(self):
+        pin_users([self.student.pk])
+        response, replica, primary = self.queries('get', reverse('courses:course_list'))
+        self.assertEqual(list(response.context['courses']), [self.course])
+        self.assertEqual(replica, 0)
@@ -15,7 +15,8 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.http import Http404
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from courses import views
@@ -29,6 +30,11 @@ urlpatterns = [
     path('', views.HomeView.as_view(), name='home'),
 ]
 
+def protected_media(request, path):
+    raise Http404('Course videos are served by courses:video_stream.')
+
 if settings.DEBUG:
+    # Videos go through the entitlement-checked streaming view, never as plain media
+    urlpatterns += [re_path(r'^%scourse_videos/(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), protected_media)]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
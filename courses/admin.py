@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Course, Module, Video, Assignment
+from .models import Category, Course, CourseStats, MediaBlob, Module, Video, VideoUpload, Assignment
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -35,8 +35,27 @@ class VideoAdmin(admin.ModelAdmin):
     list_filter = ['is_free', 'module__course']
     search_fields = ['title', 'module__title']
 
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'reference_count', 'created_at']
+    search_fields = ['name', 'sha256']
+    readonly_fields = ['name', 'sha256', 'size', 'reference_count', 'upload_fingerprint']
+
+@admin.register(VideoUpload)
+class VideoUploadAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'module', 'uploaded_by', 'total_size', 'status', 'updated_at']
+    list_filter = ['status']
+    search_fields = ['filename', 'uploaded_by__username']
+    readonly_fields = ['module', 'uploaded_by', 'video', 'filename', 'total_size', 'chunk_size', 'file_name']
+
 @admin.register(Assignment)
 class AssignmentAdmin(admin.ModelAdmin):
     list_display = ['title', 'module', 'due_date', 'max_score']
     list_filter = ['module__course', 'due_date']
     search_fields = ['title', 'module__title']
+
+@admin.register(CourseStats)
+class CourseStatsAdmin(admin.ModelAdmin):
+    list_display = ['course', 'enrollment_count', 'module_count', 'video_count', 'total_video_minutes']
+    search_fields = ['course__title']
+    readonly_fields = ['course', 'enrollment_count', 'module_count', 'video_count', 'total_video_minutes']
@@ -0,0 +1,78 @@
+"""
+Cached per-course curriculum index.
+
+Holds the module/video order of a course as plain data, so the video player
+sidebar and previous/next navigation need no queries on a cache hit. The
+index is versioned per course and bumped whenever a Module or Video of the
+course is saved, reordered or deleted (see courses/models.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from core.cache_versions import bump_version_on_commit, versioned_key
+from core.replicas import primary_reads
+
+
+def _version_name(course_id):
+    return f'curriculum:{course_id}'
+
+
+class Curriculum:
+    def __init__(self, course_id, modules):
+        self.course_id = course_id
+        # [{'id', 'title', 'video_count', 'videos': [{'id', 'title', 'duration_minutes', 'is_free'}]}]
+        self.modules = modules
+        self.sequence = [video for module in modules for video in module['videos']]
+        self.positions = {video['id']: index for index, video in enumerate(self.sequence)}
+
+    def __getstate__(self):
+        return {'course_id': self.course_id, 'modules': self.modules}
+
+    def __setstate__(self, state):
+        self.__init__(state['course_id'], state['modules'])
+
+    @property
+    def video_count(self):
+        return len(self.sequence)
+
+    def neighbours(self, video_id):
+        """(previous, next) video dicts around ``video_id``; None at either end"""
+        index = self.positions.get(video_id)
+        if index is None:
+            return None, None
+        previous_video = self.sequence[index - 1] if index > 0 else None
+        next_video = self.sequence[index + 1] if index + 1 < len(self.sequence) else None
+        return previous_video, next_video
+
+
+def build_curriculum(course_id):
+    from .models import Module, Video
+
+    modules = {
+        module['id']: dict(module, videos=[])
+        for module in Module.objects.filter(course_id=course_id).order_by('order', 'id').values('id', 'title')
+    }
+    videos = Video.objects.filter(module__course_id=course_id).order_by('order', 'id').values(
+        'id', 'title', 'duration_minutes', 'is_free', 'module_id'
+    )
+    for video in videos:
+        modules[video.pop('module_id')]['videos'].append(video)
+    for module in modules.values():
+        module['video_count'] = len(module['videos'])
+    return Curriculum(course_id, list(modules.values()))
+
+
+def get_curriculum(course_id):
+    key = versioned_key(_version_name(course_id))
+    curriculum = cache.get(key)
+    if curriculum is None:
+        # Never cache what a lagging replica returned
+        with primary_reads():
+            curriculum = build_curriculum(course_id)
+        cache.set(key, curriculum, timeout=getattr(settings, 'CURRICULUM_CACHE_TIMEOUT', 60 * 60 * 24))
+    return curriculum
+
+
+def invalidate_curriculum(*course_ids):
+    for course_id in set(course_ids):
+        if course_id is not None:
+            bump_version_on_commit(_version_name(course_id))
@@ -1,5 +1,6 @@
 from django import forms
-from .models import Course, Module, Video, Post, Category
+from .models import Course, Module, Video, VideoUpload, Post, Category
+from .uploads import upload_chunk_size
 
 class CourseForm(forms.ModelForm):
     class Meta:
@@ -32,12 +33,35 @@ class ModuleForm(forms.ModelForm):
             field.widget.attrs['class'] = 'form-control'
 
 class VideoForm(forms.ModelForm):
+    # Set by the chunked uploader (static/js/chunked_upload.js) instead of posting the file
+    upload_id = forms.UUIDField(required=False, widget=forms.HiddenInput)
+    
     class Meta:
         model = Video
         fields = ['title', 'description', 'video_file', 'duration_minutes', 'order', 'is_free']
         widgets = {
             'description': forms.Textarea(attrs={'rows': 3}),
         }
+    
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        self.fields['video_file'].required = False
+        # The uploader fingerprints files by chunks of this size
+        self.fields['upload_id'].widget.attrs['data-chunk-size'] = upload_chunk_size()
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        upload_id = cleaned_data.get('upload_id')
+        cleaned_data['upload'] = None
+        if upload_id:
+            upload = VideoUpload.objects.filter(pk=upload_id, uploaded_by=self.user, status='complete').first()
+            if upload is None:
+                self.add_error('video_file', 'The uploaded video could not be found; please upload it again.')
+            cleaned_data['upload'] = upload
+        elif not cleaned_data.get('video_file') and not self.instance.video_file:
+            self.add_error('video_file', 'Please choose a video file.')
+        return cleaned_data
 
 class PostForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from courses.recommendations import build_similarities
+
+class Command(BaseCommand):
+    help = 'Recompute the "students who took this also took" similarities of the courses whose enrollments or ratings changed'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every course, changed or not')
+    
+    def handle(self, *args, **options):
+        refreshed = build_similarities(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed the similar courses of {refreshed} course(s)'))
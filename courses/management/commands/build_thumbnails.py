@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from accounts.models import User
+from courses.models import Course
+from courses.thumbnails import build_many
+
+class Command(BaseCommand):
+    help = 'Build responsive WebP/JPEG derivatives of course thumbnails and profile pictures'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Number of worker threads')
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that already exist')
+    
+    def handle(self, *args, **options):
+        names = set(Course.objects.exclude(thumbnail='').exclude(thumbnail=None).values_list('thumbnail', flat=True))
+        names |= set(User.objects.exclude(profile_picture='').exclude(profile_picture=None).values_list('profile_picture', flat=True))
+        built, failed = build_many(sorted(names), workers=options['workers'], force=options['force'])
+        self.stdout.write(self.style.SUCCESS(f'Built thumbnails for {built} images ({failed} failed)'))
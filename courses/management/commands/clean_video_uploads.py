@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from courses.models import VideoUpload
+from courses.uploads import discard_upload
+
+class Command(BaseCommand):
+    help = 'Delete abandoned or never attached chunked video uploads and their files'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=getattr(settings, 'VIDEO_UPLOAD_EXPIRY_HOURS', 48),
+            help='Remove sessions untouched for this many hours',
+        )
+    
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = VideoUpload.objects.filter(updated_at__lt=cutoff).exclude(status='attached')
+        removed = 0
+        for upload in stale.iterator():
+            discard_upload(upload)
+            removed += 1
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} stale video uploads'))
@@ -0,0 +1,52 @@
+import os
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from courses.models import MediaBlob
+from courses.storage import MEDIA_FIELDS, count_references, media_storage
+
+class Command(BaseCommand):
+    help = 'Move media files uploaded before content-addressed storage into it, merging duplicates'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the files that would move')
+    
+    def handle(self, *args, **options):
+        storage = media_storage()
+        known = set(MediaBlob.objects.values_list('name', flat=True))
+        moved = missing = 0
+        
+        for label, field in MEDIA_FIELDS:
+            model = apps.get_model(label)
+            names = set(
+                model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                .values_list(field, flat=True)
+            ) - known
+            for name in sorted(names):
+                if not os.path.exists(storage.path(name)):
+                    missing += 1
+                    self.stdout.write(self.style.WARNING(f'Missing file: {name}'))
+                    continue
+                moved += 1
+                if options['dry_run']:
+                    self.stdout.write(f'Would move {name}')
+                    continue
+                with transaction.atomic():
+                    blob_name = storage.adopt(storage.path(name), name)
+                    # Every row sharing the legacy name follows it
+                    for other_label, other_field in MEDIA_FIELDS:
+                        apps.get_model(other_label).objects.filter(**{other_field: name}).update(**{other_field: blob_name})
+                known.add(blob_name)
+                self.stdout.write(f'{name} -> {blob_name}')
+        
+        if not options['dry_run']:
+            counts = count_references()
+            for blob in MediaBlob.objects.all():
+                if blob.reference_count != counts.get(blob.name, 0):
+                    MediaBlob.objects.filter(pk=blob.pk).update(reference_count=counts.get(blob.name, 0))
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} files into the content-addressed store ({missing} missing); '
+            f'run build_thumbnails to rebuild image sizes for the new names'
+        ))
@@ -0,0 +1,57 @@
+import os
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from courses.models import MediaBlob, VideoUpload
+from courses.storage import INCOMING_DIR, count_references, media_storage
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed media blobs that no row references any more'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24, help='Keep unreferenced blobs younger than this')
+        parser.add_argument('--recount', action='store_true', help='Recompute reference counts from the file fields first')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+    
+    def handle(self, *args, **options):
+        storage = media_storage()
+        
+        if options['recount']:
+            counts = count_references()
+            with transaction.atomic():
+                blobs = list(MediaBlob.objects.all())
+                for blob in blobs:
+                    blob.reference_count = counts.get(blob.name, 0)
+                MediaBlob.objects.bulk_update(blobs, ['reference_count'], batch_size=500)
+            self.stdout.write(f'Recounted references of {len(blobs)} blobs')
+        
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        # Assembled uploads not yet attached to a video still need their blob
+        pending = VideoUpload.objects.filter(status='complete').values_list('file_name', flat=True)
+        orphans = MediaBlob.objects.filter(reference_count__lte=0, created_at__lt=cutoff).exclude(name__in=pending)
+        
+        # Counts can drift (e.g. rows changed with queryset.update()); never trust them alone
+        live = count_references()
+        removed = freed = 0
+        for blob in orphans.iterator():
+            if live.get(blob.name):
+                MediaBlob.objects.filter(pk=blob.pk).update(reference_count=live[blob.name])
+                continue
+            removed += 1
+            freed += blob.size
+            if not options['dry_run']:
+                storage.delete(blob.name)
+                blob.delete()
+        
+        # Temporary files of uploads that died half way
+        incoming = os.path.join(storage.location, INCOMING_DIR)
+        if os.path.isdir(incoming) and not options['dry_run']:
+            for entry in os.scandir(incoming):
+                if entry.is_file() and entry.stat().st_mtime < time.time() - options['grace_hours'] * 3600:
+                    os.remove(entry.path)
+        
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {removed} unreferenced blobs ({freed / 1024 / 1024:.1f} MB)'))
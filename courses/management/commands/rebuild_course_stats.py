@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from courses.models import CourseStats
+
+class Command(BaseCommand):
+    help = 'Recompute the enrollment, module, video and content-minute counters of every course'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='course_ids',
+                            help='Only rebuild this course id (can be repeated)')
+    
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuilt = CourseStats.objects.rebuild(options['course_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {rebuilt} course(s)'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from courses.search import get_search_backend
+
+class Command(BaseCommand):
+    help = 'Rebuild the course catalog full-text search index'
+    
+    def handle(self, *args, **options):
+        backend = get_search_backend(fallback=False)
+        with transaction.atomic():
+            indexed = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} course(s) with {type(backend).__name__}'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from courses.ranking import update_rankings
+
+class Command(BaseCommand):
+    help = 'Recompute the ranking score (Bayesian rating, enrollment velocity, recency) of every course'
+    
+    def handle(self, *args, **options):
+        changed = update_rankings()
+        self.stdout.write(self.style.SUCCESS(f'Updated the ranking score of {changed} course(s)'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from courses.snapshots import rebuild_home_snapshot
+
+class Command(BaseCommand):
+    help = 'Rebuild the cached home page snapshot ahead of the next request'
+    
+    def handle(self, *args, **options):
+        snapshot = rebuild_home_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"Home snapshot rebuilt ({len(snapshot['featured_courses'])} featured courses)"
+        ))
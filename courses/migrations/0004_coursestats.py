@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_course_stats(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    CourseStats = apps.get_model('courses', 'CourseStats')
+    Enrollment = apps.get_model('enrollments', 'Enrollment')
+    Module = apps.get_model('courses', 'Module')
+    Video = apps.get_model('courses', 'Video')
+
+    stats = {pk: CourseStats(course_id=pk) for pk in Course.objects.values_list('pk', flat=True)}
+    for row in Enrollment.objects.order_by().values('course_id').annotate(total=Count('id')):
+        stats[row['course_id']].enrollment_count = row['total']
+    for row in Module.objects.order_by().values('course_id').annotate(total=Count('id')):
+        stats[row['course_id']].module_count = row['total']
+    for row in Video.objects.order_by().values('module__course_id').annotate(total=Count('id'), minutes=Sum('duration_minutes')):
+        stats[row['module__course_id']].video_count = row['total']
+        stats[row['module__course_id']].total_video_minutes = row['minutes'] or 0
+    CourseStats.objects.bulk_create(stats.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_course_rating_aggregates'),
+        ('enrollments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='courses.course')),
+                ('enrollment_count', models.PositiveIntegerField(default=0)),
+                ('module_count', models.PositiveIntegerField(default=0)),
+                ('video_count', models.PositiveIntegerField(default=0)),
+                ('total_video_minutes', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Course stats',
+            },
+        ),
+        migrations.RunPython(backfill_course_stats, migrations.RunPython.noop),
+    ]
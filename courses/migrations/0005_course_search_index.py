@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:20
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+FTS_TABLE = 'courses_course_fts'
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite-only and optional; the LIKE backend is used when it is missing
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Course = apps.get_model('courses', 'Course')
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"title, description, instructor, tokenize='unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            return
+        rows = [
+            (course.pk, course.title, course.description,
+             f'{course.instructor.username} {course.instructor.first_name} {course.instructor.last_name}'.strip())
+            for course in Course.objects.select_related('instructor')
+        ]
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, instructor) VALUES (%s, %s, %s, %s)',
+            rows,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_coursestats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
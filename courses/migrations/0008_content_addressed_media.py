@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:19
+
+import courses.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_videoupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField()),
+                ('reference_count', models.IntegerField(default=0)),
+                ('upload_fingerprint', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, storage=courses.storage.media_storage, upload_to='course_thumbnails/'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='attachment',
+            field=models.FileField(blank=True, null=True, storage=courses.storage.media_storage, upload_to='course_posts/'),
+        ),
+        migrations.AlterField(
+            model_name='video',
+            name='video_file',
+            field=models.FileField(storage=courses.storage.media_storage, upload_to='course_videos/'),
+        ),
+    ]
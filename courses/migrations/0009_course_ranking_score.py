@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_ranking_scores(apps, schema_editor):
+    from courses.ranking import _update_rankings
+    _update_rankings(apps.get_model('courses', 'Course'), apps.get_model('enrollments', 'Enrollment'), timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_content_addressed_media'),
+        ('enrollments', '0002_enrollment_completed_videos_count'),
+        ('ratings', '0002_backfill_course_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='ranking_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-ranking_score', '-id'], name='course_ranking_keyset_idx'),
+        ),
+        migrations.RunPython(backfill_ranking_scores, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,21 @@
+import math
+import os
+import uuid
 from django.db import models
 from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count, F, Sum
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils.text import slugify
 from django.urls import reverse
+from core import object_cache
+from .search import get_search_backend
+from .snapshots import invalidate_home_snapshot
+from .curriculum import invalidate_curriculum
+from .ranking import initial_ranking_score
+from .thumbnails import get_manifest, schedule_thumbnails
+from .storage import media_storage, stored_media, update_media_references
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -31,7 +45,7 @@ class Course(models.Model):
         related_name='courses_taught'
     )
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
-    thumbnail = models.ImageField(upload_to='course_thumbnails/', blank=True, null=True)
+    thumbnail = models.ImageField(upload_to='course_thumbnails/', storage=media_storage, blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     difficulty = models.CharField(max_length=20, choices=DIFFICULTY_CHOICES, default='beginner')
     duration_weeks = models.PositiveIntegerField(default=4)
@@ -39,10 +53,41 @@ class Course(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Rating aggregates, maintained by the ratings app (see ratings/aggregates.py)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_average = models.FloatField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+    # Bayesian rating blended with enrollment velocity and recency (see courses/ranking.py)
+    ranking_score = models.FloatField(default=0, editable=False)
+    
+    # Written with F() expressions by other apps; never overwritten by a plain save()
+    DENORMALIZED_FIELDS = (
+        'rating_count', 'rating_sum', 'rating_average',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+        'ranking_score',
+    )
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the listings (see courses/pagination.py)
+            models.Index(fields=['-created_at', '-id'], name='course_created_keyset_idx'),
+            models.Index(fields=['-rating_average', '-id'], name='course_rating_keyset_idx'),
+            models.Index(fields=['-ranking_score', '-id'], name='course_ranking_keyset_idx'),
+        ]
     
     def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DENORMALIZED_FIELDS
+            ]
+        
         if not self.slug:
             base_slug = slugify(self.title)
             if not base_slug:  # If title has no ASCII characters
@@ -56,8 +101,17 @@ class Course(models.Model):
                 counter += 1
             
             self.slug = slug
+        if self._state.adding and not self.ranking_score:
+            # Rank at the mean until the periodic job rescores it
+            self.ranking_score = initial_ranking_score()
         super().save(*args, **kwargs)
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_media = stored_media(instance, 'thumbnail')
+        return instance
+    
     def get_absolute_url(self):
         return reverse('courses:course_detail', kwargs={'slug': self.slug})
     
@@ -66,14 +120,35 @@ class Course(models.Model):
     
     @property
     def average_rating(self):
-        ratings = self.ratings.all()
-        if ratings:
-            return sum(rating.score for rating in ratings) / len(ratings)
-        return 0
+        return self.rating_average
+    
+    @property
+    def rating_histogram(self):
+        """Number of ratings per star, as {5: n, 4: n, ..., 1: n}"""
+        return {star: getattr(self, f'rating_{star}_count') for star in range(5, 0, -1)}
+    
+    def _stat(self, name):
+        try:
+            return getattr(self.stats, name)
+        except ObjectDoesNotExist:
+            # Row not built yet (run rebuild_course_stats); count live instead
+            return getattr(CourseStats.objects.compute([self.pk]).get(self.pk), name, 0)
     
     @property
     def total_students(self):
-        return self.enrollments.count()
+        return self._stat('enrollment_count')
+    
+    @property
+    def total_modules(self):
+        return self._stat('module_count')
+    
+    @property
+    def total_videos(self):
+        return self._stat('video_count')
+    
+    @property
+    def total_minutes(self):
+        return self._stat('total_video_minutes')
 
 class Module(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='modules')
@@ -87,6 +162,12 @@ class Module(models.Model):
     
     def __str__(self):
         return f"{self.title} - {self.course.title}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_course_id = instance.__dict__.get('course_id')
+        return instance
 
 class Post(models.Model):
     POST_TYPES = [
@@ -105,7 +186,7 @@ class Post(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
     post_type = models.CharField(max_length=20, choices=POST_TYPES, default='announcement')
-    attachment = models.FileField(upload_to='course_posts/', blank=True, null=True)
+    attachment = models.FileField(upload_to='course_posts/', storage=media_storage, blank=True, null=True)
     is_pinned = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -115,12 +196,18 @@ class Post(models.Model):
     
     def __str__(self):
         return f"{self.course.title} - {self.title}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_media = stored_media(instance, 'attachment')
+        return instance
 
 class Video(models.Model):
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='videos')
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
-    video_file = models.FileField(upload_to='course_videos/')
+    video_file = models.FileField(upload_to='course_videos/', storage=media_storage)
     duration_minutes = models.PositiveIntegerField(default=0)
     order = models.PositiveIntegerField(default=0)
     is_free = models.BooleanField(default=False)
@@ -131,6 +218,15 @@ class Video(models.Model):
     
     def __str__(self):
         return f"{self.module.course.title} - {self.title}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so an edit can be applied to CourseStats as a delta
+        instance._stored_module_id = instance.__dict__.get('module_id')
+        instance._stored_duration = instance.__dict__.get('duration_minutes')
+        instance._stored_media = stored_media(instance, 'video_file')
+        return instance
 
 class Assignment(models.Model):
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='assignments')
@@ -142,3 +238,290 @@ class Assignment(models.Model):
     
     def __str__(self):
         return f"{self.module.course.title} - {self.title}"
+
+class VideoUpload(models.Model):
+    """A resumable chunked upload session for a lecture video (see courses/uploads.py)"""
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+        ('attached', 'Attached'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='uploads')
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='video_uploads'
+    )
+    video = models.ForeignKey(Video, on_delete=models.SET_NULL, null=True, blank=True, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    file_name = models.CharField(max_length=255, blank=True)  # storage name once assembled
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+    
+    @property
+    def total_chunks(self):
+        return max(math.ceil(self.total_size / self.chunk_size), 1)
+    
+    @property
+    def partial_path(self):
+        return os.path.join(settings.MEDIA_ROOT, 'course_videos', '.partial', f'{self.id}.part')
+    
+    def chunk_length(self, index):
+        if index == self.total_chunks - 1:
+            return self.total_size - index * self.chunk_size
+        return self.chunk_size
+
+class VideoUploadChunk(models.Model):
+    upload = models.ForeignKey(VideoUpload, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+    received_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['upload', 'index']
+        ordering = ['index']
+    
+    def __str__(self):
+        return f"Chunk {self.index} of {self.upload.filename}"
+
+class MediaBlob(models.Model):
+    """A file in the content-addressed media store (see courses/storage.py)"""
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    reference_count = models.IntegerField(default=0)
+    # Digest of the chunk checksums of a chunked upload, to skip re-uploads
+    upload_fingerprint = models.CharField(max_length=100, blank=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.reference_count} refs)"
+
+class CourseStatsManager(models.Manager):
+    def adjust(self, course_id=None, module_id=None, **deltas):
+        """
+        Apply counter deltas to the stats row of a course, given either the
+        course id or the id of one of its modules, in a single UPDATE.
+        """
+        updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if not updates:
+            return 0
+        if course_id is not None:
+            rows = self.filter(course_id=course_id)
+        else:
+            rows = self.filter(course__modules=module_id)
+        return rows.update(**updates)
+    
+    def compute(self, course_ids=None):
+        """Count everything live; returns {course_id: unsaved CourseStats}"""
+        from enrollments.models import Enrollment
+        
+        courses = Course.objects.all()
+        enrollments = Enrollment.objects.order_by()
+        modules = Module.objects.order_by()
+        videos = Video.objects.order_by()
+        if course_ids is not None:
+            courses = courses.filter(pk__in=course_ids)
+            enrollments = enrollments.filter(course_id__in=course_ids)
+            modules = modules.filter(course_id__in=course_ids)
+            videos = videos.filter(module__course_id__in=course_ids)
+        
+        stats = {pk: CourseStats(course_id=pk) for pk in courses.values_list('pk', flat=True)}
+        for row in enrollments.values('course_id').annotate(total=Count('id')):
+            stats[row['course_id']].enrollment_count = row['total']
+        for row in modules.values('course_id').annotate(total=Count('id')):
+            stats[row['course_id']].module_count = row['total']
+        for row in videos.values('module__course_id').annotate(total=Count('id'), minutes=Sum('duration_minutes')):
+            stats[row['module__course_id']].video_count = row['total']
+            stats[row['module__course_id']].total_video_minutes = row['minutes'] or 0
+        return stats
+    
+    def rebuild(self, course_ids=None):
+        """Recompute and store the stats rows; returns the number of courses rebuilt"""
+        stats = self.compute(course_ids)
+        existing = set(self.filter(course_id__in=stats).values_list('course_id', flat=True))
+        self.bulk_update(
+            [row for course_id, row in stats.items() if course_id in existing],
+            self.model.COUNTER_FIELDS,
+            batch_size=500,
+        )
+        self.bulk_create([row for course_id, row in stats.items() if course_id not in existing], batch_size=500)
+        return len(stats)
+
+class CourseStats(models.Model):
+    """Denormalized per-course counters, kept current by signals"""
+    COUNTER_FIELDS = ['enrollment_count', 'module_count', 'video_count', 'total_video_minutes']
+    
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    enrollment_count = models.PositiveIntegerField(default=0)
+    module_count = models.PositiveIntegerField(default=0)
+    video_count = models.PositiveIntegerField(default=0)
+    total_video_minutes = models.PositiveIntegerField(default=0)
+    
+    objects = CourseStatsManager()
+    
+    class Meta:
+        verbose_name_plural = "Course stats"
+    
+    def __str__(self):
+        return f"Stats for {self.course.title}"
+
+class CourseSimilarity(models.Model):
+    """One of the top-K "students who took this also took" courses of a course (see courses/recommendations.py)"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='similarities')
+    similar = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='similar_from')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    
+    class Meta:
+        ordering = ['course', 'rank']
+        constraints = [
+            # Also the index the detail page reads a course's neighbours through
+            models.UniqueConstraint(fields=['course', 'rank'], name='course_similarity_rank_uniq'),
+        ]
+        verbose_name_plural = "Course similarities"
+    
+    def __str__(self):
+        return f"{self.course_id} ~ {self.similar_id} ({self.score:.3f})"
+
+class CourseSimilarityState(models.Model):
+    """Digest of the enrollments and ratings a course's similarities were computed from"""
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='similarity_state')
+    signature = models.CharField(max_length=32)
+    computed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"Similarity state of {self.course_id}"
+
+# Read-through cache of the course-scoped lookups (see core/object_cache.py)
+object_cache.register(Category)
+object_cache.register(Course, lookups=('pk', 'slug'))
+
+# Signals to keep CourseStats current
+@receiver(post_save, sender=Course)
+def create_course_stats(sender, instance, created, **kwargs):
+    if created:
+        CourseStats.objects.get_or_create(course=instance)
+
+# Build responsive thumbnail derivatives off the request path (see courses/thumbnails.py)
+@receiver(post_save, sender=Course)
+def build_course_thumbnails(sender, instance, **kwargs):
+    if instance.thumbnail and not get_manifest(instance.thumbnail.name):
+        schedule_thumbnails(instance.thumbnail.name)
+
+# Reference counts of content-addressed media blobs
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Video)
+def update_media_references_on_save(sender, instance, created, **kwargs):
+    update_media_references(instance, created=created)
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Video)
+def update_media_references_on_delete(sender, instance, **kwargs):
+    update_media_references(instance, deleted=True)
+
+# Signals to keep the catalog search index current
+SEARCHED_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+@receiver(post_save, sender=Course)
+def index_course_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'title', 'description', 'instructor'} & set(update_fields):
+        get_search_backend().index_courses([instance])
+
+@receiver(post_delete, sender=Course)
+def unindex_course_on_delete(sender, instance, **kwargs):
+    get_search_backend().remove_courses([instance.pk])
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def reindex_instructor_courses(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and not SEARCHED_USER_FIELDS & set(update_fields)):
+        return
+    courses = list(instance.courses_taught.all())
+    for course in courses:
+        course.instructor = instance
+    get_search_backend().index_courses(courses)
+
+@receiver(post_save, sender=Module)
+def update_stats_on_module_save(sender, instance, created, **kwargs):
+    old_course_id = getattr(instance, '_stored_course_id', None)
+    instance._stored_course_id = instance.course_id
+    invalidate_curriculum(old_course_id, instance.course_id)
+    if created:
+        CourseStats.objects.adjust(course_id=instance.course_id, module_count=1)
+    elif old_course_id is not None and old_course_id != instance.course_id:
+        # Module moved to another course along with its videos
+        CourseStats.objects.rebuild([old_course_id, instance.course_id])
+
+@receiver(post_delete, sender=Module)
+def update_stats_on_module_delete(sender, instance, **kwargs):
+    # The module's videos were already removed through their own post_delete
+    CourseStats.objects.adjust(course_id=instance.course_id, module_count=-1)
+    invalidate_curriculum(instance.course_id)
+
+@receiver(post_save, sender=Video)
+def update_stats_on_video_save(sender, instance, created, **kwargs):
+    old_module_id = getattr(instance, '_stored_module_id', None)
+    old_duration = getattr(instance, '_stored_duration', None)
+    instance._stored_module_id = instance.module_id
+    instance._stored_duration = instance.duration_minutes
+    course_ids = dict(Module.objects.filter(pk__in={old_module_id, instance.module_id}).values_list('pk', 'course_id'))
+    # Read by the enrollment progress receivers (enrollments/models.py); a move
+    # between modules of the same course leaves its completions counting
+    moved = not created and old_module_id not in (None, instance.module_id)
+    instance._moved_from_module_id = (
+        old_module_id if moved and course_ids.get(old_module_id) != course_ids.get(instance.module_id) else None
+    )
+    invalidate_curriculum(*course_ids.values())
+    
+    if created:
+        CourseStats.objects.adjust(
+            module_id=instance.module_id, video_count=1, total_video_minutes=instance.duration_minutes
+        )
+    elif old_module_id is None or old_duration is None:
+        # Instance was not loaded from the database; recount its course
+        CourseStats.objects.rebuild(Module.objects.filter(pk=instance.module_id).values('course_id'))
+    elif old_module_id != instance.module_id:
+        CourseStats.objects.adjust(module_id=old_module_id, video_count=-1, total_video_minutes=-old_duration)
+        CourseStats.objects.adjust(
+            module_id=instance.module_id, video_count=1, total_video_minutes=instance.duration_minutes
+        )
+    else:
+        CourseStats.objects.adjust(
+            module_id=instance.module_id, total_video_minutes=instance.duration_minutes - old_duration
+        )
+
+@receiver(post_delete, sender=Video)
+def update_stats_on_video_delete(sender, instance, **kwargs):
+    duration = getattr(instance, '_stored_duration', None)
+    if duration is None:
+        duration = instance.duration_minutes
+    CourseStats.objects.adjust(module_id=instance.module_id, video_count=-1, total_video_minutes=-duration)
+    invalidate_curriculum(*Module.objects.filter(pk=instance.module_id).values_list('course_id', flat=True))
+
+# Signals to invalidate the cached home page snapshot
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Video)
+def invalidate_home_on_catalog_change(sender, **kwargs):
+    invalidate_home_snapshot()
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_home_on_user_change(sender, instance, created=False, update_fields=None, **kwargs):
+    # Only the student/teacher totals depend on users; skip e.g. last_login updates
+    if update_fields is not None and 'user_type' not in update_fields:
+        return
+    invalidate_home_snapshot()
@@ -0,0 +1,189 @@
+"""
+Keyset (cursor) pagination for the course listings.
+
+Pages are fetched with ``WHERE (key) < (last key seen)`` instead of OFFSET,
+so every page costs the same however deep it is. The cursor travels in the
+usual ``page`` query parameter as an opaque token, and CursorPage mimics
+django.core.paginator.Page closely enough for the existing templates. A
+``page`` that is not a cursor, such as an old ``?page=2`` link, gets the
+first page.
+"""
+import base64
+import json
+
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class CursorPaginator:
+    """
+    Paginate ``queryset`` by the unique ``ordering`` (field names, optionally
+    prefixed with '-'); the last field must be unique, e.g. the primary key.
+
+    ``count`` is capped at ``count_cap`` rows so it never scans the whole
+    result; ``count_is_capped`` tells whether there are more. Pass
+    ``count_cap=None`` to skip counting entirely.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id'), count_cap=1000):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.count_cap = count_cap
+        self._count = None
+
+    @property
+    def fields(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    @property
+    def count(self):
+        if self.count_cap is None:
+            return None
+        if self._count is None:
+            self._count = self.queryset.order_by()[:self.count_cap + 1].count()
+        return min(self._count, self.count_cap)
+
+    @property
+    def count_is_capped(self):
+        return self.count_cap is not None and self.count is not None and self._count > self.count_cap
+
+    # Cursor tokens
+
+    def encode_cursor(self, direction, obj, number):
+        # isoformat() keeps microseconds, which DjangoJSONEncoder would truncate
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in (getattr(obj, field) for field in self.fields)
+        ]
+        payload = json.dumps([direction, number, values], cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, token):
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            direction, number, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if direction not in ('next', 'prev') or len(values) != len(self.fields):
+                raise ValueError(token)
+            model_fields = [self.queryset.model._meta.get_field(field) for field in self.fields]
+            return direction, int(number), [field.to_python(value) for field, value in zip(model_fields, values)]
+        except Exception:
+            raise InvalidCursor('Invalid page cursor.')
+
+    # Queries
+
+    def _seek(self, values, reverse):
+        """Q for rows strictly after ``values`` in the ordering (before it if ``reverse``)"""
+        # (a, b) after (x, y)  <=>  a > x OR (a = x AND b > y)
+        condition = None
+        for position, name in enumerate(self.ordering):
+            descending = name.startswith('-') != reverse
+            lookup = f"{name.lstrip('-')}__{'lt' if descending else 'gt'}"
+            equal = dict(zip(self.fields[:position], values[:position]))
+            step = Q(**equal, **{lookup: values[position]})
+            condition = step if condition is None else condition | step
+        return condition
+
+    def _ordered(self, reverse):
+        if not reverse:
+            return self.queryset.order_by(*self.ordering)
+        return self.queryset.order_by(*(name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering))
+
+    def page(self, token=None):
+        if not token:
+            rows = list(self._ordered(reverse=False)[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], 1, self, has_next=len(rows) > self.per_page, has_previous=False)
+
+        direction, number, values = self.decode_cursor(token)
+        reverse = direction == 'prev'
+        rows = list(self._ordered(reverse).filter(self._seek(values, reverse))[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            return CursorPage(rows, max(number, 1), self, has_next=True, has_previous=more)
+        return CursorPage(rows, number, self, has_next=more, has_previous=True)
+
+
+class CursorPage:
+    def __init__(self, object_list, number, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Cursor page {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def next_page_number(self):
+        """Opaque cursor for the next page (named for template compatibility)"""
+        if not self._has_next:
+            raise InvalidCursor('That page contains no results')
+        return self.paginator.encode_cursor('next', self.object_list[-1], self.number + 1)
+
+    def previous_page_number(self):
+        """Opaque cursor for the previous page (named for template compatibility)"""
+        if not self._has_previous:
+            raise InvalidCursor('That page number is less than 1')
+        if self.number <= 2:
+            return ''
+        return self.paginator.encode_cursor('prev', self.object_list[0], self.number - 1)
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return (self.number - 1) * self.paginator.per_page + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+
+
+class CursorPaginationMixin:
+    """
+    ListView mixin that pages with CursorPaginator. Views return None from
+    get_cursor_ordering() to fall back to Django's offset paginator, e.g.
+    for relevance-ranked search results.
+    """
+    cursor_ordering = ('-created_at', '-id')
+    count_cap = 1000
+
+    def get_cursor_ordering(self):
+        return self.cursor_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        ordering = self.get_cursor_ordering()
+        if ordering is None:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = CursorPaginator(queryset, page_size, ordering, count_cap=self.count_cap)
+        token = self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg)
+        try:
+            page = paginator.page(token)
+        except InvalidCursor:
+            # Old numbered links (?page=2) and mangled cursors start over
+            page = paginator.page()
+        return (paginator, page, page.object_list, page.has_other_pages())
@@ -0,0 +1,95 @@
+"""
+Precomputed ranking score of each course.
+
+Sorting by the raw rating average lets one 5-star rating beat hundreds of
+4.8s. ``Course.ranking_score`` blends three signals, each scaled to 0..1:
+
+* the Bayesian average rating: every course starts with RANKING_PRIOR_WEIGHT
+  virtual ratings at the site-wide mean, so a few ratings barely move it
+  and unrated courses sit at the mean instead of NULL;
+* enrollment velocity: enrollments over the last RANKING_VELOCITY_DAYS, on a
+  log scale relative to the busiest course;
+* recency: halves every RANKING_RECENCY_HALF_LIFE_DAYS of course age.
+
+The weights come from RANKING_WEIGHTS. The periodic ``courses.update_rankings``
+job (or ``update_course_rankings``) rewrites the indexed column, so the
+featured block and the "top rated" listing are plain ORDER BY queries. A new
+course is saved with initial_ranking_score(), the score the job would give an
+unrated course with no enrollments yet, so it does not rank last meanwhile.
+"""
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from core import object_cache
+
+DEFAULT_WEIGHTS = {'rating': 0.7, 'velocity': 0.2, 'recency': 0.1}
+
+
+def ranking_score(rating_count, rating_sum, recent_enrollments, age_days, global_mean, max_recent, weights=None,
+                  prior_weight=None, half_life=None):
+    """Score of one course from plain values; see the module docstring"""
+    weights = weights or getattr(settings, 'RANKING_WEIGHTS', DEFAULT_WEIGHTS)
+    prior_weight = prior_weight if prior_weight is not None else getattr(settings, 'RANKING_PRIOR_WEIGHT', 10)
+    half_life = half_life or getattr(settings, 'RANKING_RECENCY_HALF_LIFE_DAYS', 180)
+
+    bayesian = (prior_weight * global_mean + rating_sum) / (prior_weight + rating_count) if prior_weight + rating_count else 0
+    velocity = math.log1p(recent_enrollments) / math.log1p(max_recent) if max_recent else 0
+    recency = 0.5 ** (max(age_days, 0) / half_life)
+    return (
+        weights.get('rating', 0) * bayesian / 5
+        + weights.get('velocity', 0) * velocity
+        + weights.get('recency', 0) * recency
+    )
+
+
+def _global_mean(Course):
+    totals = Course.objects.filter(rating_count__gt=0).aggregate(ratings=Sum('rating_count'), stars=Sum('rating_sum'))
+    return totals['stars'] / totals['ratings'] if totals['ratings'] else 0
+
+
+def initial_ranking_score():
+    """Score of a course created just now: no ratings, no enrollments"""
+    from .models import Course
+
+    return round(ranking_score(0, 0, 0, 0, _global_mean(Course), 0), 6)
+
+
+def _update_rankings(Course, Enrollment, now):
+    global_mean = _global_mean(Course)
+    since = now - timedelta(days=getattr(settings, 'RANKING_VELOCITY_DAYS', 30))
+    recent = dict(
+        Enrollment.objects.filter(enrolled_at__gte=since)
+        .order_by().values('course_id').annotate(n=Count('pk')).values_list('course_id', 'n')
+    )
+    max_recent = max(recent.values(), default=0)
+
+    courses = list(Course.objects.only('pk', 'created_at', 'rating_count', 'rating_sum', 'ranking_score'))
+    changed = []
+    for course in courses:
+        score = round(ranking_score(
+            course.rating_count, course.rating_sum, recent.get(course.pk, 0),
+            (now - course.created_at).total_seconds() / 86400, global_mean, max_recent,
+        ), 6)
+        if score != course.ranking_score:
+            course.ranking_score = score
+            changed.append(course)
+    Course.objects.bulk_update(changed, ['ranking_score'], batch_size=500)
+    return len(changed)
+
+
+def update_rankings(now=None):
+    """Recompute every course's ranking_score; returns how many changed"""
+    from enrollments.models import Enrollment
+    from .models import Course
+    from .snapshots import invalidate_home_snapshot
+
+    changed = _update_rankings(Course, Enrollment, now or timezone.now())
+    if changed:
+        # The featured block is ordered by the score
+        invalidate_home_snapshot()
+        object_cache.invalidate(Course)
+    return changed
@@ -0,0 +1,174 @@
+"""
+Course catalog search backends.
+
+The backend is chosen with the COURSE_SEARCH_BACKEND setting (a dotted path).
+Every backend takes a Course queryset and returns it narrowed to the matches,
+ordered by relevance, so category/difficulty filters and pagination keep
+working. Matches may carry a ``search_snippet`` attribute; highlighted terms
+are wrapped in SNIPPET_START/SNIPPET_END and rendered by the
+``search_highlight`` template filter.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, TextField
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+
+class BaseSearchBackend:
+    def is_available(self):
+        return True
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def index_courses(self, courses):
+        """Add or refresh the index entries of the given courses"""
+
+    def remove_courses(self, course_ids):
+        """Drop the index entries of the given course ids"""
+
+    def rebuild(self):
+        """Reindex every course; returns the number of indexed courses"""
+        return 0
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Unranked substring search; works on every database"""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(instructor__username__icontains=query)
+        )
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """BM25-ranked full-text search over an FTS5 virtual table"""
+    table = 'courses_course_fts'
+    # bm25() column weights: title, description, instructor
+    weights = (10.0, 1.0, 5.0)
+    # Snippets come from the description; the title is already on the card
+    snippet_column = 1
+    snippet_tokens = 16
+
+    def __init__(self):
+        self._available = None
+
+    def is_available(self):
+        if self._available is None:
+            self._available = connection.vendor == 'sqlite' and self.table in connection.introspection.table_names()
+        return self._available
+
+    def create_table(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            f"title, description, instructor, tokenize='unicode61 remove_diacritics 2')"
+        )
+        self._available = None
+
+    def drop_table(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+        self._available = None
+
+    @staticmethod
+    def to_match_expression(query):
+        """Turn free text into an FTS5 prefix query, dropping any FTS syntax"""
+        terms = re.findall(r'\w+', query)
+        return ' AND '.join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, query):
+        if not self.is_available():
+            return LikeSearchBackend().search(queryset, query)
+
+        match = self.to_match_expression(query)
+        if not match:
+            return queryset.none()
+
+        fts = self.table
+        course_id = '.'.join(
+            connection.ops.quote_name(name) for name in (queryset.model._meta.db_table, queryset.model._meta.pk.column)
+        )
+        weights = ', '.join(str(weight) for weight in self.weights)
+        # bm25() and snippet() only work beside a MATCH: look up the course's own row
+        matched_row = f'FROM {fts} WHERE {fts} MATCH %s AND {fts}.rowid = {course_id}'
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [match]),
+        ).annotate(
+            search_rank=RawSQL(f'SELECT bm25({fts}, {weights}) {matched_row}', [match], output_field=FloatField()),
+            search_snippet=RawSQL(
+                f"SELECT snippet({fts}, {self.snippet_column}, %s, %s, '…', {self.snippet_tokens}) {matched_row}",
+                [SNIPPET_START, SNIPPET_END, match],
+                output_field=TextField(),
+            ),
+        ).order_by('search_rank', '-created_at')
+
+    def index_courses(self, courses):
+        if not self.is_available():
+            return
+        rows = [
+            (
+                course.pk,
+                course.title,
+                course.description,
+                f'{course.instructor.username} {course.instructor.get_full_name()}'.strip(),
+            )
+            for course in courses
+        ]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, title, description, instructor) VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove_courses(self, course_ids):
+        if not self.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in course_ids])
+
+    def rebuild(self):
+        from .models import Course
+
+        with connection.cursor() as cursor:
+            self.create_table(cursor)
+            cursor.execute(f'DELETE FROM {self.table}')
+        indexed = 0
+        courses = Course.objects.select_related('instructor').only(
+            'pk', 'title', 'description', 'instructor__username',
+            'instructor__first_name', 'instructor__last_name',
+        ).order_by('pk')
+        batch = []
+        for course in courses.iterator(chunk_size=500):
+            batch.append(course)
+            if len(batch) == 500:
+                self.index_courses(batch)
+                indexed += len(batch)
+                batch = []
+        self.index_courses(batch)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+        return indexed + len(batch)
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_search_backend(fallback=True):
+    """The configured backend, or the LIKE fallback when it cannot be used here"""
+    backend = _load_backend(getattr(settings, 'COURSE_SEARCH_BACKEND', 'courses.search.SQLiteFTS5Backend'))
+    if backend.is_available() or not fallback:
+        return backend
+    return _load_backend('courses.search.LikeSearchBackend')
@@ -0,0 +1,85 @@
+"""
+Cached, versioned snapshot of the home page context.
+
+The snapshot is stored under a versioned key (see core/cache_versions.py).
+Changes to rows the home page shows bump the version (see the receivers in
+courses/models.py and ratings/models.py), so a hit costs no queries and a
+miss rebuilds once. While one request rebuilds, concurrent misses are served
+the previous snapshot instead of all hitting the database.
+"""
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from core.cache_versions import bump_version_on_commit, versioned_key
+from core.replicas import primary_reads
+
+LATEST_KEY = 'home:snapshot:latest'
+LOCK_KEY = 'home:snapshot:rebuilding'
+
+
+def _timeout():
+    return getattr(settings, 'HOME_SNAPSHOT_TIMEOUT', 60 * 60)
+
+
+def build_home_snapshot():
+    """Compute the home page context from the primary database"""
+    with primary_reads():
+        return _build_home_snapshot()
+
+
+def _build_home_snapshot():
+    from accounts.models import User
+    from .models import Category, Course, CourseStats
+
+    user_counts = User.objects.aggregate(
+        students=Count('id', filter=Q(user_type='student')),
+        teachers=Count('id', filter=Q(user_type='teacher')),
+    )
+    total_minutes = CourseStats.objects.filter(course__is_published=True).aggregate(
+        total=Sum('total_video_minutes')
+    )['total'] or 0
+    return {
+        # Featured courses (top 6 by ranking score, see courses/ranking.py)
+        'featured_courses': list(
+            Course.objects.filter(is_published=True).select_related('instructor', 'category').order_by('-ranking_score', '-id')[:6]
+        ),
+        'categories': list(Category.objects.all()[:8]),
+        'total_courses': Course.objects.filter(is_published=True).count(),
+        'total_students': user_counts['students'],
+        'total_teachers': user_counts['teachers'],
+        'total_hours': math.ceil(total_minutes / 60) or 100,
+    }
+
+
+def rebuild_home_snapshot():
+    """Build and store the snapshot for the current version"""
+    key = versioned_key('home:snapshot')
+    snapshot = build_home_snapshot()
+    cache.set_many({
+        key: snapshot,
+        LATEST_KEY: snapshot,
+    }, timeout=_timeout())
+    return snapshot
+
+
+def get_home_snapshot():
+    snapshot = cache.get(versioned_key('home:snapshot'))
+    if snapshot is not None:
+        return snapshot
+
+    if cache.add(LOCK_KEY, True, timeout=30):
+        try:
+            return rebuild_home_snapshot()
+        finally:
+            cache.delete(LOCK_KEY)
+
+    # Someone else is rebuilding; a slightly stale page beats a stampede
+    stale = cache.get(LATEST_KEY)
+    return stale if stale is not None else build_home_snapshot()
+
+
+def invalidate_home_snapshot():
+    """Bump the version once the current transaction commits"""
+    bump_version_on_commit('home:snapshot')
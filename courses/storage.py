@@ -0,0 +1,151 @@
+"""
+Content-addressed storage for uploaded media.
+
+The thumbnail, attachment, video and profile picture fields store every file
+under the SHA-256 of its content, e.g. course_videos/3f/3f9a…e1.mp4. The
+digest is computed while the upload streams to disk. Uploading the same bytes
+again, in any row, reuses the existing blob instead of writing a suffixed copy.
+
+Each blob has a MediaBlob row whose ``reference_count`` tracks how many model
+rows point at it. The receivers in courses/models.py and accounts/models.py
+keep it current. ``gc_media`` deletes blobs nobody references any more, and
+``dedupe_media`` moves files uploaded before this storage into it.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+from collections import Counter
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+# Every file field stored here, as (model label, field name)
+MEDIA_FIELDS = (
+    ('courses.Course', 'thumbnail'),
+    ('courses.Post', 'attachment'),
+    ('courses.Video', 'video_file'),
+    ('accounts.User', 'profile_picture'),
+)
+
+READ_SIZE = 1024 * 1024
+INCOMING_DIR = '.incoming'
+
+
+@deconstructible(path='courses.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The final name is the content digest, chosen in _save()
+        return name
+
+    def blob_name(self, name, digest):
+        """Storage name of content ``digest`` uploaded as ``name``"""
+        directory, basename = posixpath.split(name)
+        extension = os.path.splitext(basename)[1].lower()[:10]
+        return posixpath.join(directory, digest[:2], f'{digest}{extension}')
+
+    def _incoming_file(self):
+        directory = os.path.join(self.location, INCOMING_DIR)
+        os.makedirs(directory, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=directory, delete=False)
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        size = 0
+        with self._incoming_file() as incoming:
+            try:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    incoming.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                os.remove(incoming.name)
+                raise
+        return self._store(incoming.name, name, digest.hexdigest(), size)
+
+    def adopt(self, path, name):
+        """
+        Move the local file at ``path`` (on the same filesystem) into the
+        store as if it had been uploaded as ``name``; returns the blob name.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(READ_SIZE), b''):
+                digest.update(chunk)
+                size += len(chunk)
+        return self._store(path, name, digest.hexdigest(), size)
+
+    def _store(self, path, name, digest, size):
+        blob_name = self.blob_name(name, digest)
+        destination = self.path(blob_name)
+        if os.path.exists(destination):
+            # Same content is already stored: keep the existing blob
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            os.replace(path, destination)
+            if self.file_permissions_mode is not None:
+                os.chmod(destination, self.file_permissions_mode)
+        record_blob(blob_name, digest, size)
+        return blob_name
+
+
+_storage = ContentAddressedStorage()
+
+
+def media_storage():
+    """Storage callable for the media file fields"""
+    return _storage
+
+
+def record_blob(name, digest, size):
+    MediaBlob = apps.get_model('courses', 'MediaBlob')
+    blob, created = MediaBlob.objects.get_or_create(name=name, defaults={'sha256': digest, 'size': size})
+    return blob
+
+
+def adjust_references(added=(), removed=()):
+    """Apply reference count deltas for the given blob names"""
+    MediaBlob = apps.get_model('courses', 'MediaBlob')
+    deltas = Counter(name for name in added if name)
+    deltas.subtract(name for name in removed if name)
+    for name, delta in deltas.items():
+        if delta:
+            MediaBlob.objects.filter(name=name).update(reference_count=F('reference_count') + delta)
+
+
+def stored_media(instance, *fields):
+    """Stored file names of ``fields`` (skipping deferred ones), for from_db()"""
+    return {field: str(instance.__dict__[field] or '') for field in fields if field in instance.__dict__}
+
+
+def update_media_references(instance, created=False, deleted=False):
+    """
+    Receiver helper: move references from the file names stored when the row
+    was loaded to its current ones (or drop them when it is deleted).
+    """
+    stored = getattr(instance, '_stored_media', {})
+    fields = [field for model, field in MEDIA_FIELDS if apps.get_model(model) is type(instance)]
+    added, removed = [], []
+    for field in fields:
+        if not created and field not in stored:
+            continue  # Deferred when loaded: we cannot tell what changed
+        old = '' if created else stored[field]
+        new = '' if deleted else str(getattr(instance, field) or '')
+        if old != new:
+            added.append(new)
+            removed.append(old)
+    adjust_references(added, removed)
+    instance._stored_media = {} if deleted else {field: str(getattr(instance, field) or '') for field in fields}
+
+
+def count_references():
+    """Live reference count of every stored name, scanning MEDIA_FIELDS"""
+    counts = Counter()
+    for model, field in MEDIA_FIELDS:
+        names = apps.get_model(model).objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        counts.update(names.values_list(field, flat=True))
+    return counts
@@ -0,0 +1,135 @@
+"""
+Byte-range file streaming for protected media.
+
+``stream_file`` answers plain and ``Range`` requests (206 / 416) with ETag and
+Last-Modified validators, in one of three modes chosen by the
+VIDEO_STREAM_MODE setting:
+
+* ``'django'`` – Django sends the bytes through FileResponse. Servers that
+  provide ``wsgi.file_wrapper`` (e.g. gunicorn) use zero-copy ``sendfile``,
+  bounded by the Content-Length of the range; others read fixed-size chunks.
+* ``'x-accel-redirect'`` – nginx serves the file from the internal location
+  VIDEO_STREAM_ACCEL_PREFIX and handles ranges and caching itself.
+* ``'x-sendfile'`` – Apache mod_xsendfile / lighttpd take over the transfer.
+
+Access control is the caller's job; this only runs once it has passed.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Read-only view of ``length`` bytes of an open file, starting at ``start``"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        # Lets wsgi.file_wrapper use sendfile() from the current offset
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single-range ``Range`` header, None to send
+    the whole file (no header, multiple ranges or an unknown unit), or raise
+    ValueError when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+def stream_file(request, path, name, content_type=None):
+    """Serve the file at ``path``; ``name`` is its storage name (for proxy modes)"""
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = stat.st_mtime
+    content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if response is not None:
+        return response
+
+    mode = getattr(settings, 'VIDEO_STREAM_MODE', 'django')
+    if mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.VIDEO_STREAM_ACCEL_PREFIX + name
+    elif mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range is not None and not _if_range_matches(request, etag, last_modified):
+            byte_range = None
+
+        start, end = byte_range or (0, size - 1)
+        length = max(end - start + 1, 0)
+        response = FileResponse(
+            RangeFile(open(path, 'rb'), start, length),
+            content_type=content_type,
+            status=206 if byte_range else 200,
+        )
+        response.block_size = getattr(settings, 'VIDEO_STREAM_CHUNK_SIZE', 512 * 1024)
+        response['Content-Length'] = str(length)
+        if byte_range:
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
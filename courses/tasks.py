@@ -0,0 +1,21 @@
+from jobs.registry import task
+from .models import CourseStats
+from .ranking import update_rankings
+from .recommendations import build_similarities
+from .thumbnails import build_thumbnails
+
+@task('courses.build_thumbnails')
+def build_thumbnails_task(name, force=False):
+    build_thumbnails(name, force=force)
+
+@task('courses.rebuild_course_stats', priority=-10)
+def rebuild_course_stats(course_ids=None):
+    CourseStats.objects.rebuild(course_ids)
+
+@task('courses.update_rankings')
+def update_rankings_task():
+    update_rankings()
+
+@task('courses.build_similarities', priority=-10)
+def build_similarities_task(full=False):
+    build_similarities(full=full)
@@ -1,14 +1,31 @@
+import csv
+import itertools
+import json
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.views import View
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
 from django.contrib import messages
-from django.urls import reverse_lazy
-from django.db.models import Q, Avg
-from .models import Course, Category, Module, Video, Post
+from django.urls import reverse, reverse_lazy
+from django.core.paginator import InvalidPage
+from django.db.models import Q, Avg, Count, OuterRef, Subquery
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from .models import Course, Category, Module, Video, VideoUpload, Post
 from .forms import CourseForm, ModuleForm, VideoForm, PostForm
+from .pagination import CursorPaginator
+from .uploads import UploadError, start_upload, upload_status, write_chunk, complete_upload, attach_upload
 from enrollments.models import Enrollment, VideoProgress
+from core.object_cache import get_cached_or_404
 
 # Comprehensive Course Management Views
+def get_taught_course_or_404(user, slug):
+    """The course with this slug if ``user`` teaches it, from the object cache"""
+    course = get_cached_or_404(Course, slug=slug)
+    if course.instructor_id != user.pk:
+        raise Http404('No Course matches the given query.')
+    return course
+
 class CourseManagementView(LoginRequiredMixin, DetailView):
     model = Course
     template_name = 'courses/course_management.html'
@@ -20,8 +37,8 @@ class CourseManagementView(LoginRequiredMixin, DetailView):
             return redirect('courses:course_list')
         return super().dispatch(request, *args, **kwargs)
     
-    def get_queryset(self):
-        return Course.objects.filter(instructor=self.request.user)
+    def get_object(self, queryset=None):
+        return get_taught_course_or_404(self.request.user, self.kwargs['slug'])
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -30,13 +47,13 @@ class CourseManagementView(LoginRequiredMixin, DetailView):
         # Students and progress
         enrollments = course.enrollments.select_related('student').all()
         context['enrollments'] = enrollments
-        context['total_students'] = enrollments.count()
+        context['total_students'] = course.total_students
         
         # Modules and videos
         modules = course.modules.prefetch_related('videos').all()
         context['modules'] = modules
-        context['total_modules'] = modules.count()
-        context['total_videos'] = Video.objects.filter(module__course=course).count()
+        context['total_modules'] = course.total_modules
+        context['total_videos'] = course.total_videos
         
         # Posts
         context['posts'] = course.posts.all()[:5]
@@ -53,35 +70,94 @@ class StudentProgressView(LoginRequiredMixin, DetailView):
     model = Course
     template_name = 'courses/student_progress.html'
     context_object_name = 'course'
+    paginate_by = 50
     
-    def get_queryset(self):
-        return Course.objects.filter(instructor=self.request.user)
+    def get_object(self, queryset=None):
+        return get_taught_course_or_404(self.request.user, self.kwargs['slug'])
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         course = self.object
+        total_videos = course.total_videos
         
-        # Detailed student progress
-        enrollments = course.enrollments.select_related('student').prefetch_related(
-            'video_progress__video'
-        ).all()
+        # One query per page: watched videos are kept on the enrollment (enrollments/progress.py)
+        paginator = CursorPaginator(student_progress_rows(course), self.paginate_by, ordering=('-enrolled_at', '-id'))
+        try:
+            page = paginator.page(self.request.GET.get('page'))
+        except InvalidPage as e:
+            raise Http404(f'Invalid page: {e}')
         
-        student_progress = []
-        for enrollment in enrollments:
-            videos_watched = enrollment.video_progress.filter(is_completed=True).count()
-            total_videos = Video.objects.filter(module__course=course).count()
-            
-            student_progress.append({
+        context['student_progress'] = [
+            {
                 'enrollment': enrollment,
-                'videos_watched': videos_watched,
+                'videos_watched': enrollment.completed_videos_count,
                 'total_videos': total_videos,
-                'completion_rate': (videos_watched / total_videos * 100) if total_videos > 0 else 0,
-                'last_activity': enrollment.video_progress.order_by('-last_watched').first()
-            })
-        
-        context['student_progress'] = student_progress
+                'completion_rate': enrollment.progress_percentage,
+                'last_activity': enrollment.last_activity,
+            }
+            for enrollment in page
+        ]
+        context['page_obj'] = page
+        context['is_paginated'] = page.has_other_pages()
+        context['status_counts'] = course.enrollments.aggregate(
+            completed=Count('id', filter=Q(progress_percentage__gte=100)),
+            in_progress=Count('id', filter=Q(progress_percentage__gte=50, progress_percentage__lt=100)),
+            started=Count('id', filter=Q(progress_percentage__gt=0, progress_percentage__lt=50)),
+            not_started=Count('id', filter=Q(progress_percentage=0)),
+        )
         return context
 
+def student_progress_rows(course):
+    """Enrollments of ``course`` with the student and their last activity, in one query"""
+    last_watched = VideoProgress.objects.filter(enrollment=OuterRef('pk')).order_by('-last_watched').values('last_watched')[:1]
+    return course.enrollments.select_related('student').annotate(last_activity=Subquery(last_watched))
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer in a generator"""
+    def write(self, value):
+        return value
+
+class StudentProgressExportView(LoginRequiredMixin, View):
+    """Streams the progress of every student of a course as CSV or JSON Lines"""
+    
+    columns = ['username', 'full_name', 'email', 'enrolled_at', 'videos_watched', 'total_videos',
+               'progress_percentage', 'completed_at', 'last_activity']
+    
+    def get(self, request, slug):
+        course = get_object_or_404(Course.objects.select_related('stats'), slug=slug, instructor=request.user)
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in ('csv', 'jsonl'):
+            raise Http404('Unknown export format')
+        
+        rows = self.rows(course)
+        if export_format == 'csv':
+            writer = csv.writer(Echo())
+            content = (writer.writerow(row) for row in itertools.chain([self.columns], rows))
+            content_type = 'text/csv; charset=utf-8'
+        else:
+            content = (json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + '\n' for row in rows)
+            content_type = 'application/x-ndjson; charset=utf-8'
+        
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{course.slug}-students.{export_format}"'
+        return response
+    
+    def rows(self, course):
+        total_videos = course.total_videos
+        enrollments = student_progress_rows(course).order_by('enrolled_at', 'id').values_list(
+            'student__username', 'student__first_name', 'student__last_name', 'student__email',
+            'enrolled_at', 'completed_videos_count', 'progress_percentage', 'completed_at', 'last_activity',
+        )
+        # iterator() streams from the cursor in chunks instead of caching every row
+        for username, first_name, last_name, email, enrolled_at, watched, progress, completed_at, last_activity in enrollments.iterator(chunk_size=2000):
+            yield [
+                username, f'{first_name} {last_name}'.strip(), email, _isoformat(enrolled_at),
+                watched, total_videos, progress, _isoformat(completed_at), _isoformat(last_activity),
+            ]
+
+def _isoformat(value):
+    return value.isoformat() if value else ''
+
 # Post Management Views
 class CoursePostsView(LoginRequiredMixin, ListView):
     model = Post
@@ -90,15 +166,11 @@ class CoursePostsView(LoginRequiredMixin, ListView):
     paginate_by = 10
     
     def dispatch(self, request, *args, **kwargs):
-        self.course = get_object_or_404(
-            Course, 
-            slug=self.kwargs['slug'], 
-            instructor=request.user
-        )
+        self.course = get_taught_course_or_404(request.user, self.kwargs['slug'])
         return super().dispatch(request, *args, **kwargs)
     
     def get_queryset(self):
-        return Post.objects.filter(course=self.course)
+        return Post.objects.filter(course=self.course).select_related('author')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -111,11 +183,7 @@ class CreatePostView(LoginRequiredMixin, CreateView):
     template_name = 'courses/create_post.html'
     
     def dispatch(self, request, *args, **kwargs):
-        self.course = get_object_or_404(
-            Course, 
-            slug=self.kwargs['slug'], 
-            instructor=request.user
-        )
+        self.course = get_taught_course_or_404(request.user, self.kwargs['slug'])
         return super().dispatch(request, *args, **kwargs)
     
     def form_valid(self, form):
@@ -163,11 +231,7 @@ class CreateModuleView(LoginRequiredMixin, CreateView):
     template_name = 'courses/create_module.html'
     
     def dispatch(self, request, *args, **kwargs):
-        self.course = get_object_or_404(
-            Course, 
-            slug=self.kwargs['slug'], 
-            instructor=request.user
-        )
+        self.course = get_taught_course_or_404(request.user, self.kwargs['slug'])
         return super().dispatch(request, *args, **kwargs)
     
     def form_valid(self, form):
@@ -196,10 +260,21 @@ class CreateVideoView(LoginRequiredMixin, CreateView):
         )
         return super().dispatch(request, *args, **kwargs)
     
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+    
     def form_valid(self, form):
         form.instance.module = self.module
+        upload = form.cleaned_data['upload']
+        if upload:
+            form.instance.video_file.name = upload.file_name
+        response = super().form_valid(form)
+        if upload:
+            attach_upload(upload, self.object)
         messages.success(self.request, 'Video added successfully!')
-        return super().form_valid(form)
+        return response
     
     def get_success_url(self):
         return reverse_lazy('courses:manage_modules', kwargs={'slug': self.module.course.slug})
@@ -226,7 +301,7 @@ class DeleteModuleView(LoginRequiredMixin, DeleteView):
     template_name = 'courses/delete_module.html'
     
     def get_queryset(self):
-        return Module.objects.filter(course__instructor=self.request.user)
+        return Module.objects.filter(course__instructor=self.request.user).prefetch_related('videos')
     
     def get_success_url(self):
         return reverse_lazy('courses:manage_modules', kwargs={'slug': self.object.course.slug})
@@ -239,6 +314,20 @@ class EditVideoView(LoginRequiredMixin, UpdateView):
     def get_queryset(self):
         return Video.objects.filter(module__course__instructor=self.request.user)
     
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+    
+    def form_valid(self, form):
+        upload = form.cleaned_data['upload']
+        if upload:
+            form.instance.video_file.name = upload.file_name
+        response = super().form_valid(form)
+        if upload:
+            attach_upload(upload, self.object)
+        return response
+    
     def get_success_url(self):
         return reverse_lazy('courses:manage_modules', kwargs={'slug': self.object.module.course.slug})
 
@@ -251,3 +340,59 @@ class DeleteVideoView(LoginRequiredMixin, DeleteView):
     
     def get_success_url(self):
         return reverse_lazy('courses:manage_modules', kwargs={'slug': self.object.module.course.slug})
+
+# Resumable chunked video uploads (see courses/uploads.py)
+class VideoUploadView(LoginRequiredMixin, View):
+    """Base for the JSON upload endpoints; answers UploadError with 400"""
+    raise_exception = True
+    
+    def get_upload(self):
+        return get_object_or_404(
+            VideoUpload,
+            id=self.kwargs['upload_id'],
+            uploaded_by=self.request.user,
+            module__course__instructor=self.request.user,
+        )
+    
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except UploadError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+class StartVideoUploadView(VideoUploadView):
+    def post(self, request, module_id):
+        module = get_object_or_404(Module, id=module_id, course__instructor=request.user)
+        video = None
+        if request.POST.get('video_id'):
+            video = get_object_or_404(Video, id=request.POST['video_id'], module=module)
+        try:
+            total_size = int(request.POST.get('size', ''))
+        except ValueError:
+            raise UploadError('Missing or invalid file size.')
+        upload = start_upload(
+            module, request.user, request.POST.get('filename', ''), total_size,
+            video=video, fingerprint=request.POST.get('fingerprint', ''),
+        )
+        data = upload_status(upload, chunks=[])
+        # Chunks go to <status_url>chunks/<index>/, completion to <status_url>complete/
+        data['status_url'] = reverse('courses:video_upload_status', args=[upload.id])
+        return JsonResponse(data, status=201)
+
+class VideoUploadStatusView(VideoUploadView):
+    def get(self, request, upload_id):
+        return JsonResponse(upload_status(self.get_upload()))
+
+class VideoUploadChunkView(VideoUploadView):
+    def put(self, request, upload_id, index):
+        upload = self.get_upload()
+        # Read the request stream directly: request.body would buffer the
+        # whole chunk and trip DATA_UPLOAD_MAX_MEMORY_SIZE
+        write_chunk(upload, index, request, request.headers.get('X-Chunk-SHA256', ''))
+        return JsonResponse({'index': index, 'received': True})
+
+class CompleteVideoUploadView(VideoUploadView):
+    def post(self, request, upload_id):
+        upload = self.get_upload()
+        complete_upload(upload)
+        return JsonResponse(upload_status(upload, chunks=[]))
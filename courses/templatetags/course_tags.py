@@ -0,0 +1,38 @@
+from django import template
+from django.utils.html import escape, format_html
+from django.utils.safestring import mark_safe
+from courses.search import SNIPPET_START, SNIPPET_END
+from courses.thumbnails import srcsets
+
+register = template.Library()
+
+@register.filter
+def search_highlight(snippet):
+    """Render a search snippet with the matched terms wrapped in <mark>"""
+    if not snippet:
+        return ''
+    return mark_safe(
+        escape(snippet).replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
+    )
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw', css_class=''):
+    """
+    <picture> with WebP and JPEG srcsets for an ImageField file (see
+    courses/thumbnails.py); a plain <img> of the original until the
+    derivatives have been built.
+    """
+    if not image:
+        return ''
+    derivatives = srcsets(image.name)
+    if derivatives is None:
+        return format_html('<img src="{}" class="{}" alt="{}" loading="lazy">', image.url, css_class, alt)
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" class="{}" alt="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        derivatives['webp'], sizes,
+        derivatives['src'], derivatives['jpg'], sizes,
+        derivatives['width'], derivatives['height'], css_class, alt,
+    )
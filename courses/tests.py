@@ -1,3 +1,221 @@
-from django.test import TestCase
+import hashlib
+import io
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from accounts.models import User
+from core.testing import Budget, QueryBudgetMixin, chunk_headers
+from .models import Category, Course, Module, Video
+from .ranking import update_rankings
+from .search import SNIPPET_START, SQLiteFTS5Backend
+from .streaming import parse_range
+from .uploads import UploadError, complete_upload, start_upload, upload_fingerprint, upload_status, write_chunk
+
+CHUNK = b'0123456789'
+
+
+def course(data):
+    return {'slug': data.course.slug}
+
+
+class CourseQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Cold-cache query budgets of the course pages, against the synthetic catalog"""
+    urls_module = 'courses.urls'
+    budgets = {
+        'course_list': Budget(3),
+        'course_detail': Budget(12, user='student', kwargs=course),
+        'courses_by_category': Budget(2, kwargs=lambda data: {'category_id': data.course.category_id}),
+        'teacher_dashboard': Budget(5, user='teacher'),
+        'create_course': Budget(3, user='teacher'),
+        'edit_course': Budget(4, user='teacher', kwargs=course),
+        'delete_course': Budget(4, user='teacher', kwargs=course),
+        'manage_modules': Budget(6, user='teacher', kwargs=course),
+        'video_player': Budget(8, user='student', kwargs=lambda data: {'slug': data.course.slug, 'video_id': data.video.pk}),
+        'video_stream': Budget(5, user='student', kwargs=lambda data: {'slug': data.course.slug, 'video_id': data.video.pk}),
+        'course_management': Budget(10, user='teacher', kwargs=course),
+        'student_progress': Budget(6, user='teacher', kwargs=course),
+        'student_progress_export': Budget(4, user='teacher', kwargs=course),
+        'course_posts': Budget(5, user='teacher', kwargs=course),
+        'create_post': Budget(3, user='teacher', kwargs=course),
+        'edit_post': Budget(4, user='teacher', kwargs=lambda data: {'slug': data.course.slug, 'pk': data.post.pk}),
+        'delete_post': Budget(4, user='teacher', kwargs=lambda data: {'pk': data.post.pk}),
+        'create_module': Budget(3, user='teacher', kwargs=course),
+        'edit_module': Budget(4, user='teacher', kwargs=lambda data: {'pk': data.module.pk}),
+        'delete_module': Budget(6, user='teacher', kwargs=lambda data: {'pk': data.module.pk}),
+        'create_video': Budget(4, user='teacher', kwargs=lambda data: {'module_id': data.module.pk}),
+        'edit_video': Budget(5, user='teacher', kwargs=lambda data: {'pk': data.video.pk}),
+        'delete_video': Budget(5, user='teacher', kwargs=lambda data: {'pk': data.video.pk}),
+        'start_video_upload': Budget(
+            4, user='teacher', method='post', status=201, kwargs=lambda data: {'module_id': data.module.pk},
+            data={'filename': 'lesson.mp4', 'size': 2048},
+        ),
+        'video_upload_status': Budget(4, user='teacher', kwargs=lambda data: {'upload_id': data.upload.pk}),
+        'video_upload_chunk': Budget(
+            10, user='teacher', method='put', kwargs=lambda data: {'upload_id': data.upload.pk, 'index': 0},
+            data=CHUNK, content_type='application/octet-stream', headers=chunk_headers(CHUNK),
+        ),
+        'complete_video_upload': Budget(
+            11, user='teacher', method='post', kwargs=lambda data: {'upload_id': data.upload.pk},
+        ),
+    }
+
+
+class UploadFingerprintTests(TestCase):
+    """Skipping a re-upload by fingerprint only reuses the uploader's own files"""
+    
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix='uploads-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root, VIDEO_UPLOAD_CHUNK_SIZE=4)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        
+        self.teacher = User.objects.create(username='teacher', user_type='teacher')
+        self.other_teacher = User.objects.create(username='other', user_type='teacher')
+        course = Course.objects.create(
+            title='Course', description='Description', instructor=self.teacher,
+            category=Category.objects.create(name='Category'),
+        )
+        self.module = Module.objects.create(course=course, title='Module', order=1)
+        self.content = b'0123456789'
+        chunks = [self.content[i:i + 4] for i in range(0, len(self.content), 4)]
+        digests = [hashlib.sha256(chunk).hexdigest() for chunk in chunks]
+        self.fingerprint = upload_fingerprint(4, digests)
+        
+        upload = start_upload(self.module, self.teacher, 'clip.mp4', len(self.content))
+        for index, (chunk, digest) in enumerate(zip(chunks, digests)):
+            write_chunk(upload, index, io.BytesIO(chunk), digest)
+        self.stored = complete_upload(upload)
+    
+    def start(self, user):
+        return start_upload(self.module, user, 'clip.mp4', len(self.content), fingerprint=self.fingerprint)
+    
+    def test_uploader_skips_resending_own_file(self):
+        upload = self.start(self.teacher)
+        self.assertEqual((upload.status, upload.file_name), ('complete', self.stored))
+    
+    def test_other_user_must_send_the_bytes(self):
+        upload = self.start(self.other_teacher)
+        self.assertEqual((upload.status, upload.file_name), ('uploading', ''))
+
+
+class ChunkRetryTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix='uploads-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root, VIDEO_UPLOAD_CHUNK_SIZE=4)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        teacher = User.objects.create(username='teacher', user_type='teacher')
+        course = Course.objects.create(
+            title='Course', description='Description', instructor=teacher,
+            category=Category.objects.create(name='Category'),
+        )
+        module = Module.objects.create(course=course, title='Module', order=1)
+        self.upload = start_upload(module, teacher, 'clip.mp4', 8)
+    
+    def send(self, index, data, sha256=None):
+        write_chunk(self.upload, index, io.BytesIO(data), sha256 or hashlib.sha256(data).hexdigest())
+    
+    def test_corrupt_retry_of_a_received_chunk_must_be_sent_again(self):
+        self.send(0, b'abcd')
+        self.send(1, b'efgh')
+        with self.assertRaises(UploadError):
+            self.send(0, b'XXXX', sha256=hashlib.sha256(b'abcd').hexdigest())
+        self.assertEqual(upload_status(self.upload)['received_chunks'], [1])
+        with self.assertRaises(UploadError):
+            complete_upload(self.upload)
+        
+        self.send(0, b'abcd')
+        name = complete_upload(self.upload)
+        with Video._meta.get_field('video_file').storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'abcdefgh')
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        teacher = User.objects.create(username='teacher', user_type='teacher')
+        category = Category.objects.create(name='Category')
+        Course.objects.bulk_create([
+            Course(title=f'Course {i}', slug=f'course-{i}', description='Description', instructor=teacher,
+                   category=category, is_published=True)
+            for i in range(15)
+        ])
+    
+    def test_follows_the_next_cursor(self):
+        first = self.client.get(reverse('courses:course_list'))
+        cursor = first.context['page_obj'].next_page_number()
+        second = self.client.get(reverse('courses:course_list'), {'page': cursor})
+        self.assertEqual(second.context['page_obj'].number, 2)
+        self.assertEqual(len(second.context['courses']), 3)
+        self.assertFalse(set(first.context['courses']) & set(second.context['courses']))
+    
+    def test_numbered_page_link_gets_the_first_page(self):
+        first = self.client.get(reverse('courses:course_list'))
+        for page in ('2', 'garbage'):
+            with self.subTest(page=page):
+                response = self.client.get(reverse('courses:course_list'), {'page': page})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['page_obj'].number, 1)
+                self.assertEqual(list(response.context['courses']), list(first.context['courses']))
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-3', 10), (0, 3))
+        self.assertEqual(parse_range('bytes=4-', 10), (4, 9))
+        self.assertEqual(parse_range('bytes=2-99', 10), (2, 9))
+        self.assertEqual(parse_range('bytes=-4', 10), (6, 9))
+        self.assertEqual(parse_range('bytes=-99', 10), (0, 9))
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 10))
+        self.assertIsNone(parse_range('', 10))
+    
+    def test_unsatisfiable_ranges(self):
+        for header, size in (('bytes=10-', 10), ('bytes=5-2', 10), ('bytes=-0', 10), ('bytes=-5', 0), ('bytes=0-', 0)):
+            with self.subTest(header=header, size=size):
+                with self.assertRaises(ValueError):
+                    parse_range(header, size)
+
+
+class InitialRankingTests(TestCase):
+    def test_new_course_starts_at_the_score_the_ranking_job_gives_it(self):
+        teacher = User.objects.create(username='teacher', user_type='teacher')
+        category = Category.objects.create(name='Category')
+        rated = Course.objects.create(title='Rated', description='Description', instructor=teacher, category=category)
+        Course.objects.filter(pk=rated.pk).update(rating_count=4, rating_sum=14)
+        
+        course = Course.objects.create(title='New', description='Description', instructor=teacher, category=category)
+        self.assertGreater(course.ranking_score, 0)
+        update_rankings(now=course.created_at)
+        stored = Course.objects.get(pk=course.pk).ranking_score
+        self.assertEqual(course.ranking_score, stored)
+
+
+class FTS5SearchTests(TestCase):
+    def setUp(self):
+        teacher = User.objects.create(username='teacher', user_type='teacher')
+        self.category = Category.objects.create(name='Programming')
+        other = Category.objects.create(name='Cooking')
+        self.python = Course.objects.create(
+            title='Python basics', description='Learn python quickly', instructor=teacher, category=self.category,
+        )
+        self.cooking = Course.objects.create(
+            title='Cooking', description='Python snake recipes, more python and python again',
+            instructor=teacher, category=other,
+        )
+        self.backend = SQLiteFTS5Backend()
+    
+    def test_ranks_title_matches_first_with_snippets(self):
+        results = list(self.backend.search(Course.objects.all(), 'pyth'))
+        self.assertEqual(results, [self.python, self.cooking])
+        self.assertIn(SNIPPET_START, results[0].search_snippet)
+        self.assertLess(results[0].search_rank, results[1].search_rank)
+    
+    def test_composes_with_the_rest_of_the_queryset(self):
+        found = self.backend.search(Course.objects.all(), 'python')
+        self.assertEqual(list(found.filter(category=self.category)), [self.python])
+        self.assertEqual(found.count(), 2)
+        self.assertEqual(set(found.values_list('title', flat=True)), {'Python basics', 'Cooking'})
+        self.assertFalse(self.backend.search(Course.objects.all(), '"AND OR *(').exists())
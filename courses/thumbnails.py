@@ -0,0 +1,200 @@
+"""
+Responsive derivatives of course thumbnails and profile pictures.
+
+When an image is uploaded or replaced, the receivers in courses/models.py
+and accounts/models.py queue it here. A small thread pool resizes it to the
+THUMBNAIL_WIDTHS, in WebP and JPEG. This happens after the transaction
+commits, so the form request never waits for Pillow. Derivatives are stored
+under thumbnails/<hash of the source name>/ with a manifest.json of the widths
+built. Storage names change whenever a file is replaced, so the hashed
+directory changes too and stale derivatives are never served.
+
+The ``responsive_image`` template tag reads the manifest (through the cache)
+to emit ``srcset``. It falls back to the original file until the derivatives
+exist.
+"""
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# (extension, Pillow format, MIME type)
+FORMATS = (
+    ('webp', 'WEBP', 'image/webp'),
+    ('jpg', 'JPEG', 'image/jpeg'),
+)
+MISSING = 'missing'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _widths():
+    return getattr(settings, 'THUMBNAIL_WIDTHS', (160, 320, 480, 640, 960, 1280))
+
+
+def _digest(name):
+    return hashlib.sha256(name.encode()).hexdigest()[:24]
+
+
+def derivative_dir(name):
+    digest = _digest(name)
+    return f'thumbnails/{digest[:2]}/{digest}'
+
+
+def derivative_name(name, width, extension):
+    return f'{derivative_dir(name)}/{width}.{extension}'
+
+
+def manifest_name(name):
+    return f'{derivative_dir(name)}/manifest.json'
+
+
+def _cache_key(name):
+    return f'thumbnails:manifest:{_digest(name)}'
+
+
+def _encode(image, pil_format):
+    buffer = BytesIO()
+    if pil_format == 'JPEG':
+        if image.mode != 'RGB':
+            # JPEG has no alpha channel: flatten onto white
+            from PIL import Image
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+            image = background
+        image.save(buffer, 'JPEG', quality=getattr(settings, 'THUMBNAIL_QUALITY', 80), optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'WEBP', quality=getattr(settings, 'THUMBNAIL_QUALITY', 80), method=4)
+    return buffer.getvalue()
+
+
+def _replace(storage, name, content):
+    # Derivative names are fixed, so never let the storage pick an alternative
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(content))
+
+
+def build_thumbnails(name, storage=default_storage, force=False):
+    """Build the derivatives of the image stored as ``name``; returns its manifest"""
+    if not force:
+        manifest = get_manifest(name, storage)
+        if manifest:
+            return manifest
+
+    from PIL import Image, ImageOps
+
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    width, height = image.size
+    # Never upscale: sizes wider than the source collapse to the source width
+    widths = sorted({min(w, width) for w in _widths()})
+    for target in widths:
+        resized = image if target == width else image.resize(
+            (target, max(round(height * target / width), 1)), Image.LANCZOS
+        )
+        for extension, pil_format, content_type in FORMATS:
+            _replace(storage, derivative_name(name, target, extension), _encode(resized, pil_format))
+
+    manifest = {'source': name, 'width': width, 'height': height, 'widths': widths}
+    # Written last: its presence means every derivative is in place
+    _replace(storage, manifest_name(name), json.dumps(manifest).encode())
+    cache.set(_cache_key(name), manifest, timeout=None)
+    return manifest
+
+
+def get_manifest(name, storage=default_storage):
+    """The manifest of ``name``, or None while its derivatives are not built"""
+    manifest = cache.get(_cache_key(name))
+    if manifest is None:
+        try:
+            with storage.open(manifest_name(name), 'rb') as file:
+                manifest = json.loads(file.read())
+            cache.set(_cache_key(name), manifest, timeout=None)
+        except (OSError, ValueError):
+            manifest = MISSING
+            # Briefly remember the miss; a worker may be building it right now
+            cache.set(_cache_key(name), manifest, timeout=60)
+    return None if manifest == MISSING else manifest
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def _build_logged(name):
+    try:
+        build_thumbnails(name)
+    except Exception:
+        logger.exception('Could not build thumbnails for %s', name)
+
+
+def schedule_thumbnails(name):
+    """Build the derivatives of ``name`` in the worker pool once the transaction commits"""
+    if not name:
+        return
+    if getattr(settings, 'THUMBNAIL_SYNC', False):
+        transaction.on_commit(lambda: _build_logged(name))
+    elif getattr(settings, 'THUMBNAIL_USE_JOBS', False):
+        # Built by `runworker` instead of this process (see jobs/queue.py)
+        from jobs.queue import enqueue
+        enqueue('courses.build_thumbnails', args=[name], unique_key=f'thumbnails:{name}')
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_build_logged, name))
+
+
+def build_many(names, workers=None, force=False):
+    """Build derivatives for ``names`` in a dedicated pool; returns (built, failed)"""
+    def build(name):
+        try:
+            build_thumbnails(name, force=force)
+            return True
+        except Exception:
+            logger.exception('Could not build thumbnails for %s', name)
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers or getattr(settings, 'THUMBNAIL_WORKERS', 2)) as pool:
+        results = list(pool.map(build, names))
+    return results.count(True), results.count(False)
+
+
+def srcsets(name, storage=default_storage):
+    """{'webp': srcset, 'jpg': srcset, 'src': fallback url} or None while not built"""
+    manifest = get_manifest(name, storage)
+    if not manifest:
+        return None
+    result = {}
+    for extension, pil_format, content_type in FORMATS:
+        result[extension] = ', '.join(
+            f'{storage.url(derivative_name(name, width, extension))} {width}w'
+            for width in manifest['widths']
+        )
+    middle = manifest['widths'][len(manifest['widths']) // 2]
+    result['src'] = storage.url(derivative_name(name, middle, 'jpg'))
+    result['width'] = manifest['width']
+    result['height'] = manifest['height']
+    return result
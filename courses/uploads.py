@@ -0,0 +1,181 @@
+"""
+Resumable chunked uploads for lecture videos.
+
+Protocol (JSON endpoints in courses/teacher_views.py):
+
+1. POST a session with the file name and size; the reply holds the upload id
+   and the chunk size to use.
+2. PUT each chunk, in any order and in parallel if you like, with its
+   SHA-256 in the ``X-Chunk-SHA256`` header. Chunks are hashed while they
+   stream in and written straight to their offset in a preallocated partial
+   file under MEDIA_ROOT, so a chunk never sits in memory or in a temp file.
+   A chunk is only recorded as received once its checksum matches; a resent
+   chunk that fails the check is dropped and has to be sent again.
+3. After a dropped connection, GET the session to see which chunks arrived
+   and send only the missing ones.
+4. POST complete: the partial file is moved into the content-addressed store
+   (courses/storage.py) without a second copy. The video form then takes the
+   upload id instead of a file.
+
+A session may also be opened with the upload fingerprint: a digest of the
+SHA-256 of every chunk. If the same user already uploaded a video with that
+fingerprint, the session is complete at once and no bytes are sent. Other
+users' files are never matched: a fingerprint is no proof of holding the
+bytes, and the reply would tell whether someone stored the file.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from .models import MediaBlob, Video, VideoUpload, VideoUploadChunk
+
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+def upload_chunk_size():
+    return getattr(settings, 'VIDEO_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+
+
+def _max_size():
+    return getattr(settings, 'VIDEO_UPLOAD_MAX_SIZE', 10 * 1024 * 1024 * 1024)
+
+
+def upload_fingerprint(chunk_size, chunk_digests):
+    """Fingerprint of a file from the SHA-256 hex digests of its chunks, in order"""
+    return f"{chunk_size}:{hashlib.sha256(''.join(chunk_digests).encode()).hexdigest()}"
+
+
+def _video_storage():
+    return Video._meta.get_field('video_file').storage
+
+
+def start_upload(module, user, filename, total_size, video=None, fingerprint=''):
+    if total_size <= 0:
+        raise UploadError('The file is empty.')
+    if total_size > _max_size():
+        raise UploadError('The file is larger than the upload limit.')
+
+    upload = VideoUpload(
+        module=module,
+        uploaded_by=user,
+        video=video,
+        filename=os.path.basename(filename)[:255] or 'video.mp4',
+        total_size=total_size,
+        chunk_size=upload_chunk_size(),
+    )
+    if fingerprint:
+        # Same video uploaded before by this user: reuse the stored blob, send nothing
+        own_files = VideoUpload.objects.filter(uploaded_by=user).exclude(status='uploading').values('file_name')
+        blob = MediaBlob.objects.filter(
+            upload_fingerprint=fingerprint, size=total_size, name__in=own_files,
+        ).first()
+        if blob is not None and _video_storage().exists(blob.name):
+            upload.file_name = blob.name
+            upload.status = 'complete'
+            upload.save()
+            return upload
+
+    upload.save()
+    os.makedirs(os.path.dirname(upload.partial_path), exist_ok=True)
+    # Sparse preallocation: chunks are written at their own offsets
+    with open(upload.partial_path, 'wb') as partial:
+        partial.truncate(total_size)
+    return upload
+
+
+def upload_status(upload, chunks=None):
+    if chunks is None:
+        chunks = list(upload.chunks.values_list('index', 'size'))
+    received = sorted(index for index, size in chunks)
+    received_bytes = sum(size for index, size in chunks)
+    return {
+        'upload_id': str(upload.id),
+        'status': upload.status,
+        'filename': upload.filename,
+        'total_size': upload.total_size,
+        'chunk_size': upload.chunk_size,
+        'total_chunks': upload.total_chunks,
+        'received_chunks': received,
+        'received_bytes': received_bytes,
+        'progress': round(received_bytes * 100 / upload.total_size, 1),
+    }
+
+
+def write_chunk(upload, index, stream, sha256):
+    """Stream one chunk from ``stream`` into place, verifying its length and checksum"""
+    if upload.status != 'uploading':
+        raise UploadError('This upload is already complete.')
+    if not 0 <= index < upload.total_chunks:
+        raise UploadError('Chunk index out of range.')
+    if not sha256:
+        raise UploadError('Missing X-Chunk-SHA256 header.')
+
+    expected = upload.chunk_length(index)
+    digest = hashlib.sha256()
+    offset = index * upload.chunk_size
+    written = 0
+    # The bytes at this offset are about to change: the chunk counts as missing
+    # until the new body is verified, so a bad retry must be sent again
+    VideoUploadChunk.objects.filter(upload=upload, index=index).delete()
+    fd = os.open(upload.partial_path, os.O_WRONLY)
+    try:
+        while written < expected:
+            data = stream.read(min(READ_SIZE, expected - written))
+            if not data:
+                break
+            digest.update(data)
+            os.pwrite(fd, data, offset + written)
+            written += len(data)
+        extra = stream.read(1)
+    finally:
+        os.close(fd)
+
+    if written != expected or extra:
+        raise UploadError(f'Chunk {index} must be exactly {expected} bytes.')
+    if digest.hexdigest() != sha256.lower():
+        raise UploadError(f'Checksum mismatch for chunk {index}; send it again.')
+
+    VideoUploadChunk.objects.update_or_create(
+        upload=upload, index=index,
+        defaults={'size': written, 'sha256': digest.hexdigest()},
+    )
+
+
+def complete_upload(upload):
+    """Move the assembled file into the video storage; returns its storage name"""
+    if upload.status != 'uploading':
+        return upload.file_name
+    digests = list(upload.chunks.order_by('index').values_list('sha256', flat=True))
+    missing = upload.total_chunks - len(digests)
+    if missing:
+        raise UploadError(f'{missing} chunk(s) are still missing.')
+
+    field = Video._meta.get_field('video_file')
+    name = field.storage.adopt(upload.partial_path, field.generate_filename(None, upload.filename))
+    MediaBlob.objects.filter(name=name, upload_fingerprint='').update(
+        upload_fingerprint=upload_fingerprint(upload.chunk_size, digests)
+    )
+
+    upload.file_name = name
+    upload.status = 'complete'
+    upload.save(update_fields=['file_name', 'status', 'updated_at'])
+    upload.chunks.all().delete()
+    return name
+
+
+def attach_upload(upload, video):
+    """Record that the saved ``video`` now uses the file of ``upload``"""
+    upload.video = video
+    upload.status = 'attached'
+    upload.save(update_fields=['video', 'status', 'updated_at'])
+
+
+def discard_upload(upload):
+    """Delete an unfinished or unattached upload (gc_media reclaims its blob)"""
+    if upload.status == 'uploading' and os.path.exists(upload.partial_path):
+        os.remove(upload.partial_path)
+    upload.delete()
@@ -14,10 +14,12 @@ urlpatterns = [
     path('teacher/course/<slug:slug>/delete/', views.DeleteCourseView.as_view(), name='delete_course'),
     path('teacher/course/<slug:slug>/modules/', views.ManageModulesView.as_view(), name='manage_modules'),
     path('course/<slug:slug>/watch/<int:video_id>/', views.VideoPlayerView.as_view(), name='video_player'),
+    path('course/<slug:slug>/stream/<int:video_id>/', views.VideoStreamView.as_view(), name='video_stream'),
     
     # Comprehensive Teacher Management URLs
     path('teacher/course/<slug:slug>/manage/', teacher_views.CourseManagementView.as_view(), name='course_management'),
     path('teacher/course/<slug:slug>/students/', teacher_views.StudentProgressView.as_view(), name='student_progress'),
+    path('teacher/course/<slug:slug>/students/export/', teacher_views.StudentProgressExportView.as_view(), name='student_progress_export'),
     
     # Posts Management
     path('teacher/course/<slug:slug>/posts/', teacher_views.CoursePostsView.as_view(), name='course_posts'),
@@ -34,4 +36,10 @@ urlpatterns = [
     path('teacher/module/<int:module_id>/videos/create/', teacher_views.CreateVideoView.as_view(), name='create_video'),
     path('teacher/videos/<int:pk>/edit/', teacher_views.EditVideoView.as_view(), name='edit_video'),
     path('teacher/videos/<int:pk>/delete/', teacher_views.DeleteVideoView.as_view(), name='delete_video'),
+    
+    # Resumable video uploads
+    path('teacher/module/<int:module_id>/uploads/', teacher_views.StartVideoUploadView.as_view(), name='start_video_upload'),
+    path('teacher/uploads/<uuid:upload_id>/', teacher_views.VideoUploadStatusView.as_view(), name='video_upload_status'),
+    path('teacher/uploads/<uuid:upload_id>/chunks/<int:index>/', teacher_views.VideoUploadChunkView.as_view(), name='video_upload_chunk'),
+    path('teacher/uploads/<uuid:upload_id>/complete/', teacher_views.CompleteVideoUploadView.as_view(), name='complete_video_upload'),
 ]
@@ -1,51 +1,58 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
+from django.views.generic import View, ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
+from django.http import Http404, HttpResponseForbidden
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.db.models import Q, Avg
-from .models import Course, Category, Module, Video, Post
+from django.db.models import Avg, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import Course, Category, Module, Video, Post, CourseStats
 from .forms import CourseForm, ModuleForm, VideoForm, PostForm
+from .search import get_search_backend
+from .pagination import CursorPaginationMixin
+from .snapshots import get_home_snapshot
+from .curriculum import get_curriculum
+from .streaming import stream_file
+from .teacher_views import get_taught_course_or_404
+from accounts.models import User
+from core.object_cache import get_cached, get_cached_or_404
+from core.replicas import ReplicaReadMixin
+from analytics.events import record_event
+from analytics.models import LearningEvent
+from analytics.rollup import course_activity
+from enrollments.entitlements import enrollment_id_for, get_entitlements, is_enrolled
 from enrollments.models import Enrollment
 
-class HomeView(TemplateView):
+class HomeView(ReplicaReadMixin, TemplateView):
     template_name = 'home.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        from accounts.models import User
-        
-        # Featured courses (top 6 by rating)
-        context['featured_courses'] = Course.objects.filter(is_published=True).select_related('instructor', 'category').annotate(avg_rating=Avg('ratings__score')).order_by('-avg_rating')[:6]
-        
-        # Categories
-        context['categories'] = Category.objects.all()[:8]
-        
-        # Stats
-        context['total_courses'] = Course.objects.filter(is_published=True).count()
-        context['total_students'] = User.objects.filter(user_type='student').count()
-        context['total_teachers'] = User.objects.filter(user_type='teacher').count()
-        context['total_hours'] = sum(course.modules.all().count() * 2 for course in Course.objects.filter(is_published=True)) or 100  # Estimate 2 hours per module
-        
+        # Featured courses, categories and totals (see courses/snapshots.py)
+        context.update(get_home_snapshot())
         return context
 
-class CourseListView(ListView):
+class CourseListView(ReplicaReadMixin, CursorPaginationMixin, ListView):
     model = Course
     template_name = 'courses/course_list.html'
     context_object_name = 'courses'
     paginate_by = 12
     
+    SORT_ORDERINGS = {
+        'newest': ('-created_at', '-id'),
+        'rating': ('-rating_average', '-id'),
+        'top': ('-ranking_score', '-id'),
+    }
+    
+    def get_cursor_ordering(self):
+        # Relevance-ranked search results keep the offset paginator
+        if self.request.GET.get('search'):
+            return None
+        return self.SORT_ORDERINGS.get(self.request.GET.get('sort'), self.cursor_ordering)
+    
     def get_queryset(self):
         queryset = Course.objects.filter(is_published=True).select_related('instructor', 'category')
         
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search) |
-                Q(instructor__username__icontains=search)
-            )
-        
         category = self.request.GET.get('category')
         if category:
             queryset = queryset.filter(category_id=category)
@@ -53,37 +60,53 @@ class CourseListView(ListView):
         difficulty = self.request.GET.get('difficulty')
         if difficulty:
             queryset = queryset.filter(difficulty=difficulty)
+        
+        search = self.request.GET.get('search')
+        if search:
+            queryset = get_search_backend().search(queryset, search)
             
-        return queryset.annotate(avg_rating=Avg('ratings__score'))
+        return queryset
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['categories'] = Category.objects.all()
         context['difficulties'] = Course.DIFFICULTY_CHOICES
+        context['current_sort'] = self.request.GET.get('sort') if self.request.GET.get('sort') in self.SORT_ORDERINGS else 'newest'
         return context
 
-class CourseDetailView(DetailView):
+class CourseDetailView(ReplicaReadMixin, DetailView):
     model = Course
     template_name = 'courses/course_detail.html'
     context_object_name = 'course'
     
+    def get_object(self, queryset=None):
+        course = get_cached_or_404(Course, slug=self.kwargs['slug'])
+        course.instructor = get_cached(User, pk=course.instructor_id)
+        course.category = get_cached(Category, pk=course.category_id)
+        return course
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        course = self.get_object()
+        course = self.object
+        record_event(LearningEvent.COURSE_VIEW, course.id, self.request.user.pk)
         
         if self.request.user.is_authenticated:
-            context['user_enrolled'] = Enrollment.objects.filter(
-                student=self.request.user, 
-                course=course,
-                enrollment_request__status='approved'
-            ).exists()
-            context['enrollment_request'] = course.enrollment_requests.filter(
-                student=self.request.user
-            ).first()
+            context['user_enrolled'] = is_enrolled(self.request.user, course.id)
+            if not context['user_enrolled']:
+                # Only shown to students who are not enrolled yet
+                context['enrollment_request'] = course.enrollment_requests.filter(
+                    student=self.request.user
+                ).first()
         
         context['modules'] = course.modules.prefetch_related('videos')
         context['ratings'] = course.ratings.select_related('student')[:5]
         context['avg_rating'] = course.average_rating
+        # Precomputed "also took" neighbours (see courses/recommendations.py)
+        context['similar_courses'] = [
+            similarity.similar for similarity in course.similarities.filter(similar__is_published=True)
+            .exclude(similar_id__in=list(get_entitlements(self.request.user)))
+            .select_related('similar__instructor', 'similar__category')[:4]
+        ]
         
         # Add course posts for enrolled students and teachers
         if self.request.user.is_authenticated and (
@@ -95,7 +118,7 @@ class CourseDetailView(DetailView):
         
         return context
 
-class CoursesByCategoryView(ListView):
+class CoursesByCategoryView(ReplicaReadMixin, CursorPaginationMixin, ListView):
     model = Course
     template_name = 'courses/courses_by_category.html'
     context_object_name = 'courses'
@@ -110,7 +133,7 @@ class CoursesByCategoryView(ListView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['category'] = get_object_or_404(Category, id=self.kwargs['category_id'])
+        context['category'] = get_cached_or_404(Category, pk=self.kwargs['category_id'])
         return context
 
 class TeacherDashboardView(LoginRequiredMixin, TemplateView):
@@ -124,32 +147,40 @@ class TeacherDashboardView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        teacher_courses = Course.objects.filter(instructor=self.request.user)
+        # One grouped query for every course row; the counters come from
+        # CourseStats and the average progress from a correlated subquery
+        avg_progress = Enrollment.objects.filter(course_id=OuterRef('pk')).order_by().values('course_id').annotate(
+            avg=Avg('progress_percentage')
+        ).values('avg')[:1]
+        teacher_courses = list(
+            Course.objects.filter(instructor=self.request.user)
+            .select_related('category', 'stats')
+            .annotate(avg_progress=Coalesce(Subquery(avg_progress), Value(0.0)))
+        )
         
-        # Course statistics
+        # Course statistics, totalled from the rows already loaded
         context['courses'] = teacher_courses
-        context['total_courses'] = teacher_courses.count()
-        context['published_courses'] = teacher_courses.filter(is_published=True).count()
-        context['total_students'] = Enrollment.objects.filter(course__in=teacher_courses).count()
+        context['total_courses'] = len(teacher_courses)
+        context['published_courses'] = sum(1 for course in teacher_courses if course.is_published)
+        context['total_students'] = sum(course.total_students for course in teacher_courses)
         
         # Recent enrollments
         context['recent_enrollments'] = Enrollment.objects.filter(
-            course__in=teacher_courses
+            course__instructor=self.request.user
         ).select_related('student', 'course').order_by('-enrolled_at')[:5]
         
+        # Learner activity of the last 30 days, from the daily rollups
+        activity = course_activity([course.id for course in teacher_courses], days=30)
+        
         # Course progress data
-        course_data = []
-        for course in teacher_courses:
-            enrollments = course.enrollments.all()
-            total_videos = Video.objects.filter(module__course=course).count()
-            course_data.append({
-                'course': course,
-                'total_students': enrollments.count(),
-                'total_videos': total_videos,
-                'total_modules': course.modules.count(),
-                'avg_progress': enrollments.aggregate(avg_progress=Avg('progress_percentage'))['avg_progress'] or 0
-            })
-        context['course_data'] = course_data
+        context['course_data'] = [{
+            'course': course,
+            'total_students': course.total_students,
+            'total_videos': course.total_videos,
+            'total_modules': course.total_modules,
+            'avg_progress': course.avg_progress,
+            'activity': activity.get(course.id, {}),
+        } for course in teacher_courses]
         
         return context
 
@@ -193,18 +224,14 @@ class DeleteCourseView(LoginRequiredMixin, DeleteView):
     success_url = reverse_lazy('courses:teacher_dashboard')
     
     def get_queryset(self):
-        return Course.objects.filter(instructor=self.request.user)
+        return Course.objects.filter(instructor=self.request.user).select_related('stats')
 
 class ManageModulesView(LoginRequiredMixin, TemplateView):
     template_name = 'courses/manage_modules.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        course = get_object_or_404(
-            Course, 
-            slug=self.kwargs['slug'], 
-            instructor=self.request.user
-        )
+        course = get_taught_course_or_404(self.request.user, self.kwargs['slug'])
         context['course'] = course
         context['modules'] = course.modules.prefetch_related('videos')
         return context
@@ -215,35 +242,66 @@ class VideoPlayerView(LoginRequiredMixin, DetailView):
     context_object_name = 'video'
     pk_url_kwarg = 'video_id'
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        video = self.get_object()
-        course = video.module.course
+    def get_queryset(self):
+        return Video.objects.select_related('module__course__stats')
+    
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        course = self.object.module.course
         
         # Check if user is enrolled
-        enrollment = Enrollment.objects.filter(
-            student=self.request.user,
-            course=course,
-            enrollment_request__status='approved'
-        ).first()
-        
-        if not enrollment and not video.is_free:
-            messages.error(self.request, 'You need to be enrolled to watch this video.')
+        self.enrollment_id = enrollment_id_for(request.user, course.id)
+        if not self.enrollment_id and not self.object.is_free:
+            messages.error(request, 'You need to be enrolled to watch this video.')
             return redirect('courses:course_detail', slug=course.slug)
+        record_event(LearningEvent.VIDEO_START, course.id, request.user.pk, self.object.id)
         
-        # Get all videos in course order
-        all_videos = Video.objects.filter(module__course=course).order_by('module__order', 'order')
-        video_list = list(all_videos)
+        context = self.get_context_data(object=self.object)
+        return self.render_to_response(context)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        video = self.object
+        course = video.module.course
+        # Shown in the progress panel; the access check above needed no query
+        enrollment = Enrollment.objects.filter(pk=self.enrollment_id).first() if self.enrollment_id else None
         
-        try:
-            current_index = video_list.index(video)
-            context['previous_video'] = video_list[current_index - 1] if current_index > 0 else None
-            context['next_video'] = video_list[current_index + 1] if current_index < len(video_list) - 1 else None
-        except ValueError:
-            context['previous_video'] = None
-            context['next_video'] = None
+        # Module/video order, shared by the sidebar and previous/next navigation
+        curriculum = get_curriculum(course.id)
+        context['curriculum'] = curriculum
+        context['previous_video'], context['next_video'] = curriculum.neighbours(video.id)
         
         context['course'] = course
         context['enrollment'] = enrollment
         context['user_enrolled'] = bool(enrollment)
         return context
+
+class VideoStreamView(View):
+    """Serves course videos with HTTP Range support after an access check"""
+    
+    def get(self, request, slug, video_id):
+        video = get_object_or_404(
+            Video.objects.select_related('module__course'),
+            pk=video_id,
+            module__course__slug=slug
+        )
+        if not video.video_file:
+            raise Http404('This video has no file yet.')
+        
+        course = video.module.course
+        user = request.user
+        allowed = video.is_free or (user.is_authenticated and (
+            user == course.instructor or
+            user.is_admin or
+            user.is_staff or
+            is_enrolled(user, course.id)
+        ))
+        if not allowed:
+            return HttpResponseForbidden('You need to be enrolled to watch this video.')
+        
+        try:
+            path = video.video_file.path
+        except NotImplementedError:
+            # Remote storage: let it serve the file
+            return redirect(video.video_file.url)
+        return stream_file(request, path, video.video_file.name, content_type='video/mp4')
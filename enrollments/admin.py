@@ -1,5 +1,7 @@
 from django.contrib import admin
 from django.utils import timezone
+from . import approvals
+from .entitlements import invalidate_entitlements
 from .models import EnrollmentRequest, Enrollment, VideoProgress
 
 @admin.register(EnrollmentRequest)
@@ -21,33 +23,17 @@ class EnrollmentRequestAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
     
     def approve_requests(self, request, queryset):
-        approved_count = 0
-        for enrollment_request in queryset.filter(status='pending'):
-            # Update request status
-            enrollment_request.status = 'approved'
-            enrollment_request.reviewed_by = request.user
-            enrollment_request.reviewed_at = timezone.now()
-            enrollment_request.save()
-            
-            # Create enrollment to give student access to course
-            enrollment, created = Enrollment.objects.get_or_create(
-                student=enrollment_request.student,
-                course=enrollment_request.course,
-                defaults={'enrollment_request': enrollment_request}
-            )
-            
-            if created:
-                approved_count += 1
-                # Send notification to student (can be enhanced later)
-                print(f"✅ Student {enrollment_request.student.username} enrolled in {enrollment_request.course.title}")
-        
-        if approved_count > 0:
-            self.message_user(request, f"✅ {approved_count} enrollment requests approved successfully! Students now have access to their courses.")
+        result = approvals.approve_requests(queryset, reviewer=request.user)
+        if result.created > 0:
+            self.message_user(request, f"✅ {result.created} enrollment requests approved successfully! Students now have access to their courses.")
         else:
             self.message_user(request, "No new enrollments created (students may already be enrolled).")
+        if result.skipped:
+            self.message_user(request, f"{result.skipped} selected requests were skipped (already reviewed or already enrolled).")
     approve_requests.short_description = "Approve selected enrollment requests"
     
     def reject_requests(self, request, queryset):
+        invalidate_entitlements(queryset.values_list('student_id', flat=True))
         queryset.update(
             status='rejected',
             reviewed_by=request.user,
@@ -61,7 +47,7 @@ class EnrollmentAdmin(admin.ModelAdmin):
     list_display = ['student', 'course', 'progress_percentage', 'enrolled_at', 'is_completed']
     list_filter = ['enrolled_at', 'completed_at', 'course__category']
     search_fields = ['student__username', 'course__title']
-    readonly_fields = ['enrolled_at']
+    readonly_fields = ['enrolled_at', 'progress_percentage', 'completed_at']
 
 @admin.register(VideoProgress)
 class VideoProgressAdmin(admin.ModelAdmin):
@@ -0,0 +1,104 @@
+"""
+Bulk approval of enrollment requests.
+
+Approving a cohort one request at a time would cost a save, a signal and two
+get_or_create lookups per student. approve_requests() does it in one
+transaction instead. One UPDATE moves every pending request to approved, and
+one bulk_create(ignore_conflicts=True) adds the missing Enrollments.
+Duplicates are skipped by the unique (student, course) constraint. The
+confirmation emails are written to the notification outbox in the same
+transaction.
+
+bulk_create sends no post_save. The CourseStats enrollment counters are
+therefore moved here, from per-course counts taken before and after the
+insert, and the students' cached entitlements are invalidated. The same
+counts give the exact number of enrollments created, even when another
+process enrolls some of the students at the same time.
+"""
+import logging
+from collections import Counter, namedtuple
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from notifications.outbox import enqueue_enrollment_approved
+
+from .entitlements import invalidate_entitlements
+
+logger = logging.getLogger(__name__)
+
+ApprovalResult = namedtuple('ApprovalResult', ['approved', 'created', 'skipped'])
+
+
+def _enrollments_per_course(request_ids):
+    from .models import Enrollment
+
+    return Counter(dict(
+        Enrollment.objects.filter(enrollment_request_id__in=request_ids)
+        .order_by().values('course_id').annotate(n=Count('pk')).values_list('course_id', 'n')
+    ))
+
+
+def create_enrollments(requests):
+    """
+    Create the missing Enrollments of approved ``requests`` (a queryset or
+    a list of EnrollmentRequest); returns how many were created.
+    """
+    from courses.models import CourseStats
+    from .models import Enrollment
+
+    rows = [
+        (request.pk, request.student_id, request.course_id)
+        for request in requests
+    ]
+    if not rows:
+        return 0
+    request_ids = [pk for pk, student_id, course_id in rows]
+    with transaction.atomic():
+        before = _enrollments_per_course(request_ids)
+        Enrollment.objects.bulk_create(
+            [
+                Enrollment(enrollment_request_id=pk, student_id=student_id, course_id=course_id)
+                for pk, student_id, course_id in rows
+            ],
+            ignore_conflicts=True,
+            batch_size=500,
+        )
+        created = _enrollments_per_course(request_ids)
+        created.subtract(before)
+        for course_id, count in created.items():
+            CourseStats.objects.adjust(course_id=course_id, enrollment_count=count)
+        invalidate_entitlements(student_id for pk, student_id, course_id in rows)
+        # Committed or rolled back together with the approval
+        enqueue_enrollment_approved(request_ids)
+    total = sum(created.values())
+    if total:
+        logger.info('Created %d enrollment(s) for %d approved request(s)', total, len(rows))
+    return total
+
+
+def approve_requests(queryset, reviewer=None, now=None):
+    """
+    Approve the pending requests of ``queryset`` and enroll their students.
+    Returns an ApprovalResult: requests approved, enrollments created, and
+    selected requests that produced no new enrollment (already reviewed, or
+    the student was already enrolled).
+    """
+    from .models import EnrollmentRequest
+
+    now = now or timezone.now()
+    with transaction.atomic():
+        selected = queryset.count()
+        pending = list(
+            queryset.filter(status='pending').select_for_update()
+            .only('pk', 'student_id', 'course_id')
+        )
+        approved = EnrollmentRequest.objects.filter(pk__in=[request.pk for request in pending]).update(
+            status='approved',
+            reviewed_by=reviewer,
+            reviewed_at=now,
+            updated_at=now,
+        )
+        created = create_enrollments(pending)
+    return ApprovalResult(approved=approved, created=created, skipped=selected - created)
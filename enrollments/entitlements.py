@@ -0,0 +1,64 @@
+"""
+Per-user course entitlements for access checks.
+
+Each user's approved enrollments are cached as ``{course_id: enrollment_id}``
+under a per-user versioned key (see core/cache_versions.py). Access checks
+in the course pages are then a dict lookup instead of a joined query. The
+receivers in enrollments/models.py bump the version when one of the user's
+Enrollment or EnrollmentRequest rows changes. Bulk paths that skip signals
+(approvals, the admin reject action) call invalidate_entitlements()
+themselves.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache_versions import bump_version_on_commit, versioned_key
+from core.replicas import pin_users, primary_reads
+
+
+def _version_name(user_id):
+    return f'entitlements:{user_id}'
+
+
+def get_entitlements(user):
+    """``{course_id: enrollment_id}`` of the user's approved enrollments"""
+    if not user.is_authenticated:
+        return {}
+    # Remembered on the user object too, for repeated checks in one request
+    entitlements = getattr(user, '_entitlements', None)
+    if entitlements is not None:
+        return entitlements
+
+    from .models import Enrollment
+
+    key = versioned_key(_version_name(user.pk))
+    entitlements = cache.get(key)
+    if entitlements is None:
+        with primary_reads():
+            entitlements = dict(
+                Enrollment.objects.filter(student_id=user.pk, enrollment_request__status='approved')
+                .order_by().values_list('course_id', 'pk')
+            )
+        cache.set(key, entitlements, timeout=getattr(settings, 'ENTITLEMENT_CACHE_TIMEOUT', 24 * 60 * 60))
+    user._entitlements = entitlements
+    return entitlements
+
+
+def enrollment_id_for(user, course_id):
+    """Id of the user's approved enrollment in the course, or None"""
+    return get_entitlements(user).get(course_id)
+
+
+def is_enrolled(user, course_id):
+    return course_id in get_entitlements(user)
+
+
+def invalidate_entitlements(user_ids):
+    """
+    Drop the cached entitlements of ``user_ids`` once the transaction
+    commits, and keep their reads on the primary until replicas catch up.
+    """
+    user_ids = set(user_ids)  # may be a generator
+    for user_id in user_ids:
+        bump_version_on_commit(_version_name(user_id))
+    pin_users(user_ids)
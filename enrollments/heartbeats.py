@@ -0,0 +1,302 @@
+"""
+Batched ingestion of video watch-progress heartbeats.
+
+The player posts a heartbeat every few seconds. Writing each one straight to
+VideoProgress would mean one UPDATE per learner every few seconds, and SQLite
+has a single writer. Instead, heartbeats are appended to a buffer. The flusher
+coalesces them per (enrollment, video), keeping the furthest position and any
+completion. It then writes each batch with one SELECT and one bulk upsert.
+
+Two buffers are available, chosen by HEARTBEAT_BUFFER:
+
+* ``'local'`` – an in-process dict, already coalesced on append. A daemon
+  thread flushes it every HEARTBEAT_FLUSH_INTERVAL seconds, or as soon as it
+  holds HEARTBEAT_BATCH_SIZE entries.
+* ``'cache'`` – events are appended to the shared Django cache under an
+  atomic sequence number. Every web process can see them, and
+  ``flush_heartbeats --loop`` drains them in sequence order, one drainer
+  at a time under a short cache lock. An append takes its number before it
+  stores the event, so a drain stops at the first missing number and picks
+  it up next time. Only a number missing for HEARTBEAT_GAP_GRACE seconds
+  (its appender died) is skipped.
+
+Flush metrics (interval, batch size, rows written, lag of the oldest event)
+are kept in the cache; see heartbeat_metrics().
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = 'heartbeats:metrics'
+SEQUENCE_KEY = 'heartbeats:sequence'
+FLUSHED_KEY = 'heartbeats:flushed'
+EVENT_KEY = 'heartbeats:event:{}'
+GAP_KEY = 'heartbeats:gap:{}'
+DRAIN_LOCK_KEY = 'heartbeats:drain-lock'
+DRAIN_LOCK_SECONDS = 30
+
+
+def flush_interval():
+    return getattr(settings, 'HEARTBEAT_FLUSH_INTERVAL', 5)
+
+
+def batch_size():
+    return getattr(settings, 'HEARTBEAT_BATCH_SIZE', 500)
+
+
+def completion_threshold():
+    return getattr(settings, 'HEARTBEAT_COMPLETION_THRESHOLD', 0.9)
+
+
+def gap_grace():
+    return getattr(settings, 'HEARTBEAT_GAP_GRACE', 60)
+
+
+def _coalesce(entries, event):
+    """Merge ``event`` (enrollment_id, video_id, position, completed, at) into ``entries``"""
+    enrollment_id, video_id, position, completed, at = event
+    key = (enrollment_id, video_id)
+    current = entries.get(key)
+    if current is None:
+        entries[key] = [position, completed, at]
+    else:
+        current[0] = max(current[0], position)
+        current[1] = current[1] or completed
+        current[2] = min(current[2], at)  # oldest event, for the lag metric
+
+
+class LocalHeartbeatBuffer:
+    """Per-process buffer, coalesced on append and flushed by a daemon thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def append(self, event):
+        with self.lock:
+            _coalesce(self.entries, event)
+            full = len(self.entries) >= batch_size()
+        self._ensure_flusher()
+        if full:
+            self.wakeup.set()
+
+    def drain(self, limit):
+        with self.lock:
+            if len(self.entries) <= limit:
+                entries, self.entries = self.entries, {}
+            else:
+                keys = list(self.entries)[:limit]
+                entries = {key: self.entries.pop(key) for key in keys}
+        return entries
+
+    def size(self):
+        return len(self.entries)
+
+    def _ensure_flusher(self):
+        if self.thread is not None or not getattr(settings, 'HEARTBEAT_AUTOFLUSH', True):
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='heartbeat-flusher', daemon=True)
+                self.thread.start()
+                atexit.register(flush_heartbeats)
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(flush_interval())
+            self.wakeup.clear()
+            try:
+                close_old_connections()
+                while flush_heartbeats() >= batch_size():
+                    pass
+            except Exception:
+                logger.exception('Heartbeat flush failed')
+            finally:
+                close_old_connections()
+
+
+class CacheHeartbeatBuffer:
+    """Buffer in the shared cache: one key per event under an atomic sequence"""
+
+    def append(self, event):
+        cache.add(SEQUENCE_KEY, 0, timeout=None)
+        sequence = cache.incr(SEQUENCE_KEY)
+        cache.set(EVENT_KEY.format(sequence), event, timeout=24 * 60 * 60)
+
+    def drain(self, limit):
+        # One drainer at a time, or two processes would write the same events twice
+        if not cache.add(DRAIN_LOCK_KEY, 1, timeout=DRAIN_LOCK_SECONDS):
+            return {}
+        try:
+            return self._drain(limit)
+        finally:
+            cache.delete(DRAIN_LOCK_KEY)
+
+    def _drain(self, limit):
+        flushed = cache.get(FLUSHED_KEY, 0)
+        last = min(cache.get(SEQUENCE_KEY, 0), flushed + limit)
+        sequences = range(flushed + 1, last + 1)
+        if not sequences:
+            return {}
+        events = cache.get_many([EVENT_KEY.format(sequence) for sequence in sequences])
+        entries = {}
+        drained = flushed
+        now = time.time()
+        for sequence in sequences:
+            event = events.get(EVENT_KEY.format(sequence))
+            if event is not None:
+                _coalesce(entries, event)
+            elif not self._abandoned(sequence, now):
+                # Numbered but not stored yet: leave it and what follows for the next drain
+                break
+            drained = sequence
+        if drained > flushed:
+            cache.set(FLUSHED_KEY, drained, timeout=None)
+            done = range(flushed + 1, drained + 1)
+            cache.delete_many([EVENT_KEY.format(sequence) for sequence in done] +
+                              [GAP_KEY.format(sequence) for sequence in done])
+        return entries
+
+    def _abandoned(self, sequence, now):
+        """Whether event ``sequence`` has been missing for HEARTBEAT_GAP_GRACE seconds"""
+        key = GAP_KEY.format(sequence)
+        cache.add(key, now, timeout=24 * 60 * 60)
+        return now - cache.get(key, now) >= gap_grace()
+
+    def size(self):
+        return max(cache.get(SEQUENCE_KEY, 0) - cache.get(FLUSHED_KEY, 0), 0)
+
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def get_buffer():
+    kind = getattr(settings, 'HEARTBEAT_BUFFER', 'local')
+    with _buffers_lock:
+        if kind not in _buffers:
+            _buffers[kind] = CacheHeartbeatBuffer() if kind == 'cache' else LocalHeartbeatBuffer()
+        return _buffers[kind]
+
+
+def record_heartbeat(enrollment_id, video_id, position, completed=False):
+    """Queue one heartbeat; ``position`` is the furthest second watched"""
+    get_buffer().append((enrollment_id, video_id, max(int(position), 0), bool(completed), time.time()))
+
+
+def write_progress(entries, now=None):
+    """
+    Upsert coalesced ``{(enrollment_id, video_id): [position, completed, at]}``
+    into VideoProgress. Returns the keys that became completed.
+    """
+    from analytics.events import record_event
+    from analytics.models import LearningEvent
+    from courses.models import Video
+    from .models import Enrollment, VideoProgress
+    from .progress import apply_completion_deltas
+
+    if not entries:
+        return []
+    now = now or timezone.now()
+    enrollments = {pk: (course_id, student_id) for pk, course_id, student_id in Enrollment.objects.filter(
+        pk__in={enrollment_id for enrollment_id, video_id in entries}
+    ).order_by().values_list('pk', 'course_id', 'student_id')}
+    enrollment_ids = set(enrollments)
+    video_ids = {video_id for enrollment_id, video_id in entries}
+    durations = dict(Video.objects.filter(pk__in=video_ids).order_by().values_list('pk', 'duration_minutes'))
+    threshold = completion_threshold()
+
+    with transaction.atomic():
+        existing = {
+            (row.enrollment_id, row.video_id): row
+            for row in VideoProgress.objects.filter(enrollment_id__in=enrollment_ids, video_id__in=video_ids)
+            .only('id', 'enrollment_id', 'video_id', 'watched_duration', 'is_completed')
+        }
+        rows, newly_completed = [], []
+        for key, (position, completed, at) in entries.items():
+            if key[0] not in enrollment_ids or key[1] not in durations:
+                continue  # Unenrolled or video deleted meanwhile
+            stored = existing.get(key)
+            watched = max(position, stored.watched_duration if stored else 0)
+            length = durations[key[1]] * 60
+            done = completed or (length > 0 and watched >= length * threshold)
+            was_done = bool(stored and stored.is_completed)
+            if not was_done and done:
+                newly_completed.append(key)
+            rows.append(VideoProgress(
+                enrollment_id=key[0], video_id=key[1], watched_duration=watched,
+                is_completed=was_done or done, last_watched=now,
+            ))
+        VideoProgress.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['enrollment', 'video'],
+            update_fields=['watched_duration', 'is_completed', 'last_watched'],
+            batch_size=500,
+        )
+        # bulk_create sends no signals: move enrollment progress here
+        apply_completion_deltas(Counter(enrollment_id for enrollment_id, video_id in newly_completed))
+    for enrollment_id, video_id in newly_completed:
+        course_id, student_id = enrollments[enrollment_id]
+        record_event(LearningEvent.VIDEO_COMPLETE, course_id, student_id, video_id)
+    return newly_completed
+
+
+def flush_heartbeats(limit=None):
+    """Write up to ``limit`` buffered entries; returns how many were written"""
+    buffer = get_buffer()
+    started = time.time()
+    entries = buffer.drain(limit or batch_size())
+    if not entries:
+        _update_metrics(started, entries, 0, buffer)
+        return 0
+    try:
+        write_progress(entries)
+    except Exception:
+        # Put them back so the next flush retries
+        for (enrollment_id, video_id), (position, completed, at) in entries.items():
+            buffer.append((enrollment_id, video_id, position, completed, at))
+        raise
+    _update_metrics(started, entries, len(entries), buffer)
+    return len(entries)
+
+
+def _update_metrics(started, entries, written, buffer):
+    metrics = cache.get(METRICS_KEY) or {'flushes': 0, 'rows_written': 0}
+    now = time.time()
+    metrics.update({
+        'flush_interval': flush_interval(),
+        'batch_size': batch_size(),
+        'buffer': getattr(settings, 'HEARTBEAT_BUFFER', 'local'),
+        'last_flush_at': now,
+        'last_flush_rows': written,
+        'last_flush_seconds': round(now - started, 4),
+        # How long the oldest heartbeat in the batch waited to be written
+        'last_flush_lag_seconds': round(now - min(at for position, completed, at in entries.values()), 3) if entries else 0,
+        'pending': buffer.size(),
+    })
+    if written:
+        metrics['flushes'] += 1
+        metrics['rows_written'] += written
+    cache.set(METRICS_KEY, metrics, timeout=None)
+
+
+def heartbeat_metrics():
+    metrics = cache.get(METRICS_KEY) or {'flushes': 0, 'rows_written': 0}
+    metrics.setdefault('flush_interval', flush_interval())
+    metrics.setdefault('batch_size', batch_size())
+    metrics['pending_in_process'] = get_buffer().size()
+    if metrics.get('last_flush_at'):
+        metrics['seconds_since_flush'] = round(time.time() - metrics['last_flush_at'], 3)
+    return metrics
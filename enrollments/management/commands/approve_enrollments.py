@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from enrollments.approvals import approve_requests
+from enrollments.models import EnrollmentRequest
+
+class Command(BaseCommand):
+    help = 'Approve pending enrollment requests in bulk and enroll their students'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='course_ids', help='Only requests for this course id (repeatable)')
+        parser.add_argument('--request', type=int, action='append', dest='request_ids', help='Only this request id (repeatable)')
+        parser.add_argument('--all', action='store_true', help='Approve every pending request')
+        parser.add_argument('--reviewer', help='Username recorded as the reviewer')
+    
+    def handle(self, *args, **options):
+        if not (options['course_ids'] or options['request_ids'] or options['all']):
+            raise CommandError('Give --course, --request or --all')
+        requests = EnrollmentRequest.objects.all()
+        if options['course_ids']:
+            requests = requests.filter(course_id__in=options['course_ids'])
+        if options['request_ids']:
+            requests = requests.filter(pk__in=options['request_ids'])
+        reviewer = None
+        if options['reviewer']:
+            try:
+                reviewer = get_user_model().objects.get(username=options['reviewer'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user named {options['reviewer']}")
+        result = approve_requests(requests, reviewer=reviewer)
+        self.stdout.write(self.style.SUCCESS(
+            f'Approved {result.approved} request(s), created {result.created} enrollment(s), skipped {result.skipped}'
+        ))
@@ -0,0 +1,31 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from enrollments.heartbeats import batch_size, flush_heartbeats, flush_interval, heartbeat_metrics
+
+class Command(BaseCommand):
+    help = 'Write buffered video watch-progress heartbeats to VideoProgress'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep flushing every HEARTBEAT_FLUSH_INTERVAL seconds')
+        parser.add_argument('--stats', action='store_true', help='Print the flush metrics and exit')
+    
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(heartbeat_metrics(), indent=2, sort_keys=True))
+            return
+        
+        while True:
+            total = 0
+            while True:
+                written = flush_heartbeats()
+                total += written
+                if written < batch_size():
+                    break
+            if not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Flushed {total} progress rows'))
+                return
+            close_old_connections()
+            time.sleep(flush_interval())
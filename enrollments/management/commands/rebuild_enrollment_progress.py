@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from enrollments.progress import rebuild_progress
+
+class Command(BaseCommand):
+    help = 'Recompute completed video counts, progress_percentage and completed_at of enrollments in one UPDATE'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='course_ids', help='Only this course id (repeatable)')
+    
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = rebuild_progress(options['course_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Recomputed progress of {updated} enrollments'))
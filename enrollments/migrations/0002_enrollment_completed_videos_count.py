@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:24
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_progress(apps, schema_editor):
+    from enrollments.progress import progress_updates
+
+    Enrollment = apps.get_model('enrollments', 'Enrollment')
+    VideoProgress = apps.get_model('enrollments', 'VideoProgress')
+    Video = apps.get_model('courses', 'Video')
+
+    completed = Subquery(
+        VideoProgress.objects.filter(
+            enrollment_id=OuterRef('pk'), is_completed=True, video__module__course_id=OuterRef('course_id'),
+        ).order_by().values('enrollment_id').annotate(n=Count('pk')).values('n')[:1]
+    )
+    total = Subquery(
+        Video.objects.filter(module__course_id=OuterRef('course_id'))
+        .order_by().values('module__course_id').annotate(n=Count('pk')).values('n')[:1]
+    )
+    Enrollment.objects.update(**progress_updates(Coalesce(completed, 0), Coalesce(total, 0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enrollments', '0001_initial'),
+        ('courses', '0008_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_videos_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_progress, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,12 @@
 from django.db import models
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from courses.models import Course
+from courses.models import Course, CourseStats, Video
+from .approvals import create_enrollments
+from .entitlements import invalidate_entitlements
+from .progress import apply_completion_deltas, refresh_course_progress
 
 class EnrollmentRequest(models.Model):
     STATUS_CHOICES = [
@@ -60,6 +64,8 @@ class Enrollment(models.Model):
     enrolled_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     progress_percentage = models.PositiveIntegerField(default=0)
+    # Completed videos of the course; progress_percentage is derived from it (see enrollments/progress.py)
+    completed_videos_count = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         unique_together = ['student', 'course']
@@ -84,6 +90,12 @@ class VideoProgress(models.Model):
     
     def __str__(self):
         return f"{self.enrollment.student.username} - {self.video.title}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_completed = instance.__dict__.get('is_completed')
+        return instance
 
 # Signal to automatically create enrollment when request is approved
 @receiver(post_save, sender=EnrollmentRequest)
@@ -91,15 +103,68 @@ def create_enrollment_on_approval(sender, instance, **kwargs):
     """
     Automatically create an Enrollment when EnrollmentRequest status changes to 'approved'
     """
-    if instance.status == 'approved':
-        # Check if enrollment doesn't already exist
-        enrollment, created = Enrollment.objects.get_or_create(
-            student=instance.student,
-            course=instance.course,
-            defaults={'enrollment_request': instance}
-        )
-        
-        if created:
-            print(f"🎓 Auto-enrolled: {instance.student.username} in {instance.course.title}")
-            # Here you could add email notification or other actions
-            # send_enrollment_confirmation_email(instance.student, instance.course)
+    if instance.status == 'approved' and not Enrollment.objects.filter(enrollment_request=instance).exists():
+        # Also queues the confirmation email (see notifications/outbox.py)
+        create_enrollments([instance])
+
+# Keep the enrollment counter in CourseStats current
+@receiver(post_save, sender=Enrollment)
+def update_stats_on_enrollment_save(sender, instance, created, **kwargs):
+    if created:
+        CourseStats.objects.adjust(course_id=instance.course_id, enrollment_count=1)
+
+@receiver(post_delete, sender=Enrollment)
+def update_stats_on_enrollment_delete(sender, instance, **kwargs):
+    CourseStats.objects.adjust(course_id=instance.course_id, enrollment_count=-1)
+
+# Drop cached access checks (see enrollments/entitlements.py)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_save, sender=EnrollmentRequest)
+@receiver(post_delete, sender=EnrollmentRequest)
+def invalidate_entitlements_on_change(sender, instance, **kwargs):
+    invalidate_entitlements([instance.student_id])
+
+# Keep Enrollment.progress_percentage current (see enrollments/progress.py)
+@receiver(post_save, sender=VideoProgress)
+def update_progress_on_video_progress_save(sender, instance, created, **kwargs):
+    was_completed = False if created else getattr(instance, '_stored_completed', None)
+    instance._stored_completed = instance.is_completed
+    if was_completed is None:
+        # Not loaded from the database: we cannot tell what changed
+        return
+    if was_completed != instance.is_completed:
+        apply_completion_deltas({instance.enrollment_id: 1 if instance.is_completed else -1})
+
+@receiver(post_delete, sender=VideoProgress)
+def update_progress_on_video_progress_delete(sender, instance, origin=None, **kwargs):
+    # Cascades from a deleted video or enrollment are handled by their own receivers
+    if not (isinstance(origin, VideoProgress) or getattr(origin, 'model', None) is VideoProgress):
+        return
+    if getattr(instance, '_stored_completed', instance.is_completed):
+        apply_completion_deltas({instance.enrollment_id: -1})
+
+@receiver(post_save, sender=Video)
+def update_progress_on_video_save(sender, instance, created, **kwargs):
+    moved_from = getattr(instance, '_moved_from_module_id', None)
+    if moved_from:
+        # Completions of the moved video no longer count for the old course
+        Enrollment.objects.filter(
+            course__modules=moved_from,
+            video_progress__video=instance,
+            video_progress__is_completed=True,
+        ).update(completed_videos_count=F('completed_videos_count') - 1)
+        refresh_course_progress(Enrollment.objects.filter(course__modules=moved_from))
+    if created or moved_from:
+        refresh_course_progress(Enrollment.objects.filter(course__modules=instance.module_id))
+
+@receiver(pre_delete, sender=Video)
+def update_progress_before_video_delete(sender, instance, **kwargs):
+    Enrollment.objects.filter(
+        video_progress__video=instance,
+        video_progress__is_completed=True,
+    ).update(completed_videos_count=F('completed_videos_count') - 1)
+
+@receiver(post_delete, sender=Video)
+def update_progress_on_video_delete(sender, instance, **kwargs):
+    refresh_course_progress(Enrollment.objects.filter(course__modules=instance.module_id))
@@ -0,0 +1,84 @@
+"""
+Incremental maintenance of Enrollment.progress_percentage and completed_at.
+
+Each enrollment stores how many of its course's videos are completed
+(``completed_videos_count``). When a VideoProgress row becomes completed or
+stops being completed, that count moves by a delta. When a video is added to
+or removed from a course, only the percentages of that course are
+recalculated, against CourseStats.video_count. Every change is a single
+UPDATE; no progress rows are rescanned. rebuild_progress() is the set-based
+repair for all enrollments.
+"""
+from collections import Counter
+
+from django.db.models import Case, Count, DateTimeField, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Least, NullIf
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual
+from django.utils import timezone
+
+
+def _stored_video_count():
+    from courses.models import CourseStats
+
+    return Subquery(CourseStats.objects.filter(course_id=OuterRef('course_id')).values('video_count')[:1])
+
+
+def progress_updates(completed, total, now=None):
+    """
+    update() kwargs setting the completed count to the expression ``completed``
+    and deriving the percentage and completion time from it and ``total``.
+    """
+    now = now or timezone.now()
+    return {
+        'completed_videos_count': completed,
+        'progress_percentage': Coalesce(Least(completed * 100 / NullIf(total, 0), Value(100)), Value(0)),
+        'completed_at': Case(
+            When(
+                Q(GreaterThan(total, 0)) & Q(GreaterThanOrEqual(completed, total)),
+                then=Coalesce(F('completed_at'), Value(now, output_field=DateTimeField())),
+            ),
+            default=None,
+            output_field=DateTimeField(),
+        ),
+    }
+
+
+def apply_completion_deltas(deltas):
+    """Apply ``{enrollment_id: +n / -n}`` completed-video deltas, one UPDATE per distinct delta"""
+    from .models import Enrollment
+
+    by_delta = {}
+    for enrollment_id, delta in Counter(deltas).items():
+        if delta:
+            by_delta.setdefault(delta, []).append(enrollment_id)
+    for delta, enrollment_ids in by_delta.items():
+        Enrollment.objects.filter(pk__in=enrollment_ids).update(
+            **progress_updates(F('completed_videos_count') + delta, _stored_video_count())
+        )
+
+
+def refresh_course_progress(enrollments):
+    """Recalculate percentages of the ``enrollments`` queryset after its course's video count changed"""
+    enrollments.update(**progress_updates(F('completed_videos_count'), _stored_video_count()))
+
+
+def rebuild_progress(course_ids=None):
+    """Recount every enrollment from VideoProgress and live video counts in one UPDATE"""
+    from courses.models import Video
+    from .models import Enrollment, VideoProgress
+
+    completed = Subquery(
+        VideoProgress.objects.filter(
+            enrollment_id=OuterRef('pk'),
+            is_completed=True,
+            video__module__course_id=OuterRef('course_id'),
+        ).order_by().values('enrollment_id').annotate(n=Count('pk')).values('n')[:1]
+    )
+    total = Subquery(
+        Video.objects.filter(module__course_id=OuterRef('course_id'))
+        .order_by().values('module__course_id').annotate(n=Count('pk')).values('n')[:1]
+    )
+    enrollments = Enrollment.objects.all()
+    if course_ids is not None:
+        enrollments = enrollments.filter(course_id__in=course_ids)
+    return enrollments.update(**progress_updates(Coalesce(completed, 0), Coalesce(total, 0)))
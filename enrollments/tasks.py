@@ -0,0 +1,11 @@
+from jobs.registry import task
+from .heartbeats import flush_heartbeats
+from .progress import rebuild_progress
+
+@task('enrollments.rebuild_progress', priority=-10)
+def rebuild_progress_task(course_ids=None):
+    rebuild_progress(course_ids)
+
+@task('enrollments.flush_heartbeats')
+def flush_heartbeats_task():
+    flush_heartbeats()
@@ -1,3 +1,172 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from accounts.models import User
+from core.replicas import is_pinned
+from core.testing import Budget, QueryBudgetMixin
+from courses.models import Category, Course, Module, Video
+from .entitlements import invalidate_entitlements
+from .heartbeats import EVENT_KEY, SEQUENCE_KEY, CacheHeartbeatBuffer, get_buffer
+from .models import Enrollment, EnrollmentRequest, VideoProgress
+
+
+class EnrollmentQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Cold-cache query budgets of the enrollment pages, against the synthetic catalog"""
+    urls_module = 'enrollments.urls'
+    budgets = {
+        'request_enrollment': Budget(4, user='newcomer', kwargs=lambda data: {'course_slug': data.course.slug}),
+        'my_requests': Budget(3, user='student'),
+        'my_courses': Budget(6, user='student'),
+        'video_heartbeat': Budget(
+            4, user='student', method='post', status=204,
+            data=lambda data: {'video_id': data.video.pk, 'position': 30},
+        ),
+        'heartbeat_metrics': Budget(2, user='staff'),
+    }
+
+
+class VideoMoveProgressTests(TestCase):
+    """Enrollment progress when a completed video moves to another module"""
+    
+    def setUp(self):
+        teacher = User.objects.create(username='teacher', user_type='teacher')
+        student = User.objects.create(username='student')
+        category = Category.objects.create(name='Category')
+        self.course = Course.objects.create(
+            title='Course', description='Description', instructor=teacher, category=category,
+        )
+        other_course = Course.objects.create(
+            title='Other course', description='Description', instructor=teacher, category=category,
+        )
+        self.module = Module.objects.create(course=self.course, title='Module 1', order=1)
+        self.sibling = Module.objects.create(course=self.course, title='Module 2', order=2)
+        self.foreign = Module.objects.create(course=other_course, title='Module', order=1)
+        self.video = Video.objects.create(module=self.module, title='Video 1', video_file='course_videos/1.mp4')
+        Video.objects.create(module=self.module, title='Video 2', video_file='course_videos/2.mp4')
+        EnrollmentRequest.objects.create(
+            student=student, course=self.course, status='approved', phone_number='0100', email='s@example.com',
+        )
+        self.enrollment = Enrollment.objects.get(student=student)
+        VideoProgress.objects.create(enrollment=self.enrollment, video=self.video, is_completed=True)
+    
+    def move(self, module):
+        video = Video.objects.get(pk=self.video.pk)
+        video.module = module
+        video.save()
+        self.enrollment.refresh_from_db()
+    
+    def test_completion_counts_before_move(self):
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.completed_videos_count, self.enrollment.progress_percentage), (1, 50))
+    
+    def test_move_within_course_keeps_completion(self):
+        self.move(self.sibling)
+        self.assertEqual((self.enrollment.completed_videos_count, self.enrollment.progress_percentage), (1, 50))
+    
+    def test_move_to_other_course_drops_completion(self):
+        self.move(self.foreign)
+        self.assertEqual((self.enrollment.completed_videos_count, self.enrollment.progress_percentage), (0, 0))
+
+
+class CacheHeartbeatBufferTests(TestCase):
+    """Draining the shared-cache heartbeat buffer while appends are in flight"""
+    
+    def setUp(self):
+        cache.clear()
+        self.buffer = CacheHeartbeatBuffer()
+    
+    def event(self, enrollment_id):
+        return (enrollment_id, 1, 30, False, 1000.0)
+    
+    def test_drain_waits_for_numbered_event(self):
+        self.buffer.append(self.event(1))
+        # A second append has taken its number but not stored its event yet
+        cache.incr(SEQUENCE_KEY)
+        self.buffer.append(self.event(3))
+        self.assertEqual(set(self.buffer.drain(10)), {(1, 1)})
+        cache.set(EVENT_KEY.format(2), self.event(2))
+        self.assertEqual(set(self.buffer.drain(10)), {(2, 1), (3, 1)})
+        self.assertEqual(self.buffer.size(), 0)
+    
+    def test_concurrent_drains_take_each_event_once(self):
+        for enrollment_id in range(1, 4):
+            self.buffer.append(self.event(enrollment_id))
+        real_get_many = cache.get_many
+        overlapping = []
+
+        def get_many(keys):
+            # Another process drains while this one is between its reads and the cursor update
+            if get_many_mock.call_count == 1:
+                overlapping.append(CacheHeartbeatBuffer().drain(10))
+            return real_get_many(keys)
+
+        with mock.patch.object(cache, 'get_many', side_effect=get_many) as get_many_mock:
+            drained = self.buffer.drain(10)
+        self.assertEqual(set(drained), {(1, 1), (2, 1), (3, 1)})
+        self.assertEqual(overlapping, [{}])
+        self.assertEqual(self.buffer.drain(10), {})
+
+    @override_settings(HEARTBEAT_GAP_GRACE=60)
+    def test_drain_skips_event_missing_past_grace(self):
+        cache.add(SEQUENCE_KEY, 0, timeout=None)
+        cache.incr(SEQUENCE_KEY)  # appender died before storing its event
+        self.buffer.append(self.event(2))
+        with mock.patch('enrollments.heartbeats.time.time', return_value=1000.0):
+            self.assertEqual(self.buffer.drain(10), {})
+        with mock.patch('enrollments.heartbeats.time.time', return_value=1061.0):
+            self.assertEqual(set(self.buffer.drain(10)), {(2, 1)})
+        self.assertEqual(self.buffer.size(), 0)
+
+
+class InvalidateEntitlementsTests(TestCase):
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_pins_users_given_as_generator(self):
+        users = [User.objects.create(username=f'student{i}') for i in range(2)]
+        cache.clear()
+        invalidate_entitlements(user.pk for user in users)
+        for user in users:
+            self.assertTrue(is_pinned(mock.Mock(COOKIES={}, user=user)))
+
+
+@override_settings(HEARTBEAT_BUFFER='local', HEARTBEAT_AUTOFLUSH=False)
+class VideoHeartbeatViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_buffer().drain(10 ** 6)
+        self.addCleanup(get_buffer().drain, 10 ** 6)
+        teacher = User.objects.create(username='teacher', user_type='teacher')
+        self.student = User.objects.create(username='student')
+        course = Course.objects.create(
+            title='Course', description='Description', instructor=teacher,
+            category=Category.objects.create(name='Category'),
+        )
+        module = Module.objects.create(course=course, title='Module', order=1)
+        self.video = Video.objects.create(module=module, title='Video', video_file='course_videos/1.mp4', is_free=True)
+        self.request = EnrollmentRequest.objects.create(
+            student=self.student, course=course, phone_number='0100', email='s@example.com',
+        )
+        self.client.force_login(self.student)
+    
+    def heartbeat(self, position=30):
+        return self.client.post(reverse('enrollments:video_heartbeat'), {'video_id': self.video.pk, 'position': position})
+    
+    def approve(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.request.status = 'approved'
+            self.request.save()
+    
+    def test_accepted_right_after_approval(self):
+        # Watching the free preview while the request is pending
+        self.assertEqual(self.heartbeat().status_code, 403)
+        self.approve()
+        self.assertEqual(self.heartbeat().status_code, 204)
+        self.assertEqual(get_buffer().size(), 1)
+    
+    def test_rejects_positions_that_are_not_finite(self):
+        self.approve()
+        for position in ('nan', 'inf', '-inf', '1e400'):
+            with self.subTest(position=position):
+                self.assertEqual(self.heartbeat(position).status_code, 400)
+        self.assertEqual(get_buffer().size(), 0)
@@ -7,4 +7,6 @@ urlpatterns = [
     path('request/<slug:course_slug>/', views.EnrollmentRequestView.as_view(), name='request_enrollment'),
     path('my-requests/', views.MyEnrollmentRequestsView.as_view(), name='my_requests'),
     path('my-courses/', views.MyCoursesView.as_view(), name='my_courses'),
+    path('heartbeat/', views.VideoHeartbeatView.as_view(), name='video_heartbeat'),
+    path('heartbeat/metrics/', views.HeartbeatMetricsView.as_view(), name='heartbeat_metrics'),
 ]
@@ -1,11 +1,21 @@
-from django.shortcuts import render, get_object_or_404, redirect
+import math
+
+from django.shortcuts import render, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.views import View
 from django.views.generic import CreateView, ListView
 from django.contrib import messages
 from django.urls import reverse_lazy
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse
 from .models import EnrollmentRequest, Enrollment
 from .forms import EnrollmentRequestForm
-from courses.models import Course
+from .entitlements import enrollment_id_for, get_entitlements
+from .heartbeats import heartbeat_metrics, record_heartbeat
+from courses.models import Course, Video
+from courses.recommendations import recommended_for
+from core.object_cache import get_cached_or_404
+from analytics.events import record_event
+from analytics.models import LearningEvent
 
 class EnrollmentRequestView(LoginRequiredMixin, CreateView):
     model = EnrollmentRequest
@@ -21,12 +31,12 @@ class EnrollmentRequestView(LoginRequiredMixin, CreateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         course_slug = self.kwargs['course_slug']
-        context['course'] = get_object_or_404(Course, slug=course_slug)
+        context['course'] = get_cached_or_404(Course, slug=course_slug)
         return context
     
     def form_valid(self, form):
         course_slug = self.kwargs['course_slug']
-        course = get_object_or_404(Course, slug=course_slug)
+        course = get_cached_or_404(Course, slug=course_slug)
         
         # Check if already requested or enrolled
         existing_request = EnrollmentRequest.objects.filter(
@@ -40,6 +50,7 @@ class EnrollmentRequestView(LoginRequiredMixin, CreateView):
         
         form.instance.student = self.request.user
         form.instance.course = course
+        record_event(LearningEvent.ENROLLMENT_REQUEST, course.id, self.request.user.pk)
         messages.success(self.request, 'Enrollment request submitted successfully! We will contact you soon.')
         return super().form_valid(form)
     
@@ -52,7 +63,7 @@ class MyEnrollmentRequestsView(LoginRequiredMixin, ListView):
     context_object_name = 'requests'
     
     def get_queryset(self):
-        return EnrollmentRequest.objects.filter(student=self.request.user).select_related('course')
+        return EnrollmentRequest.objects.filter(student=self.request.user).select_related('course__instructor')
 
 class MyCoursesView(LoginRequiredMixin, ListView):
     model = Enrollment
@@ -63,7 +74,7 @@ class MyCoursesView(LoginRequiredMixin, ListView):
         return Enrollment.objects.filter(
             student=self.request.user,
             enrollment_request__status='approved'
-        ).select_related('course', 'enrollment_request')
+        ).select_related('course__instructor', 'enrollment_request')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -71,4 +82,38 @@ class MyCoursesView(LoginRequiredMixin, ListView):
         from ratings.models import Rating
         user_ratings = Rating.objects.filter(student=self.request.user).values_list('course_id', flat=True)
         context['user_rated_courses'] = list(user_ratings)
+        context['recommended_courses'] = recommended_for(list(get_entitlements(self.request.user)))
         return context
+
+class VideoHeartbeatView(LoginRequiredMixin, View):
+    """
+    Watch-progress heartbeat from the video player. Only queues the event
+    (see enrollments/heartbeats.py); VideoProgress is written in batches.
+    """
+    raise_exception = True
+    
+    def get_enrollment_id(self, video_id):
+        # The entitlements cache is dropped on approval, so a newly approved student is not turned away
+        course_id = Video.objects.filter(pk=video_id).values_list('module__course_id', flat=True).first()
+        return enrollment_id_for(self.request.user, course_id) if course_id else None
+    
+    def post(self, request):
+        try:
+            video_id = int(request.POST['video_id'])
+            position = float(request.POST.get('position', 0))
+            if not math.isfinite(position):
+                raise ValueError(position)
+        except (KeyError, ValueError):
+            return HttpResponseBadRequest('video_id and position are required')
+        
+        enrollment_id = self.get_enrollment_id(video_id)
+        if not enrollment_id:
+            return HttpResponseForbidden('Not enrolled in this course')
+        record_heartbeat(enrollment_id, video_id, position, completed=request.POST.get('ended') == '1')
+        return HttpResponse(status=204)
+
+class HeartbeatMetricsView(LoginRequiredMixin, View):
+    def get(self, request):
+        if not request.user.is_staff:
+            return HttpResponseForbidden()
+        return JsonResponse(heartbeat_metrics())
@@ -0,0 +1,25 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job
+from .queue import queue_stats
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'queue', 'priority', 'status', 'attempts', 'run_at', 'started_at', 'finished_at', 'worker']
+    list_filter = ['status', 'queue', 'task']
+    search_fields = ['task', 'unique_key', 'worker']
+    readonly_fields = ['attempts', 'last_error', 'worker', 'claim_token', 'locked_until', 'created_at', 'started_at', 'finished_at']
+    
+    actions = ['retry_jobs']
+    
+    def changelist_view(self, request, extra_context=None):
+        # Queue depth and latency above the list
+        extra_context = {**(extra_context or {}), 'queue_stats': queue_stats()}
+        return super().changelist_view(request, extra_context)
+    
+    def retry_jobs(self, request, queryset):
+        count = queryset.filter(status='failed').update(
+            status='queued', attempts=0, run_at=timezone.now(), finished_at=None, last_error=''
+        )
+        self.message_user(request, f"{count} failed jobs requeued.")
+    retry_jobs.short_description = "Retry selected failed jobs"
@@ -0,0 +1,39 @@
+import signal
+
+from django.core.management.base import BaseCommand
+from jobs.queue import purge, queue_stats
+from jobs.worker import Worker
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the job queue in a thread or process pool'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help='Jobs run at once (default JOB_WORKER_CONCURRENCY)')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help='Run jobs in threads, or in processes for CPU-bound tasks')
+        parser.add_argument('--queue', action='append', dest='queues', help='Only take jobs from this queue (repeatable)')
+        parser.add_argument('--poll-interval', type=float, help='Seconds between polls when idle (default JOB_POLL_INTERVAL)')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due')
+        parser.add_argument('--stats', action='store_true', help='Print queue depth and latency and exit')
+        parser.add_argument('--purge', action='store_true', help='Delete finished jobs older than JOB_RETENTION_DAYS and exit')
+    
+    def handle(self, *args, **options):
+        if options['stats']:
+            for key, value in queue_stats().items():
+                self.stdout.write(f'{key}: {value}')
+            return
+        if options['purge']:
+            self.stdout.write(self.style.SUCCESS(f'Deleted {purge()} finished job(s)'))
+            return
+        
+        worker = Worker(
+            concurrency=options['concurrency'],
+            pool=options['pool'],
+            queues=options['queues'],
+            poll_interval=options['poll_interval'],
+        )
+        # Finish the jobs in hand on Ctrl-C or SIGTERM
+        signal.signal(signal.SIGINT, worker.stop)
+        signal.signal(signal.SIGTERM, worker.stop)
+        processed = worker.run(burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker.name} processed {processed} job(s)'))
@@ -0,0 +1,44 @@
+from django.db import models
+from django.utils import timezone
+
+class Job(models.Model):
+    """A call of a registered task, run by ``runworker`` (see jobs/queue.py)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    task = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    queue = models.CharField(max_length=50, default='default')
+    priority = models.IntegerField(default=0, help_text="Higher runs first")
+    # At most one live job per key; periodic slots keep theirs once finished (see jobs/queue.py)
+    unique_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    
+    # Not started before this time (scheduled jobs and retry backoff)
+    run_at = models.DateTimeField(default=timezone.now)
+    # Lease of the worker running it; expired leases are picked up again
+    worker = models.CharField(max_length=100, blank=True)
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'queue', 'run_at'], name='job_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
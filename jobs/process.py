@@ -0,0 +1,15 @@
+"""
+Entry points for the ``--pool process`` children. They are imported in a
+freshly spawned interpreter before Django is set up, so this module must
+not import models at load time.
+"""
+
+
+def setup():
+    import django
+    django.setup()
+
+
+def run_job(job_id, token):
+    from .queue import run_job
+    return run_job(job_id, token)
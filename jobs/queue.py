@@ -0,0 +1,219 @@
+"""
+Database-backed job queue.
+
+Jobs are rows in the Job table. ``runworker`` claims the due ones and runs
+them in a thread or process pool (see jobs/worker.py).
+
+Claiming is lease based, so it is safe on SQLite, which has no row locks.
+A worker selects due ids, then takes them with a conditional UPDATE that
+only matches rows still unclaimed. Claimed rows carry the worker's token and
+a ``locked_until`` deadline, which the worker extends while the job runs. If
+the worker dies, its lease expires and another worker picks the job up.
+
+A failing job is retried with exponential backoff until ``max_attempts``,
+then marked failed. Periodic jobs (JOB_PERIODIC) are enqueued once per
+interval slot under a unique key, so any number of workers enqueue each
+run only once.
+"""
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Job
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+LIVE_STATUSES = ('queued', 'running')
+
+
+def lease_seconds():
+    return getattr(settings, 'JOB_LEASE_SECONDS', 120)
+
+
+def retry_delay(attempts):
+    """Seconds before retrying after the ``attempts``-th failure: doubling, capped at an hour"""
+    return min(getattr(settings, 'JOB_RETRY_DELAY', 10) * 2 ** (attempts - 1), 60 * 60)
+
+
+def enqueue(task, args=(), kwargs=None, queue='default', priority=0, run_at=None,
+            delay=None, unique_key=None, max_attempts=None):
+    """
+    Queue a call of the task named ``task``. The row is part of the current
+    transaction, so workers only see it once that commits. ``run_at`` (a
+    datetime) or ``delay`` (seconds) schedule it for later. Returns the
+    saved Job. With a ``unique_key`` held by a queued or running job,
+    including one queued concurrently, nothing is added and None is
+    returned; a finished job holding the key gives it up.
+    """
+    run_at = run_at or timezone.now() + timedelta(seconds=delay or 0)
+    job = Job(
+        task=task,
+        args=list(args),
+        kwargs=kwargs or {},
+        queue=queue,
+        priority=priority,
+        run_at=run_at,
+        unique_key=unique_key,
+        max_attempts=max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 3),
+    )
+    if unique_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            if Job.objects.filter(unique_key=unique_key, status__in=LIVE_STATUSES).exists():
+                return None
+            Job.objects.filter(unique_key=unique_key).update(unique_key=None)
+            job.save()
+    except IntegrityError:
+        # Another process queued the same key in the meantime
+        return None
+    return job
+
+
+def _claimable(now, queues=None):
+    due = Q(status='queued', run_at__lte=now) | Q(status='running', locked_until__lt=now)
+    if queues:
+        due &= Q(queue__in=queues)
+    return due
+
+
+def claim(worker, limit, queues=None, now=None):
+    """Lease up to ``limit`` due jobs for ``worker``; returns them, most urgent first"""
+    now = now or timezone.now()
+    due = _claimable(now, queues)
+    ids = list(
+        Job.objects.filter(due).order_by('-priority', 'run_at', 'id').values_list('pk', flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    token = uuid.uuid4()
+    # Jobs another worker claimed in the meantime no longer match ``due``
+    Job.objects.filter(due, pk__in=ids).update(
+        status='running',
+        attempts=F('attempts') + 1,
+        worker=worker,
+        claim_token=token,
+        locked_until=now + timedelta(seconds=lease_seconds()),
+        started_at=now,
+    )
+    return list(Job.objects.filter(claim_token=token).order_by('-priority', 'run_at', 'id'))
+
+
+def extend_leases(tokens, now=None):
+    """Push back the lease deadline of the jobs a worker is still running"""
+    if not tokens:
+        return 0
+    now = now or timezone.now()
+    return Job.objects.filter(claim_token__in=tokens, status='running').update(
+        locked_until=now + timedelta(seconds=lease_seconds())
+    )
+
+
+def run_job(job_id, token):
+    """
+    Run a claimed job and record the outcome. Called in a pool thread or
+    process; returns the final status, or None if the lease was lost.
+    """
+    close_old_connections()
+    try:
+        job = Job.objects.filter(pk=job_id, claim_token=token).first()
+        if job is None:
+            return None
+        mine = Job.objects.filter(pk=job_id, claim_token=token)
+        if job.attempts > job.max_attempts:
+            # Claimed again after its worker died each time: stop trying
+            mine.update(status='failed', last_error='Worker lost while running', finished_at=timezone.now(),
+                        claim_token=None, locked_until=None)
+            return 'failed'
+        try:
+            get_task(job.task)(*job.args, **job.kwargs)
+        except Exception as error:
+            gave_up = job.attempts >= job.max_attempts
+            logger.warning('Job %s (%s) failed, attempt %d of %d', job.pk, job.task, job.attempts, job.max_attempts,
+                           exc_info=True)
+            mine.update(
+                status='failed' if gave_up else 'queued',
+                last_error=''.join(traceback.format_exception(error))[-5000:],
+                run_at=timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+                finished_at=timezone.now() if gave_up else None,
+                claim_token=None,
+                locked_until=None,
+            )
+            return 'failed' if gave_up else 'queued'
+        mine.update(
+            status='done',
+            finished_at=timezone.now(),
+            claim_token=None,
+            locked_until=None,
+        )
+        return 'done'
+    finally:
+        close_old_connections()
+
+
+def periodic_jobs():
+    """JOB_PERIODIC: {name: {'task': ..., 'every': seconds, 'args', 'kwargs', 'queue', 'priority'}}"""
+    return getattr(settings, 'JOB_PERIODIC', {})
+
+
+def periodic_slot(every, now=None):
+    now = now or timezone.now()
+    return int(now.timestamp() // every)
+
+
+def enqueue_periodic(name, options, slot):
+    """Queue the run of periodic job ``name`` for interval ``slot`` unless that run was already queued"""
+    unique_key = f'periodic:{name}:{slot}'
+    with transaction.atomic():
+        # Unlike enqueue(), a finished run keeps its slot: it runs once per interval
+        if Job.objects.filter(unique_key=unique_key).exists():
+            return None
+        return enqueue(
+            options['task'],
+            args=options.get('args', ()),
+            kwargs=options.get('kwargs'),
+            queue=options.get('queue', 'default'),
+            priority=options.get('priority', 0),
+            unique_key=unique_key,
+            max_attempts=1,  # The next slot is the retry
+        )
+
+
+def purge(older_than_days=None):
+    """Delete finished jobs older than JOB_RETENTION_DAYS; returns how many"""
+    days = older_than_days if older_than_days is not None else getattr(settings, 'JOB_RETENTION_DAYS', 7)
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def queue_stats(sample=500):
+    """Queue depth per status and queue, plus wait and run times of recent jobs"""
+    now = timezone.now()
+    depth = {}
+    for row in Job.objects.order_by().values('queue', 'status').annotate(n=Count('pk')):
+        depth.setdefault(row['queue'], {})[row['status']] = row['n']
+    oldest = Job.objects.filter(status='queued', run_at__lte=now).order_by('run_at').values_list('run_at', flat=True).first()
+    recent = list(
+        Job.objects.filter(status='done').order_by('-finished_at')
+        .values_list('run_at', 'started_at', 'finished_at')[:sample]
+    )
+    waits = [(started - run_at).total_seconds() for run_at, started, finished in recent if started]
+    runs = [(finished - started).total_seconds() for run_at, started, finished in recent if started and finished]
+    return {
+        'depth': depth,
+        'due': Job.objects.filter(status='queued', run_at__lte=now).count(),
+        'oldest_due_seconds': (now - oldest).total_seconds() if oldest else 0,
+        'avg_wait_seconds': sum(waits) / len(waits) if waits else 0,
+        'max_wait_seconds': max(waits, default=0),
+        'avg_run_seconds': sum(runs) / len(runs) if runs else 0,
+        'sample': len(recent),
+    }
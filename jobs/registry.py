@@ -0,0 +1,64 @@
+"""
+Task registry for the job queue.
+
+Apps declare tasks in a ``tasks.py`` module:
+
+    from jobs.registry import task
+
+    @task('courses.rebuild_stats', priority=-10)
+    def rebuild_stats(course_ids=None):
+        ...
+
+and queue them with ``rebuild_stats.delay(course_ids=[1, 2])`` or
+``jobs.queue.enqueue('courses.rebuild_stats', ...)``. Arguments are stored as
+JSON, so pass ids rather than model instances.
+"""
+from django.utils.module_loading import autodiscover_modules
+
+_tasks = {}
+
+
+class Task:
+    def __init__(self, func, name, **options):
+        self.func = func
+        self.name = name
+        self.options = options  # Defaults for enqueue(): queue, priority, max_attempts
+        self.__doc__ = func.__doc__
+    
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+    
+    def delay(self, *args, **kwargs):
+        """Queue a call with the task's default options"""
+        return self.enqueue(args=args, kwargs=kwargs)
+    
+    def enqueue(self, args=(), kwargs=None, **options):
+        from .queue import enqueue
+        return enqueue(self.name, args=args, kwargs=kwargs, **{**self.options, **options})
+
+
+def task(name=None, **options):
+    """Register the decorated function as a task named ``name`` (default module.function)"""
+    def register(func):
+        registered = Task(func, name or f'{func.__module__}.{func.__name__}', **options)
+        _tasks[registered.name] = registered
+        return registered
+    return register
+
+
+def autodiscover():
+    autodiscover_modules('tasks')
+
+
+def get_task(name):
+    if name not in _tasks:
+        autodiscover()
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise LookupError(f'No task registered as {name!r}')
+
+
+def registered_tasks():
+    autodiscover()
+    return dict(_tasks)
@@ -0,0 +1,7 @@
+from .queue import purge
+from .registry import task
+
+@task('jobs.purge', priority=-10)
+def purge_finished_jobs():
+    """Delete finished jobs past JOB_RETENTION_DAYS"""
+    purge()
@@ -0,0 +1,135 @@
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import claim, enqueue, enqueue_periodic, lease_seconds, run_job
+from .registry import task
+
+calls = []
+
+
+@task('jobs.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task('jobs.tests.explode')
+def explode():
+    raise RuntimeError('boom')
+
+
+class UniqueKeyTests(TestCase):
+    def test_live_job_holds_its_key(self):
+        first = enqueue('jobs.purge', unique_key='thumbnails:a.jpg')
+        self.assertIsNotNone(first)
+        self.assertIsNone(enqueue('jobs.purge', unique_key='thumbnails:a.jpg'))
+        Job.objects.update(status='running')
+        self.assertIsNone(enqueue('jobs.purge', unique_key='thumbnails:a.jpg'))
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_returns_the_stored_job(self):
+        job = enqueue('jobs.purge', args=[1], unique_key='thumbnails:a.jpg')
+        self.assertIsNotNone(job.pk)
+        self.assertEqual(job, Job.objects.get(unique_key='thumbnails:a.jpg'))
+
+    def test_key_taken_concurrently_returns_none(self):
+        enqueue('jobs.purge', unique_key='thumbnails:a.jpg')
+        Job.objects.update(status='done')
+        # Another process re-queues the key between our check and our insert
+        with mock.patch.object(QuerySet, 'update', return_value=0):
+            self.assertIsNone(enqueue('jobs.purge', unique_key='thumbnails:a.jpg'))
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_finished_job_gives_up_its_key(self):
+        for status in ('done', 'failed'):
+            with self.subTest(status=status):
+                enqueue('jobs.purge', unique_key='thumbnails:a.jpg')
+                Job.objects.filter(unique_key='thumbnails:a.jpg').update(status=status)
+                self.assertIsNotNone(enqueue('jobs.purge', unique_key='thumbnails:a.jpg'))
+                self.assertEqual(Job.objects.get(unique_key='thumbnails:a.jpg').status, 'queued')
+        self.assertEqual(Job.objects.count(), 3)
+
+    def test_periodic_slot_runs_once_even_after_finishing(self):
+        options = {'task': 'jobs.purge', 'every': 60}
+        self.assertIsNotNone(enqueue_periodic('purge', options, 100))
+        self.assertIsNone(enqueue_periodic('purge', options, 100))
+        Job.objects.update(status='done')
+        self.assertIsNone(enqueue_periodic('purge', options, 100))
+        self.assertIsNotNone(enqueue_periodic('purge', options, 101))
+        self.assertEqual(Job.objects.count(), 2)
+
+
+# run_job() closes stale connections, which would end the test transaction
+@mock.patch('jobs.queue.close_old_connections', lambda: None)
+class ClaimTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.jobs = [enqueue('jobs.tests.record', args=[i], run_at=self.now) for i in range(3)]
+
+    def test_competing_claims_take_each_job_once(self):
+        real_uuid4 = uuid.uuid4
+        stolen = []
+
+        def token():
+            # Worker "b" leases the jobs between worker "a"'s SELECT and UPDATE
+            if uuid4.call_count == 1:
+                stolen.extend(claim('b', 10, now=self.now))
+            return real_uuid4()
+
+        with mock.patch('jobs.queue.uuid.uuid4', side_effect=token) as uuid4:
+            claimed = claim('a', 10, now=self.now)
+        self.assertEqual(claimed, [])
+        self.assertEqual(len(stolen), 3)
+        self.assertEqual(set(Job.objects.values_list('worker', 'attempts')), {('b', 1)})
+
+    def test_leased_jobs_are_not_claimed_again(self):
+        self.assertEqual(len(claim('a', 2, now=self.now)), 2)
+        self.assertEqual(len(claim('b', 10, now=self.now)), 1)
+        self.assertEqual(claim('c', 10, now=self.now), [])
+
+    def test_expired_lease_is_reclaimed(self):
+        job, = claim('a', 1, now=self.now)
+        later = self.now + timedelta(seconds=lease_seconds() + 1)
+        reclaimed = [j for j in claim('b', 10, now=later) if j.pk == job.pk]
+        self.assertEqual(len(reclaimed), 1)
+        self.assertEqual((reclaimed[0].worker, reclaimed[0].attempts), ('b', 2))
+        # The first worker lost its lease and must not run or finish the job
+        self.assertIsNone(run_job(job.pk, job.claim_token))
+        self.assertEqual(run_job(job.pk, reclaimed[0].claim_token), 'done')
+
+    def test_job_lost_more_than_max_attempts_gives_up(self):
+        Job.objects.update(max_attempts=1)
+        claim('a', 10, now=self.now)
+        later = self.now + timedelta(seconds=lease_seconds() + 1)
+        job = claim('b', 1, now=later)[0]
+        self.assertEqual(job.attempts, 2)
+        calls.clear()
+        self.assertEqual(run_job(job.pk, job.claim_token), 'failed')
+        self.assertEqual(calls, [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.last_error), ('failed', 'Worker lost while running'))
+
+    @override_settings(JOB_RETRY_DELAY=10)
+    def test_failing_job_backs_off_then_fails(self):
+        Job.objects.all().delete()
+        enqueue('jobs.tests.explode', max_attempts=2, run_at=self.now)
+        job, = claim('a', 1, now=self.now)
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertEqual(run_job(job.pk, job.claim_token), 'queued')
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertAlmostEqual((job.run_at - timezone.now()).total_seconds(), 10, delta=2)
+        self.assertEqual(claim('a', 1, now=self.now), [])
+
+        job, = claim('a', 1, now=job.run_at)
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertEqual(run_job(job.pk, job.claim_token), 'failed')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNotNone(job.finished_at)
@@ -0,0 +1,107 @@
+"""
+The ``runworker`` loop: claims due jobs and runs them in a pool.
+
+One loop per worker process polls the queue. It claims only as many jobs as
+the pool has free slots, extends the leases of the jobs still running, and
+enqueues periodic jobs when their slot comes round. With ``pool='process'``
+each job runs in a spawned child process with its own Django setup and
+database connection, for CPU-bound work such as image resizing.
+"""
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import process, queue
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    def __init__(self, concurrency=None, pool='thread', queues=None, poll_interval=None):
+        self.concurrency = concurrency or getattr(settings, 'JOB_WORKER_CONCURRENCY', 4)
+        self.pool = pool
+        self.queues = queues or None
+        self.poll_interval = poll_interval or getattr(settings, 'JOB_POLL_INTERVAL', 1)
+        self.name = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+        self.stopping = threading.Event()
+        self.running = {}  # future -> claim token
+        self.periodic_slots = {}
+        self.processed = 0
+
+    def _executor(self):
+        if self.pool == 'process':
+            return ProcessPoolExecutor(
+                max_workers=self.concurrency,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=process.setup,
+            )
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='job')
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def enqueue_periodic(self):
+        for name, options in queue.periodic_jobs().items():
+            if self.queues and options.get('queue', 'default') not in self.queues:
+                continue
+            slot = queue.periodic_slot(options['every'])
+            if self.periodic_slots.get(name) != slot:
+                queue.enqueue_periodic(name, options, slot)
+                self.periodic_slots[name] = slot
+
+    def tick(self, executor):
+        """One poll; returns how many jobs were claimed"""
+        self.enqueue_periodic()
+        queue.extend_leases(list(self.running.values()))
+        free = self.concurrency - len(self.running)
+        jobs = queue.claim(self.name, free, self.queues) if free > 0 else []
+        run = process.run_job if self.pool == 'process' else queue.run_job
+        for job in jobs:
+            self.running[executor.submit(run, job.pk, job.claim_token)] = job.claim_token
+        return len(jobs)
+
+    def collect(self, timeout):
+        if not self.running:
+            if timeout:
+                self.stopping.wait(timeout)
+            return
+        done, pending = wait(list(self.running), timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            self.running.pop(future)
+            self.processed += 1
+            if future.exception() is not None:
+                logger.error('Job runner crashed', exc_info=future.exception())
+
+    def run(self, burst=False):
+        """Work until stop() is called; with ``burst``, until the queue is empty"""
+        logger.info('Worker %s started (%s pool of %d)', self.name, self.pool, self.concurrency)
+        with self._executor() as executor:
+            while not self.stopping.is_set():
+                try:
+                    claimed = self.tick(executor)
+                except BrokenExecutor:
+                    # A pool process died; exit and let the supervisor restart us
+                    raise
+                except Exception:
+                    logger.exception('Worker %s could not poll the queue', self.name)
+                    claimed = 0
+                finally:
+                    close_old_connections()
+                if burst and not claimed and not self.running:
+                    break
+                # Poll again right away while there is work and a free slot
+                busy = claimed and len(self.running) < self.concurrency
+                self.collect(0 if busy else self.poll_interval)
+            # Let the jobs in hand finish before exiting
+            while self.running:
+                queue.extend_leases(list(self.running.values()))
+                self.collect(self.poll_interval)
+        logger.info('Worker %s stopped after %d job(s)', self.name, self.processed)
+        return self.processed
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import OutboxMessage
+from .outbox import retry_failed
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'recipient', 'subject', 'status', 'attempts', 'available_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'kind', 'created_at']
+    search_fields = ['recipient', 'subject', 'idempotency_key']
+    readonly_fields = ['idempotency_key', 'attempts', 'last_error', 'claim_token', 'locked_until', 'created_at', 'sent_at']
+    
+    actions = ['retry_messages']
+    
+    def retry_messages(self, request, queryset):
+        self.message_user(request, f"{retry_failed(queryset)} failed messages requeued.")
+    retry_messages.short_description = "Retry selected failed messages"
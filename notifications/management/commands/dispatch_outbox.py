@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from notifications.outbox import batch_size, dispatch, retry_failed
+
+class Command(BaseCommand):
+    help = 'Send queued notification emails from the outbox in batches, with retries and backoff'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep dispatching, polling every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop')
+        parser.add_argument('--batch-size', type=int, help='Messages claimed per batch (default OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--backend', help='Email backend to send through (default OUTBOX_EMAIL_BACKEND)')
+        parser.add_argument('--retry-failed', action='store_true', help='Requeue messages that ran out of attempts first')
+    
+    def handle(self, *args, **options):
+        limit = options['batch_size'] or batch_size()
+        if options['retry_failed']:
+            self.stdout.write(f'Requeued {retry_failed()} failed message(s)')
+        
+        while True:
+            sent = failed = 0
+            while True:
+                batch_sent, batch_failed = dispatch(limit, backend=options['backend'])
+                sent += batch_sent
+                failed += batch_failed
+                if batch_sent + batch_failed < limit:
+                    break
+            if not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Sent {sent} message(s), {failed} failed'))
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
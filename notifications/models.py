@@ -0,0 +1,49 @@
+import uuid
+
+from django.db import models
+from django.utils import timezone
+
+class OutboxMessage(models.Model):
+    """
+    An email waiting to be sent. Rows are written in the same transaction as
+    the change they announce and sent later by ``dispatch_outbox`` (see
+    notifications/outbox.py).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    # Enqueueing the same key twice stores one message
+    idempotency_key = models.CharField(max_length=200, unique=True)
+    kind = models.CharField(max_length=50)
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    # Not sent before this time (backoff after a failed attempt)
+    available_at = models.DateTimeField(default=timezone.now)
+    # Lease of the dispatcher currently sending it
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} to {self.recipient} ({self.status})"
+    
+    @property
+    def message_id(self):
+        """Stable Message-ID, so a retried send can be recognised as a duplicate"""
+        return f"<{uuid.uuid5(uuid.NAMESPACE_URL, self.idempotency_key)}@outbox>"
@@ -0,0 +1,171 @@
+"""
+Transactional outbox for notification emails.
+
+Code that announces a change (an approved enrollment, for example) does not
+send mail. It calls enqueue(), which inserts OutboxMessage rows in the
+caller's transaction. The message is stored if and only if the change
+commits, and no request waits on SMTP.
+
+``dispatch_outbox`` drains the table in batches:
+
+* claim() leases due rows with a conditional UPDATE, so several dispatchers
+  never send the same row at once. This is SQLite-safe; no row locks needed.
+  A dispatcher that dies loses its lease after OUTBOX_LEASE_SECONDS.
+* Each message goes through the backend named by OUTBOX_EMAIL_BACKEND (any
+  Django email backend: smtp, console, filebased, locmem).
+* A failed send is retried with exponential backoff, up to
+  OUTBOX_MAX_ATTEMPTS. After that the row is marked failed.
+
+Delivery is at least once. Every message has a unique idempotency key and
+a Message-ID derived from it, so a resend after a crash carries the same id.
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+def batch_size():
+    return getattr(settings, 'OUTBOX_BATCH_SIZE', 100)
+
+
+def max_attempts():
+    return getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 8)
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the ``attempts``-th failure: doubling, capped at an hour"""
+    return min(getattr(settings, 'OUTBOX_RETRY_DELAY', 30) * 2 ** (attempts - 1), 60 * 60)
+
+
+def enqueue(messages):
+    """
+    Store unsaved OutboxMessage objects in the current transaction. Keys that
+    are already queued are skipped; returns how many were new.
+    """
+    messages = list(messages)
+    if not messages:
+        return 0
+    keys = [message.idempotency_key for message in messages]
+    before = OutboxMessage.objects.filter(idempotency_key__in=keys).count()
+    OutboxMessage.objects.bulk_create(messages, ignore_conflicts=True, batch_size=500)
+    return OutboxMessage.objects.filter(idempotency_key__in=keys).count() - before
+
+
+def enqueue_enrollment_approved(request_ids):
+    """Queue the 'enrollment approved' email of each EnrollmentRequest id"""
+    from enrollments.models import EnrollmentRequest
+
+    rows = EnrollmentRequest.objects.filter(pk__in=request_ids).order_by().values(
+        'pk', 'email', 'course__title',
+        'student__username', 'student__first_name', 'student__last_name', 'student__email',
+    )
+    messages = []
+    for row in rows:
+        recipient = row['email'] or row['student__email']
+        if not recipient:
+            continue
+        name = f"{row['student__first_name']} {row['student__last_name']}".strip() or row['student__username']
+        messages.append(OutboxMessage(
+            idempotency_key=f"enrollment-approved:{row['pk']}",
+            kind='enrollment_approved',
+            recipient=recipient,
+            subject=f"Enrollment approved: {row['course__title']}",
+            body=render_to_string('notifications/enrollment_approved.txt', {
+                'student_name': name,
+                'course_title': row['course__title'],
+            }),
+        ))
+    return enqueue(messages)
+
+
+def claim(limit=None, now=None):
+    """Lease up to ``limit`` due messages for this dispatcher and return them"""
+    now = now or timezone.now()
+    due = Q(status='pending', available_at__lte=now) & (Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+    ids = list(OutboxMessage.objects.filter(due).order_by('available_at', 'id').values_list('pk', flat=True)[:limit or batch_size()])
+    if not ids:
+        return []
+    token = uuid.uuid4()
+    # Rows another dispatcher leased in the meantime no longer match ``due``
+    OutboxMessage.objects.filter(due, pk__in=ids).update(
+        claim_token=token,
+        locked_until=now + timedelta(seconds=getattr(settings, 'OUTBOX_LEASE_SECONDS', 300)),
+    )
+    return list(OutboxMessage.objects.filter(claim_token=token))
+
+
+def _send(message, connection):
+    EmailMessage(
+        subject=message.subject,
+        body=message.body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[message.recipient],
+        headers={'Message-ID': message.message_id, 'X-Idempotency-Key': message.idempotency_key},
+        connection=connection,
+    ).send()
+
+
+def dispatch(limit=None, backend=None):
+    """Send one claimed batch; returns (sent, failed)"""
+    connection = get_connection(backend or getattr(settings, 'OUTBOX_EMAIL_BACKEND', None))
+    messages = claim(limit)
+    if not messages:
+        return 0, 0
+    try:
+        connection.open()
+    except Exception as error:
+        # Server unreachable: the whole batch backs off
+        for message in messages:
+            _record_failure(message, error)
+        return 0, len(messages)
+    sent, failed = [], 0
+    try:
+        for message in messages:
+            try:
+                _send(message, connection)
+                sent.append(message.pk)
+            except Exception as error:
+                failed += 1
+                _record_failure(message, error)
+    finally:
+        connection.close()
+    OutboxMessage.objects.filter(pk__in=sent).update(
+        status='sent',
+        sent_at=timezone.now(),
+        attempts=F('attempts') + 1,
+        claim_token=None,
+        locked_until=None,
+    )
+    return len(sent), failed
+
+
+def _record_failure(message, error):
+    attempts = message.attempts + 1
+    gave_up = attempts >= max_attempts()
+    logger.warning('Outbox message %s failed (attempt %d): %s', message.idempotency_key, attempts, error)
+    OutboxMessage.objects.filter(pk=message.pk).update(
+        status='failed' if gave_up else 'pending',
+        attempts=attempts,
+        last_error=f'{type(error).__name__}: {error}',
+        available_at=timezone.now() + timedelta(seconds=retry_delay(attempts)),
+        claim_token=None,
+        locked_until=None,
+    )
+
+
+def retry_failed(queryset=None):
+    """Give failed messages another round of attempts; returns how many"""
+    queryset = OutboxMessage.objects.all() if queryset is None else queryset
+    return queryset.filter(status='failed').update(
+        status='pending', attempts=0, available_at=timezone.now(), last_error='',
+    )
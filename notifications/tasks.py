@@ -0,0 +1,8 @@
+from jobs.registry import task
+from .outbox import batch_size, dispatch
+
+@task('notifications.dispatch_outbox', priority=10)
+def dispatch_outbox():
+    """Send due outbox messages until a batch comes back short"""
+    while sum(dispatch()) >= batch_size():
+        pass
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from courses.models import Category, Course
+from enrollments.models import EnrollmentRequest
+from .models import OutboxMessage
+from .outbox import claim, dispatch, enqueue
+
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionRefusedError('SMTP down')
+
+
+def message(key):
+    return OutboxMessage(idempotency_key=key, kind='test', recipient='s@example.com', subject='Subject', body='Body')
+
+
+class EnqueueTests(TestCase):
+    def test_same_key_is_stored_once(self):
+        self.assertEqual(enqueue([message('a'), message('b')]), 2)
+        self.assertEqual(enqueue([message('a'), message('c')]), 1)
+        self.assertEqual(sorted(OutboxMessage.objects.values_list('idempotency_key', flat=True)), ['a', 'b', 'c'])
+
+    def test_approval_queues_one_email(self):
+        teacher = User.objects.create(username='teacher', user_type='teacher')
+        student = User.objects.create(username='student', first_name='Sara')
+        course = Course.objects.create(
+            title='Course', description='Description', instructor=teacher,
+            category=Category.objects.create(name='Category'),
+        )
+        request = EnrollmentRequest.objects.create(
+            student=student, course=course, phone_number='0100', email='sara@example.com',
+        )
+        self.assertFalse(OutboxMessage.objects.exists())
+        request.status = 'approved'
+        request.save()
+        request.save()
+        outbox = OutboxMessage.objects.get()
+        self.assertEqual((outbox.idempotency_key, outbox.recipient), (f'enrollment-approved:{request.pk}', 'sara@example.com'))
+
+
+class DispatchTests(TestCase):
+    def setUp(self):
+        enqueue([message('a'), message('b')])
+
+    def test_leased_messages_are_not_claimed_again(self):
+        self.assertEqual(len(claim(1)), 1)
+        self.assertEqual(len(claim()), 1)
+        self.assertEqual(claim(), [])
+
+    def test_sends_each_message_once_with_a_stable_message_id(self):
+        self.assertEqual(dispatch(backend=LOCMEM), (2, 0))
+        self.assertEqual(dispatch(backend=LOCMEM), (0, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        sent = OutboxMessage.objects.get(idempotency_key='a')
+        self.assertEqual((sent.status, sent.attempts), ('sent', 1))
+        self.assertEqual(mail.outbox[0].extra_headers['Message-ID'], sent.message_id)
+
+    @override_settings(OUTBOX_RETRY_DELAY=30, OUTBOX_MAX_ATTEMPTS=2)
+    def test_failure_backs_off_then_gives_up(self):
+        backend = 'notifications.tests.FailingBackend'
+        with self.assertLogs('notifications.outbox', 'WARNING'):
+            self.assertEqual(dispatch(backend=backend), (0, 2))
+        pending = OutboxMessage.objects.get(idempotency_key='a')
+        self.assertEqual((pending.status, pending.attempts, pending.claim_token), ('pending', 1, None))
+        self.assertIn('SMTP down', pending.last_error)
+        self.assertAlmostEqual((pending.available_at - timezone.now()).total_seconds(), 30, delta=2)
+        # Not due again before the backoff has passed
+        self.assertEqual(dispatch(backend=backend), (0, 0))
+
+        OutboxMessage.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('notifications.outbox', 'WARNING'):
+            self.assertEqual(dispatch(backend=backend), (0, 2))
+        self.assertEqual(set(OutboxMessage.objects.values_list('status', 'attempts')), {('failed', 2)})
@@ -0,0 +1,76 @@
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+from core.object_cache import invalidate
+from courses.models import Course
+
+STARS = range(1, 6)
+RATING_FIELDS = ['rating_count', 'rating_sum', 'rating_average'] + [f'rating_{star}_count' for star in STARS]
+
+
+def apply_rating_delta(course_id, removed_score=None, added_score=None):
+    """
+    Adjust the stored rating aggregates of one course in a single UPDATE.
+
+    Pass ``removed_score`` when a rating leaves the course (delete, or the old
+    value of an edit) and ``added_score`` when one enters it.
+    """
+    count_delta = (added_score is not None) - (removed_score is not None)
+    sum_delta = (added_score or 0) - (removed_score or 0)
+
+    updates = {}
+    if removed_score != added_score:
+        if removed_score is not None:
+            updates[f'rating_{removed_score}_count'] = F(f'rating_{removed_score}_count') - 1
+        if added_score is not None:
+            updates[f'rating_{added_score}_count'] = F(f'rating_{added_score}_count') + 1
+    if not updates:
+        return
+
+    # Every right-hand side sees the pre-update row, so the average is
+    # computed from the same old values the counters are incremented from
+    updates['rating_count'] = F('rating_count') + count_delta
+    updates['rating_sum'] = F('rating_sum') + sum_delta
+    updates['rating_average'] = Case(
+        When(rating_count=-count_delta, then=Value(0.0)),
+        default=Cast(F('rating_sum') + sum_delta, FloatField()) / (F('rating_count') + count_delta),
+        output_field=FloatField(),
+    )
+    Course.objects.filter(pk=course_id).update(**updates)
+    invalidate(Course)
+
+
+def rebuild_rating_aggregates(course_ids=None):
+    """
+    Recompute the rating aggregates from the Rating table.
+    Returns the number of courses rewritten.
+    """
+    from .models import Rating
+
+    ratings = Rating.objects.all()
+    courses = Course.objects.all()
+    if course_ids is not None:
+        ratings = ratings.filter(course_id__in=course_ids)
+        courses = courses.filter(pk__in=course_ids)
+
+    totals = {
+        row['course_id']: row
+        for row in ratings.order_by().values('course_id').annotate(
+            total=Count('id'),
+            score_sum=Sum('score'),
+            **{f'stars_{star}': Count('id', filter=Q(score=star)) for star in STARS}
+        )
+    }
+
+    updated = []
+    for course in courses.only('pk', *RATING_FIELDS):
+        row = totals.get(course.pk)
+        course.rating_count = row['total'] if row else 0
+        course.rating_sum = row['score_sum'] if row else 0
+        course.rating_average = course.rating_sum / course.rating_count if course.rating_count else 0
+        for star in STARS:
+            setattr(course, f'rating_{star}_count', row[f'stars_{star}'] if row else 0)
+        updated.append(course)
+
+    Course.objects.bulk_update(updated, RATING_FIELDS, batch_size=500)
+    invalidate(Course)
+    return len(updated)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ratings.aggregates import rebuild_rating_aggregates
+
+class Command(BaseCommand):
+    help = 'Recompute the stored rating count, sum, average and star histogram of every course'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='course_ids',
+                            help='Only rebuild this course id (can be repeated)')
+    
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = rebuild_rating_aggregates(options['course_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {updated} course(s)'))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:06
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Rating = apps.get_model('ratings', 'Rating')
+    rows = Rating.objects.order_by().values('course_id').annotate(
+        total=Count('id'),
+        score_sum=Sum('score'),
+        **{f'stars_{star}': Count('id', filter=Q(score=star)) for star in range(1, 6)}
+    )
+    for row in rows:
+        Course.objects.filter(pk=row['course_id']).update(
+            rating_count=row['total'],
+            rating_sum=row['score_sum'],
+            rating_average=row['score_sum'] / row['total'],
+            **{f'rating_{star}_count': row[f'stars_{star}'] for star in range(1, 6)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ratings', '0001_initial'),
+        ('courses', '0003_course_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
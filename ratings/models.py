@@ -1,7 +1,11 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from courses.models import Course
+from courses.snapshots import invalidate_home_snapshot
+from .aggregates import apply_rating_delta, rebuild_rating_aggregates
 
 class Rating(models.Model):
     student = models.ForeignKey(
@@ -24,3 +28,46 @@ class Rating(models.Model):
     
     def __str__(self):
         return f"{self.student.username} rated {self.course.title}: {self.score}/5"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so an edit can be applied as a delta
+        instance._stored_course_id = instance.__dict__.get('course_id')
+        instance._stored_score = instance.__dict__.get('score')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # The course aggregates are updated by post_save; keep both in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._stored_course_id = self.course_id
+        self._stored_score = self.score
+
+# Keep the denormalized rating fields on Course in sync
+@receiver(post_save, sender=Rating)
+def update_course_rating_on_save(sender, instance, created, **kwargs):
+    if created:
+        apply_rating_delta(instance.course_id, added_score=instance.score)
+        return
+    
+    old_course_id = getattr(instance, '_stored_course_id', None)
+    old_score = getattr(instance, '_stored_score', None)
+    if old_course_id is None or old_score is None:
+        # Instance was not loaded from the database; fall back to a recount
+        rebuild_rating_aggregates([instance.course_id])
+    elif old_course_id != instance.course_id:
+        apply_rating_delta(old_course_id, removed_score=old_score)
+        apply_rating_delta(instance.course_id, added_score=instance.score)
+    else:
+        apply_rating_delta(instance.course_id, removed_score=old_score, added_score=instance.score)
+
+@receiver(post_delete, sender=Rating)
+def update_course_rating_on_delete(sender, instance, **kwargs):
+    score = getattr(instance, '_stored_score', None) or instance.score
+    apply_rating_delta(instance.course_id, removed_score=score)
+
+# Featured courses on the home page are ordered by rating
+@receiver([post_save, post_delete], sender=Rating)
+def invalidate_home_on_rating_change(sender, **kwargs):
+    invalidate_home_snapshot()
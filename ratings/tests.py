@@ -1,3 +1,10 @@
 from django.test import TestCase
+from core.testing import Budget, QueryBudgetMixin
 
-# Create your tests here.
+
+class RatingQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Cold-cache query budgets of the rating pages, against the synthetic catalog"""
+    urls_module = 'ratings.urls'
+    budgets = {
+        'rate_course': Budget(6, user='student', kwargs=lambda data: {'course_slug': data.course.slug}),
+    }
@@ -1,4 +1,4 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import CreateView
 from django.contrib import messages
@@ -6,7 +6,10 @@ from django.urls import reverse_lazy
 from .models import Rating
 from .forms import RatingForm
 from courses.models import Course
-from enrollments.models import Enrollment
+from core.object_cache import get_cached_or_404
+from enrollments.entitlements import is_enrolled
+from analytics.events import record_event
+from analytics.models import LearningEvent
 
 class RateCourseView(LoginRequiredMixin, CreateView):
     model = Rating
@@ -15,10 +18,10 @@ class RateCourseView(LoginRequiredMixin, CreateView):
     
     def dispatch(self, request, *args, **kwargs):
         course_slug = self.kwargs['course_slug']
-        course = get_object_or_404(Course, slug=course_slug)
+        course = get_cached_or_404(Course, slug=course_slug)
         
         # Check if user is enrolled in the course
-        if not Enrollment.objects.filter(student=request.user, course=course).exists():
+        if not is_enrolled(request.user, course.id):
             messages.error(request, 'You must be enrolled in this course to rate it.')
             return redirect('courses:course_detail', slug=course_slug)
         
@@ -32,15 +35,16 @@ class RateCourseView(LoginRequiredMixin, CreateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         course_slug = self.kwargs['course_slug']
-        context['course'] = get_object_or_404(Course, slug=course_slug)
+        context['course'] = get_cached_or_404(Course, slug=course_slug)
         return context
     
     def form_valid(self, form):
         course_slug = self.kwargs['course_slug']
-        course = get_object_or_404(Course, slug=course_slug)
+        course = get_cached_or_404(Course, slug=course_slug)
         
         form.instance.student = self.request.user
         form.instance.course = course
+        record_event(LearningEvent.RATING, course.id, self.request.user.pk)
         messages.success(self.request, 'Thank you for rating this course!')
         return super().form_valid(form)
     
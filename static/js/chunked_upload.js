@@ -0,0 +1,178 @@
+// Resumable chunked video uploads (server side: courses/uploads.py)
+//
+// A form with data-chunked-upload="<start url>" sends its video file in
+// chunks before submitting, then posts only the upload id. Interrupted
+// uploads resume from the chunks the server already has, and a file the
+// server already stores (same chunk checksums) is not sent at all.
+
+(function() {
+    const PARALLEL = 3;
+    const RETRIES = 5;
+
+    function csrfToken(form) {
+        return form.querySelector('[name=csrfmiddlewaretoken]').value;
+    }
+
+    function storageKey(file) {
+        return 'chunked-upload:' + [file.name, file.size, file.lastModified].join(':');
+    }
+
+    async function sha256(blob) {
+        const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+        return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    async function request(url, options) {
+        for (let attempt = 0; ; attempt++) {
+            try {
+                const response = await fetch(url, Object.assign({credentials: 'same-origin'}, options));
+                if (response.status < 500) {
+                    return response;
+                }
+            } catch (error) {
+                if (attempt >= RETRIES) throw error;
+            }
+            if (attempt >= RETRIES) throw new Error('Upload failed, please try again.');
+            await sleep(Math.min(1000 * 2 ** attempt, 15000));
+        }
+    }
+
+    async function errorOf(response) {
+        try {
+            return (await response.json()).error || response.statusText;
+        } catch (e) {
+            return response.statusText;
+        }
+    }
+
+    async function chunkDigests(file, chunkSize, onProgress) {
+        const digests = [];
+        const count = Math.max(Math.ceil(file.size / chunkSize), 1);
+        for (let index = 0; index < count; index++) {
+            digests.push(await sha256(file.slice(index * chunkSize, (index + 1) * chunkSize)));
+            onProgress((index + 1) / count);
+        }
+        return digests;
+    }
+
+    async function fingerprint(chunkSize, digests) {
+        return chunkSize + ':' + await sha256(new Blob([digests.join('')]));
+    }
+
+    async function openSession(form, file, digests) {
+        const key = storageKey(file);
+        const saved = localStorage.getItem(key);
+        if (saved) {
+            const response = await request(saved, {method: 'GET'});
+            if (response.ok) {
+                const status = await response.json();
+                status.status_url = saved;
+                return status;
+            }
+            localStorage.removeItem(key);
+        }
+
+        const body = new FormData();
+        body.append('filename', file.name);
+        body.append('size', file.size);
+        if (form.dataset.videoId) body.append('video_id', form.dataset.videoId);
+        if (digests) body.append('fingerprint', await fingerprint(digests.chunkSize, digests));
+        const response = await request(form.dataset.chunkedUpload, {
+            method: 'POST',
+            headers: {'X-CSRFToken': csrfToken(form)},
+            body: body,
+        });
+        if (!response.ok) throw new Error(await errorOf(response));
+        const session = await response.json();
+        localStorage.setItem(key, session.status_url);
+        return session;
+    }
+
+    async function upload(form, file, chunkSize, onHashProgress, onProgress) {
+        let digests = null;
+        if (chunkSize) {
+            digests = await chunkDigests(file, chunkSize, onHashProgress);
+            digests.chunkSize = chunkSize;
+        }
+        const session = await openSession(form, file, digests);
+        if (digests && session.chunk_size !== chunkSize) digests = null;
+        if (session.status === 'uploading') {
+            const received = new Set(session.received_chunks);
+            const pending = [];
+            for (let index = 0; index < session.total_chunks; index++) {
+                if (!received.has(index)) pending.push(index);
+            }
+            let done = session.received_bytes;
+            onProgress(done / file.size);
+
+            async function worker() {
+                while (pending.length) {
+                    const index = pending.shift();
+                    const chunk = file.slice(index * session.chunk_size, (index + 1) * session.chunk_size);
+                    const response = await request(session.status_url + 'chunks/' + index + '/', {
+                        method: 'PUT',
+                        headers: {'X-CSRFToken': csrfToken(form), 'X-Chunk-SHA256': digests ? digests[index] : await sha256(chunk)},
+                        body: chunk,
+                    });
+                    if (!response.ok) throw new Error(await errorOf(response));
+                    done += chunk.size;
+                    onProgress(done / file.size);
+                }
+            }
+            await Promise.all(Array.from({length: PARALLEL}, worker));
+
+            const response = await request(session.status_url + 'complete/', {
+                method: 'POST',
+                headers: {'X-CSRFToken': csrfToken(form)},
+            });
+            if (!response.ok) throw new Error(await errorOf(response));
+        }
+        localStorage.removeItem(storageKey(file));
+        onProgress(1);
+        return session.upload_id;
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('form[data-chunked-upload]').forEach(function(form) {
+            const fileInput = form.querySelector('input[type=file][name=video_file]');
+            const uploadInput = form.querySelector('input[name=upload_id]');
+            const progress = form.querySelector('.chunked-upload-progress');
+            const bar = progress && progress.querySelector('.progress-bar');
+            const errors = form.querySelector('.chunked-upload-error');
+            if (!fileInput || !uploadInput || !window.crypto || !crypto.subtle) return;
+
+            form.addEventListener('submit', async function(e) {
+                const file = fileInput.files[0];
+                if (!file || uploadInput.value) return;
+                e.preventDefault();
+
+                const submit = form.querySelector('[type=submit]');
+                submit.disabled = true;
+                if (progress) progress.classList.remove('d-none');
+                if (errors) errors.textContent = '';
+                function show(label) {
+                    return function(fraction) {
+                        if (!bar) return;
+                        const percent = Math.floor(fraction * 100) + '%';
+                        bar.style.width = percent;
+                        bar.textContent = label + percent;
+                    };
+                }
+                try {
+                    const chunkSize = parseInt(uploadInput.dataset.chunkSize, 10) || 0;
+                    uploadInput.value = await upload(form, file, chunkSize, show('SHA-256 '), show(''));
+                    // The file is already on the server; don't send it twice
+                    fileInput.value = '';
+                    form.submit();
+                } catch (error) {
+                    submit.disabled = false;
+                    if (errors) errors.textContent = error.message;
+                }
+            });
+        });
+    });
+})();